@@ -3,13 +3,17 @@ Java Learning Research Study - Main Application
 Implements 3 experimental conditions with Firebase integration
 """
 
-import streamlit as st
+import json
+import logging
 import time
+from typing import Optional
+
+import streamlit as st
 
 # Configuration and setup
 from utils.config import (
     SESSION_DURATION, CONDITIONS, SESSIONS,
-    STUDY_INFO
+    STUDY_INFO, TRANSCRIPT_LIVE_WINDOW, ADMISSION_POLL_SECONDS
 )
 
 # Admin module
@@ -20,8 +24,8 @@ from client.admin_module import (
 
 # Authentication and data
 from utils.auth import require_auth, render_login_page, get_user_data, logout_user
+import utils.database as database
 from utils.database import (
-    save_session_start, save_message, save_scaffold_progress,
     save_quiz_responses, save_survey_responses, complete_session,
     get_session_status, get_next_session
 )
@@ -30,19 +34,31 @@ from utils.database import (
 # Content
 from content.research_topics import get_research_topic
 #from code_examples import get_code_example  # <--- Import from the correct file
-from content.static_quiz import get_quiz, score_quiz
+from content.static_quiz import get_quiz, label_quiz_answers, score_quiz
 
 # AI and learning components
-from client.ai_client import SimpleAIClient
-from characters import get_all_character_names
-from content.survey import render_survey, validate_survey_complete
-import tutor_flow.flow_manager
-from tutor_flow.steps import ScaffoldStep
-from __delete_later.visuals import get_topic_visual
+from client.admission import get_admission
+from client.scheduler import get_llm_scheduler
+from characters import get_character, get_all_character_names
+from content.survey import (render_survey, collect_survey_responses, label_survey_responses,
+                            validate_survey_complete)
+from tutor_flow.session import TutorSession, NullStorage
 
 # Admin
 from utils.data_export import render_admin_export
 
+# Performance timing
+from utils.timing import start_run, finish_run, phase
+from utils.metrics import start_exporters
+from utils.state_store import load_learner, save_learner
+
+# UI widgets
+from widgets.countdown import session_countdown, countdown_expired
+from widgets.transcript import render_transcript
+
+logging.basicConfig(level=logging.INFO)
+start_exporters()
+
 
 def initialize_session_state():
     """Initialize all session state variables."""
@@ -58,19 +74,13 @@ def initialize_session_state():
     if 'condition' not in st.session_state:
         st.session_state.condition = None
     if 'phase' not in st.session_state:
-        st.session_state.phase = 'dashboard'  # dashboard, learning, quiz, survey, complete
+        st.session_state.phase = 'dashboard'  # dashboard, waiting_room, character_selection, learning, quiz, survey, complete
     
     # Learning state
     if 'session_active' not in st.session_state:
         st.session_state.session_active = False
-    if 'start_time' not in st.session_state:
-        st.session_state.start_time = None
-    if 'ai_client' not in st.session_state:
-        st.session_state.ai_client = None
-    if 'flow' not in st.session_state:
-        st.session_state.flow = None
-    if 'selected_character' not in st.session_state:
-        st.session_state.selected_character = None
+    if 'tutor' not in st.session_state:
+        st.session_state.tutor = None  # TutorSession engine
     
     # Quiz state
     if 'quiz_answers' not in st.session_state:
@@ -81,6 +91,68 @@ def initialize_session_state():
         st.session_state.survey_responses = {}
 
 
+# Learning-flow state mirrored to the shared store, so a student can carry
+# on from any replica (the tutor itself goes in as a snapshot)
+LEARNER_FIELDS = (
+    'current_session_id', 'condition', 'phase', 'session_active',
+    'quiz_answers', 'quiz_submitted', 'quiz_incomplete', 'quiz_score',
+    'quiz_total', 'quiz_results', 'survey_missing',
+)
+
+
+def load_learner_state():
+    """
+    Once per Streamlit session: pick up this student's learning state from
+    the shared store if it was left on another replica (or before a restart).
+    """
+    user_id = st.session_state.user_id
+    if not user_id or st.session_state.get('_learner_loaded'):
+        return
+    st.session_state._learner_loaded = True
+    if st.session_state.tutor is not None:
+        return
+    
+    record = load_learner(user_id)
+    if not record or not record.get('current_session_id'):
+        return
+    
+    for field in LEARNER_FIELDS:
+        if record.get(field) is not None:
+            st.session_state[field] = record[field]
+    # JSON object keys are strings; the quiz uses question indices
+    st.session_state.quiz_answers = {int(i): a for i, a in (record.get('quiz_answers') or {}).items()}
+    
+    session_id = record['current_session_id']
+    st.session_state.tutor = TutorSession.from_snapshot(
+        user_id,
+        session_id,
+        record['condition'],
+        record.get('tutor'),
+        llm=get_llm_scheduler(),
+        storage=database,
+    )
+    if st.session_state.tutor is None and st.session_state.phase != 'complete':
+        # Still choosing a character, or no usable snapshot: start over
+        start_session(session_id)
+
+
+def save_learner_state():
+    """Mirror this student's learning state to the shared store, if it changed."""
+    user_id = st.session_state.user_id
+    if not user_id or st.session_state.get('is_admin_test', False):
+        return
+    
+    record = {field: st.session_state.get(field) for field in LEARNER_FIELDS}
+    tutor = st.session_state.tutor
+    record['tutor'] = tutor.snapshot() if tutor is not None else None
+    
+    digest = hash(json.dumps(record, sort_keys=True, default=str))
+    if digest == st.session_state.get('_learner_digest'):
+        return
+    if save_learner(user_id, record):
+        st.session_state._learner_digest = digest
+
+
 def render_dashboard():
     """Render the main dashboard showing session progress."""
     # Check if user is admin
@@ -116,9 +188,7 @@ def render_dashboard():
         st.write("Thank you for participating in our research study!")
         st.write("Your responses have been recorded.")
         
-        if st.button("Logout"):
-            logout_user()
-            st.rerun()
+        st.button("Logout", on_click=logout_user)
         return
     
     # Show session cards
@@ -163,116 +233,105 @@ def render_dashboard():
                 elif not is_available:
                     st.write("")  # Can't start yet
                 else:
-                    if st.button("Start", key=f"start_{session_id}", type="primary"):
-                        start_session(session_id)
-                        st.rerun()
+                    st.button("Start", key=f"start_{session_id}", type="primary",
+                              on_click=start_session, args=(session_id,))
             
             st.write("---")
     
     # Logout button
-    if st.button("Logout"):
-        logout_user()
-        st.rerun()
+    st.button("Logout", on_click=logout_user)
+
+
+def get_tutor() -> TutorSession:
+    """Get the tutoring engine for the current session."""
+    return st.session_state.tutor
+
+
+def session_storage():
+    """Admin tests run the real engine but never touch the database."""
+    if st.session_state.get('is_admin_test', False):
+        return NullStorage()
+    return database
 
 
 def start_session(session_id: str):
-    """Initialize a learning session."""
-    # Get topic
-    topic = get_research_topic(session_id)
-    condition = st.session_state.condition
+    """Initialize a learning session (via the waiting room if we're at capacity)."""
+    start_run()
     
-    # Initialize AI client
-    st.session_state.ai_client = SimpleAIClient()
     st.session_state.current_session_id = session_id
-
-    
-    # Save session start to database (only if not admin test)
-    if not st.session_state.get('is_admin_test', False):
-        save_session_start(st.session_state.user_id, session_id, condition)
+    # Pick up an in-progress session after a dropped connection or a
+    # redeploy (one snapshot read); it was admitted when it started
+    tutor = TutorSession.resume(
+        st.session_state.user_id,
+        session_id,
+        st.session_state.condition,
+        llm=get_llm_scheduler(),
+        storage=session_storage(),
+    )
+    if tutor is None and not st.session_state.get('is_admin_test', False):
+        if get_admission().request(st.session_state.user_id, session_id) is not None:
+            st.session_state.phase = 'waiting_room'
+            return
+    
+    enter_session(tutor)
+
+
+def enter_session(tutor: Optional[TutorSession] = None):
+    """Start (or carry on with) the tutor and move to the first phase."""
+    st.session_state.tutor = tutor or TutorSession.start(
+        st.session_state.user_id,
+        st.session_state.current_session_id,
+        st.session_state.condition,
+        llm=get_llm_scheduler(),
+        storage=session_storage(),
+    )
     
-    # Initialize based on condition
-    if condition in [1, 2]:  # Scaffolded conditions
-        # Initialize flow
-        st.session_state.flow = tutor_flow.flow_manager.TutorFlow(topic.name, "Tutor")
-        
-        # For condition 1, let them select character
-        if condition == 1:
-            st.session_state.phase = 'character_selection'
-        else:
-            # Condition 2: Start directly with generic tutor
-            st.session_state.phase = 'learning'
-            st.session_state.start_time = time.time()
-            st.session_state.session_active = True
-            generate_initial_message(topic, condition)
+    # For condition 1, let them select character
+    if st.session_state.tutor.needs_character:
+        st.session_state.phase = 'character_selection'
     else:
-        # Condition 3: Direct chat (no scaffolding)
         st.session_state.phase = 'learning'
-        st.session_state.start_time = time.time()
         st.session_state.session_active = True
-        st.session_state.messages = []
-        
-        # Simple welcome message
-        welcome = f"Hello! I'm here to answer your questions about {topic.name}. What would you like to know?"
-        st.session_state.messages.append({
-            'role': 'assistant',
-            'content': welcome,
-            'timestamp': time.time()
-        })
-        
-        # Only save if not admin test
-        if not st.session_state.get('is_admin_test', False):
-            save_message(st.session_state.user_id, session_id, 'assistant', welcome)
 
 
-from characters import get_character
-from tutor_flow.step_guide import StepGuide
+def check_waiting_room():
+    """Start the session if the waiting student has been admitted."""
+    position = get_admission().request(st.session_state.user_id,
+                                       st.session_state.current_session_id)
+    st.session_state.queue_position = position
+    if position is None:
+        enter_session()
 
-def generate_initial_message(topic, condition):
-    """Generate the initial learning message."""
-    session_id = st.session_state.current_session_id
 
-    if condition == 1:
-        character = get_character(st.session_state.selected_character)
-        system_prompt = character.get_system_prompt(topic.name)
-    else:
-        system_prompt = (
-            f"You are a helpful CS tutor teaching {topic.name}.\n\n"
-            "Your goal is to help the student understand the topic through:\n"
-            "1) metaphors and analogies\n"
-            "2) conceptual understanding\n"
-            "3) code examples\n"
-            "4) usage explanations\n\n"
-            "Be clear, encouraging, and keep responses under 150 words."
+def render_waiting_room():
+    """Render the waiting room shown while the tutor is at capacity."""
+    topic = get_research_topic(st.session_state.current_session_id)
+    st.title("⏳ Almost ready")
+    st.write(f"The tutor is busy with other students right now. Your **{topic.name}** "
+             "session will start automatically as soon as there's room.")
+    st.info("Your 10 minutes of learning time will only start once you're in.")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.metric("Your place in line", st.session_state.queue_position)
+    with col2:
+        # Reruns the page when it reaches zero, which checks again
+        session_countdown(
+            time.time(),
+            ADMISSION_POLL_SECONDS,
+            key="waiting_room_poll",
+            label="Next check",
         )
+    
+    st.button("Leave the queue", on_click=leave_waiting_room)
 
-    metaphor_prompt = StepGuide.get_metaphor_prompt(
-        "Tutor", topic.name, topic.concept
-    )
-
-    try:
-        initial_message = st.session_state.ai_client.generate_response(
-            system_prompt=system_prompt,
-            user_message=metaphor_prompt,
-            temperature=0.9,
-        )
-    except Exception:
-        initial_message = (
-            f"Hello! Let's learn about {topic.name}.\n\n"
-            f"{topic.metaphor_prompt}\n\n"
-            "What does this remind you of from your own experience?"
-        )
 
-    # Add to flow
-    st.session_state.flow.add_message("assistant", initial_message)
+def leave_waiting_room():
+    """Waiting room callback: give up the place in line."""
+    get_admission().leave(st.session_state.user_id)
+    st.session_state.current_session_id = None
+    st.session_state.phase = 'dashboard'
 
-    if not st.session_state.get("is_admin_test", False):
-        save_message(
-            st.session_state.user_id,
-            session_id,
-            "assistant",
-            initial_message,
-            step=st.session_state.flow.current_step.value,
-        )
 
 def render_character_selection():
     """Render character selection (Condition 1 only)."""
@@ -292,132 +351,16 @@ def render_character_selection():
             st.subheader(char_name)
             st.write(f"*{character.personality}*")
             
-            if st.button(f"Choose {char_name}", key=f"char_{char_name}"):
-                st.session_state.selected_character = char_name
-                st.session_state.phase = 'learning'
-                st.session_state.start_time = time.time()
-                st.session_state.session_active = True
-                generate_initial_message(topic, 1)
-                st.rerun()
-
-
-def handle_user_message_scaffolded(user_input: str):
-    """Handle user message for scaffolded conditions (1 & 2)."""
-    flow = st.session_state.flow
-    topic = get_research_topic(st.session_state.current_session_id)
-    condition = st.session_state.condition
-    session_id = st.session_state.current_session_id
-    
-    # Add user message
-    flow.add_message('user', user_input)
-    
-    # Only save if not admin test
-    if not st.session_state.get('is_admin_test', False):
-        save_message(st.session_state.user_id, session_id, 'user', user_input)
-    
-    # Check step advancement
-    old_step = flow.current_step
-    if flow.should_advance_step(user_input):
-        flow.advance_step()
-        
-        # Only save if not admin test
-        if not st.session_state.get('is_admin_test', False):
-            save_scaffold_progress(st.session_state.user_id, session_id, flow.current_step.value)
-        
-        # Show visual if advancing to CODE_STRUCTURE
-        if flow.current_step == ScaffoldStep.CODE_STRUCTURE:
-            visual = get_topic_visual(st.session_state.current_session_id)
-            flow.add_message('assistant', f"📊 **Visual Diagram:**\n{visual}")
-            
-            # Only save if not admin test
-            if not st.session_state.get('is_admin_test', False):
-                save_message(st.session_state.user_id, session_id, 'assistant', 
-                            f"📊 **Visual Diagram:**\n{visual}", 
-                            step=flow.current_step.value)
-    
-    # Generate response
-    if condition == 1:
-        character = get_character(st.session_state.selected_character)
-        system_prompt = character.get_system_prompt(topic.name)
-    else:
-        system_prompt = f"You are a helpful CS tutor teaching {topic.name}."
-
-    response_prompt = StepGuide.get_response_prompt(
-        "Tutor",
-        topic.name,
-        flow.current_step,
-        user_input,
-        flow.get_recent_context(5),
-    )
-    
-    # Build conversation history
-    recent_messages = flow.get_recent_context(5)
-    conversation_history = [{'role': m.role, 'content': m.content} for m in recent_messages[:-1]]
-    
-    try:
-        response = st.session_state.ai_client.generate_response(
-            system_prompt=system_prompt + "\n\n" + response_prompt,
-            user_message=user_input,
-            conversation_history=conversation_history
-        )
-    except:
-        response = "I'm having trouble responding. Could you try rephrasing that?"
-    
-    # Add response
-    flow.add_message('assistant', response)
-    
-    # Only save if not admin test
-    if not st.session_state.get('is_admin_test', False):
-        save_message(st.session_state.user_id, session_id, 'assistant', response,
-                    step=flow.current_step.value)
+            st.button(f"Choose {char_name}", key=f"char_{char_name}",
+                      on_click=choose_character, args=(char_name,))
 
 
-def handle_user_message_direct(user_input: str):
-    """Handle user message for direct chat condition (3)."""
-    topic = get_research_topic(st.session_state.current_session_id)
-    session_id = st.session_state.current_session_id
-    
-    # Add user message
-    st.session_state.messages.append({
-        'role': 'user',
-        'content': user_input,
-        'timestamp': time.time()
-    })
-    
-    # Only save if not admin test
-    if not st.session_state.get('is_admin_test', False):
-        save_message(st.session_state.user_id, session_id, 'user', user_input)
-    
-    # Build conversation history
-    conversation_history = [
-        {'role': m['role'], 'content': m['content']} 
-        for m in st.session_state.messages[-10:]  # Last 10 messages
-    ]
-    
-    # Simple system prompt - no scaffolding
-    system_prompt = f"""You are a helpful assistant answering questions about {topic.name} in Java.
-
-Provide clear, accurate answers. Include code examples when helpful. Be concise."""
-    
-    try:
-        response = st.session_state.ai_client.generate_response(
-            system_prompt=system_prompt,
-            user_message=user_input,
-            conversation_history=conversation_history[:-1]
-        )
-    except:
-        response = "I'm having trouble responding. Could you try rephrasing that?"
-    
-    # Add response
-    st.session_state.messages.append({
-        'role': 'assistant',
-        'content': response,
-        'timestamp': time.time()
-    })
-    
-    # Only save if not admin test
-    if not st.session_state.get('is_admin_test', False):
-        save_message(st.session_state.user_id, session_id, 'assistant', response)
+def choose_character(char_name: str):
+    """Character button callback: start learning with the chosen tutor."""
+    start_run()
+    get_tutor().choose_character(char_name)
+    st.session_state.phase = 'learning'
+    st.session_state.session_active = True
 
 
 def render_learning_session():
@@ -432,47 +375,60 @@ def render_learning_session():
     # Header
     st.title(f"Learning: {topic.name}")
     
-    # Timer
-    elapsed = time.time() - st.session_state.start_time
-    remaining = max(0, SESSION_DURATION - elapsed)
-    mins = int(remaining // 60)
-    secs = int(remaining % 60)
-    
+    # Timer (counts down in the browser, reports back once at expiry;
+    # main() moves on to the quiz when it does)
     col1, col2 = st.columns([3, 1])
     with col1:
         st.write(f"**Topic:** {topic.name} ({topic.difficulty})")
     with col2:
-        st.metric("Time Left", f"{mins}:{secs:02d}")
+        session_countdown(
+            get_tutor().state.start_time,
+            SESSION_DURATION,
+            key=countdown_key(),
+        )
     
     st.write("---")
     
-    # Check if time is up
-    if elapsed >= SESSION_DURATION:
-        st.session_state.phase = 'quiz'
-        st.rerun()
-    
-    # Display messages based on condition
+    # Display messages (same transcript store for every condition)
     chat_container = st.container(height=500)
     
+    tutor = get_tutor()
     with chat_container:
-        if condition in [1, 2]:  # Scaffolded
-            for msg in st.session_state.flow.messages:
-                with st.chat_message(msg.role):
-                    st.write(msg.content)
-        else:  # Direct chat
-            for msg in st.session_state.messages:
-                with st.chat_message(msg['role']):
-                    st.write(msg['content'])
-    
-    # Chat input
-    user_input = st.chat_input("Type your response...")
-    
-    if user_input:
-        if condition in [1, 2]:
-            handle_user_message_scaffolded(user_input)
-        else:
-            handle_user_message_direct(user_input)
-        st.rerun()
+        render_transcript(
+            tutor.messages,
+            cache_key=st.session_state.current_session_id,
+            live_window=TRANSCRIPT_LIVE_WINDOW,
+            to_pair=lambda m: (m.role, m.content),
+        )
+    
+    # Chat input (handled in on_chat_submit before the script runs)
+    st.chat_input("Type your response...", key="chat_input", on_submit=on_chat_submit)
+
+
+def countdown_key() -> str:
+    """Widget key for the current session's countdown."""
+    return f"countdown_{st.session_state.current_session_id}"
+
+
+def learning_time_up() -> bool:
+    """Check whether the current learning session has run out of time."""
+    return countdown_expired(get_tutor().state.start_time, SESSION_DURATION, countdown_key())
+
+
+def on_chat_submit():
+    """Chat input callback: handle the message before the script reruns."""
+    user_input = st.session_state.get('chat_input')
+    if not user_input:
+        return
+    
+    start_run()
+    
+    get_tutor().handle_user_message(user_input)
+
+
+def go_to_phase(phase: str):
+    """Button callback: switch to another phase of the session."""
+    st.session_state.phase = phase
 
 
 def render_quiz():
@@ -490,43 +446,28 @@ def render_quiz():
         st.session_state.quiz_submitted = False
     
     if not st.session_state.quiz_submitted:
-        # Display questions
-        for i, q in enumerate(quiz_questions):
-            st.subheader(f"Question {i+1}")
-            st.write(q.question)
+        # Answers are sent together on submit, not one rerun per click
+        with st.form("quiz_form"):
+            for i, q in enumerate(quiz_questions):
+                st.subheader(f"Question {i+1}")
+                st.write(q.question)
+                
+                # Widget value is the option index
+                st.radio(
+                    "Select your answer:",
+                    options=range(len(q.options)),
+                    format_func=lambda idx, q=q: q.options[idx],
+                    key=f"quiz_q_{i}",
+                    index=None
+                )
+                
+                st.write("")
             
-            answer = st.radio(
-                "Select your answer:",
-                options=q.options,
-                key=f"quiz_q_{i}",
-                index=None
-            )
-            
-            if answer:
-                st.session_state.quiz_answers[i] = answer
-            
-            st.write("")
-        
-        # Submit button
-        all_answered = len(st.session_state.quiz_answers) == len(quiz_questions)
+            st.form_submit_button("Submit Quiz", type="primary", on_click=submit_quiz)
         
-        if st.button("Submit Quiz", type="primary", disabled=not all_answered):
-            # Score quiz
-            score, total, results = score_quiz(session_id, st.session_state.quiz_answers)
-            
-            # Only save if not admin test
-            if not st.session_state.get('is_admin_test', False):
-                save_quiz_responses(st.session_state.user_id, session_id, 
-                                  st.session_state.quiz_answers, score, total)
-            
-            st.session_state.quiz_submitted = True
-            st.session_state.quiz_score = score
-            st.session_state.quiz_total = total
-            st.session_state.quiz_results = results
-            st.rerun()
-        
-        if not all_answered:
-            st.info(f"Please answer all questions ({len(st.session_state.quiz_answers)}/{len(quiz_questions)} complete)")
+        answered = len(st.session_state.quiz_answers)
+        if st.session_state.get('quiz_incomplete', False):
+            st.info(f"Please answer all questions ({answered}/{len(quiz_questions)} complete)")
     
     else:
         # Show results
@@ -546,39 +487,82 @@ def render_quiz():
         
         st.write("---")
         
-        if st.button("Continue to Survey", type="primary"):
-            st.session_state.phase = 'survey'
-            st.rerun()
+        st.button("Continue to Survey", type="primary",
+                  on_click=go_to_phase, args=('survey',))
+
+
+def submit_quiz():
+    """Quiz form callback: score and save the answers once all are given."""
+    start_run()
+    session_id = st.session_state.current_session_id
+    quiz_questions = get_quiz(session_id)
+    
+    # Collect option indices from the form
+    st.session_state.quiz_answers = {
+        i: st.session_state.get(f"quiz_q_{i}")
+        for i in range(len(quiz_questions))
+        if st.session_state.get(f"quiz_q_{i}") is not None
+    }
+    
+    if len(st.session_state.quiz_answers) < len(quiz_questions):
+        st.session_state.quiz_incomplete = True
+        return
+    st.session_state.quiz_incomplete = False
+    
+    # Score quiz
+    score, total, results = score_quiz(session_id, st.session_state.quiz_answers)
+    
+    # Only save if not admin test
+    if not st.session_state.get('is_admin_test', False):
+        save_quiz_responses(st.session_state.user_id, session_id,
+                          label_quiz_answers(session_id, st.session_state.quiz_answers),
+                          score, total)
+    
+    st.session_state.quiz_submitted = True
+    st.session_state.quiz_score = score
+    st.session_state.quiz_total = total
+    st.session_state.quiz_results = results
 
 
 def render_survey_page():
     """Render the survey."""
     topic = get_research_topic(st.session_state.current_session_id)
-    session_id = st.session_state.current_session_id
     condition = st.session_state.condition
     
-    responses = render_survey(topic.name, condition)
+    render_survey(topic.name, condition, on_submit=submit_survey)
+    
+    missing = st.session_state.get('survey_missing', 0)
+    if missing:
+        st.warning(f"Please answer all required questions ({missing} remaining)")
+
+
+def submit_survey():
+    """Survey form callback: save responses and complete the session."""
+    start_run()
+    session_id = st.session_state.current_session_id
+    responses = collect_survey_responses(st.session_state.condition)
     st.session_state.survey_responses = responses
     
     # Check if complete
     is_complete, missing = validate_survey_complete(responses)
+    st.session_state.survey_missing = missing
+    if not is_complete:
+        return
     
-    st.write("---")
-    
-    if st.button("Submit Survey", type="primary", disabled=not is_complete):
-        # Only save if not admin test
-        if not st.session_state.get('is_admin_test', False):
-            # Save to database
-            save_survey_responses(st.session_state.user_id, session_id, responses)
-            
-            # Mark session complete
-            complete_session(st.session_state.user_id, session_id)
+    # Only save if not admin test
+    if not st.session_state.get('is_admin_test', False):
+        # Let any in-flight chat writes land before the session is totalled
+        get_tutor().flush()
+        
+        # Save to database
+        save_survey_responses(st.session_state.user_id, session_id,
+                              label_survey_responses(responses))
         
-        st.session_state.phase = 'complete'
-        st.rerun()
+        # Mark session complete
+        complete_session(st.session_state.user_id, session_id)
     
-    if not is_complete:
-        st.warning(f"Please answer all required questions ({missing} remaining)")
+    get_tutor().end()
+    st.session_state.phase = 'complete'
 
 
 def render_complete():
@@ -597,17 +581,22 @@ def render_complete():
         st.write("You've completed both sessions!")
         st.write("Thank you for participating in our research!")
     
-    if st.button("Back to Dashboard", type="primary"):
-        # Reset session state
-        st.session_state.current_session_id = None
-        st.session_state.phase = 'dashboard'
-        st.session_state.session_active = False
-        st.session_state.flow = None
-        st.session_state.messages = []
-        st.session_state.quiz_answers = {}
-        st.session_state.survey_responses = {}
-        st.session_state.quiz_submitted = False
-        st.rerun()
+    st.button("Back to Dashboard", type="primary", on_click=return_to_dashboard)
+
+
+def return_to_dashboard():
+    """Completion page callback: reset session state for the next session."""
+    st.session_state.current_session_id = None
+    st.session_state.phase = 'dashboard'
+    st.session_state.session_active = False
+    if get_tutor() is not None:
+        get_tutor().end()
+    st.session_state.tutor = None
+    st.session_state.quiz_answers = {}
+    st.session_state.survey_responses = {}
+    st.session_state.quiz_submitted = False
+    st.session_state.quiz_incomplete = False
+    st.session_state.survey_missing = 0
 
 
 def main():
@@ -620,29 +609,59 @@ def main():
     
     initialize_session_state()
     
-    # Check authentication
-    if not require_auth():
-        render_login_page()
-        return
-    
-    # Show admin export if URL parameter
-    if st.query_params.get("admin") == "true":
-        render_admin_export()
-        return
-    
-    # Route based on phase
-    if st.session_state.phase == 'dashboard':
-        render_dashboard()
-    elif st.session_state.phase == 'character_selection':
-        render_character_selection()
-    elif st.session_state.phase == 'learning':
-        render_learning_session()
-    elif st.session_state.phase == 'quiz':
-        render_quiz()
-    elif st.session_state.phase == 'survey':
-        render_survey_page()
-    elif st.session_state.phase == 'complete':
-        render_complete()
+    # Time this script run (joins a run already opened by a callback)
+    run = start_run()
+    try:
+        # Check authentication
+        with phase('auth'):
+            authenticated = require_auth()
+        if not authenticated:
+            run.label = 'login'
+            with phase('render'):
+                render_login_page()
+            return
+        
+        # Carry on a session left on another replica
+        load_learner_state()
+        
+        # Show admin export if URL parameter
+        if st.query_params.get("admin") == "true":
+            run.label = 'admin_export'
+            with phase('render'):
+                render_admin_export()
+            return
+        
+        # Let waiting students in once there's capacity, within this same run
+        if st.session_state.phase == 'waiting_room':
+            check_waiting_room()
+        
+        # Move on to the quiz once the timer is up, within this same run
+        if st.session_state.phase == 'learning' and learning_time_up():
+            st.session_state.phase = 'quiz'
+        
+        run.label = st.session_state.phase
+        
+        # Route based on phase
+        with phase('render'):
+            if st.session_state.phase == 'dashboard':
+                render_dashboard()
+            elif st.session_state.phase == 'waiting_room':
+                render_waiting_room()
+            elif st.session_state.phase == 'character_selection':
+                render_character_selection()
+            elif st.session_state.phase == 'learning':
+                render_learning_session()
+            elif st.session_state.phase == 'quiz':
+                render_quiz()
+            elif st.session_state.phase == 'survey':
+                render_survey_page()
+            elif st.session_state.phase == 'complete':
+                render_complete()
+        
+        with phase('db_writes'):
+            save_learner_state()
+    finally:
+        finish_run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+"""
+Admission Benchmark
+Turn latency for students already learning when a burst of new students
+arrives, with and without the waiting room
+
+Students arrive over a short window (a class told to start at once) and
+each takes a fixed number of turns against the real TutorSession, all
+sharing one LLMScheduler with a small concurrency cap. With admission on,
+each arrival asks an AdmissionController fed by the scheduler's live
+queue, and waits in line, checking back every --poll seconds, until it is
+admitted. Reports turn latency for admitted students and how long the
+waiting room held people.
+
+Usage:
+    python -m benchmarks.admission
+    python -m benchmarks.admission --students 40 --cap 4 --max-queue-depth 4
+"""
+
+import argparse
+import random
+import threading
+import time
+from typing import Dict, List
+
+from client.admission import AdmissionController, AdmissionThresholds, CapacitySignals
+from client.scheduler import LLMScheduler
+from tutor_flow.session import NullStorage, TutorSession
+from utils.timing import summarize
+
+from benchmarks.mocks import MockLLM
+
+REPLIES = [
+    "It reminds me of packing for a trip and running out of room in my bag.",
+    "Can you explain that again?",
+    "What does O(n) mean here?",
+    "Why double the capacity instead of adding one slot?",
+]
+
+
+def run(args: argparse.Namespace, admission: bool) -> Dict[str, Dict[str, float]]:
+    llm = MockLLM(median_latency=args.llm_latency, tail_factor=0.2, seed=args.seed)
+    scheduler = LLMScheduler(llm, max_concurrent=args.cap)
+
+    def signals() -> CapacitySignals:
+        stats = scheduler.stats()
+        return CapacitySignals(in_flight=stats['running'] + stats['waiting'],
+                               queue_depth=stats['waiting'])
+
+    controller = AdmissionController(
+        signals=signals,
+        thresholds=AdmissionThresholds(max_in_flight=args.max_in_flight,
+                                       max_queue_depth=args.max_queue_depth),
+        enabled=admission,
+    )
+    rng = random.Random(args.seed)
+    arrivals = sorted(rng.uniform(0, args.arrival_window) for _ in range(args.students))
+    turns: List[float] = []
+    waits: List[float] = []
+    lock = threading.Lock()
+    begin = time.perf_counter()
+
+    def student(index: int, arrival: float):
+        time.sleep(arrival)
+        user_id = f"student{index}"
+        joined = time.perf_counter()
+        while controller.request(user_id, 'arraylist') is not None:
+            time.sleep(args.poll)
+        with lock:
+            waits.append(time.perf_counter() - joined)
+
+        tutor = TutorSession.start(user_id, 'arraylist', 3, scheduler, NullStorage())
+        for turn in range(args.turns):
+            time.sleep(rng.uniform(0, args.think_time))
+            start = time.perf_counter()
+            tutor.handle_user_message(REPLIES[turn % len(REPLIES)])
+            with lock:
+                turns.append(time.perf_counter() - start)
+        tutor.end()
+
+    threads = [threading.Thread(target=student, args=(i, arrival))
+               for i, arrival in enumerate(arrivals)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'turn': summarize(turns), 'wait': summarize(waits),
+            'elapsed': time.perf_counter() - begin}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark admission control.")
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--arrival-window", type=float, default=3.0,
+                        help="Seconds over which students arrive")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per student")
+    parser.add_argument("--cap", type=int, default=4, help="LLM calls in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Median LLM latency (s)")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="Max pause between a student's turns (s)")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--max-queue-depth", type=int, default=4)
+    parser.add_argument("--poll", type=float, default=0.5, help="Waiting room check interval (s)")
+    parser.add_argument("--seed", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{args.students} students arriving over {args.arrival_window:.0f}s, "
+          f"{args.turns} turns each, cap {args.cap}, LLM ~{args.llm_latency * 1000:.0f}ms\n")
+    print(f"{'':<12}{'turns':>7}{'turn p50':>10}{'turn p95':>10}{'turn max':>10}"
+          f"{'wait p95':>10}{'wait max':>10}{'wall':>8}")
+    for name, admission in (("open", False), ("admission", True)):
+        result = run(args, admission)
+        turn, wait = result['turn'], result['wait']
+        print(f"{name:<12}{turn['count']:>7}{turn['p50'] * 1000:>8.0f}ms{turn['p95'] * 1000:>8.0f}ms"
+              f"{turn['max'] * 1000:>8.0f}ms{wait['p95']:>9.1f}s{wait['max']:>9.1f}s"
+              f"{result['elapsed']:>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
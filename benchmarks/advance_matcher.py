@@ -0,0 +1,129 @@
+"""
+Advance Matcher Benchmark
+Speed and accuracy of the step-advance check on a labelled corpus
+
+Compares the compiled per-topic matchers (tutor_flow.advance) with the
+original substring scan that TutorFlow.should_advance_step used to do.
+Each corpus line is {"topic", "step", "message", "advance"}.
+
+Usage:
+    python -m benchmarks.advance_matcher
+    python -m benchmarks.advance_matcher --corpus my_corpus.jsonl --repeat 20000 --show-errors
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List
+
+from tutor_flow.advance import matchers_for_topic
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "advance_corpus.jsonl")
+
+
+def legacy_should_advance(topic: str, step: str, message: str) -> bool:
+    """The substring scan should_advance_step used before compiled matchers."""
+    user_lower = message.lower()
+    if step == "initial_metaphor":
+        return len(message.strip()) > 15
+    if step == "student_metaphor":
+        ready_terms = ["ready", "go", "show me", "yes", "ok", "okay",
+                       "understand", "yep", "yeah"]
+        return any(term in user_lower for term in ready_terms)
+    if step == "code_structure":
+        ack_terms = ["makes sense", "i see", "copy", "expensive",
+                     "heavy", "got it", "understand", "ohhh"]
+        return any(term in user_lower for term in ack_terms)
+    if step == "code_usage":
+        return len(message.strip()) > 10
+    return False
+
+
+def compiled_should_advance(topic: str, step: str, message: str) -> bool:
+    matcher = matchers_for_topic(topic).get(step)
+    return matcher is not None and matcher(message)
+
+
+IMPLEMENTATIONS: Dict[str, Callable[[str, str, str], bool]] = {
+    "legacy": legacy_should_advance,
+    "compiled": compiled_should_advance,
+}
+
+
+def load_corpus(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def accuracy(fn: Callable, corpus: List[Dict]) -> Dict:
+    tp = fp = tn = fn_count = 0
+    errors = []
+    for row in corpus:
+        predicted = fn(row["topic"], row["step"], row["message"])
+        if predicted and row["advance"]:
+            tp += 1
+        elif predicted:
+            fp += 1
+            errors.append(("false advance", row))
+        elif row["advance"]:
+            fn_count += 1
+            errors.append(("missed advance", row))
+        else:
+            tn += 1
+    return {
+        "accuracy": (tp + tn) / len(corpus),
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn_count) if tp + fn_count else 0.0,
+        "false_positives": fp,
+        "false_negatives": fn_count,
+        "errors": errors,
+    }
+
+
+def speed(fn: Callable, corpus: List[Dict], repeat: int) -> float:
+    """Mean microseconds per call over `repeat` passes of the corpus."""
+    rows = [(r["topic"], r["step"], r["message"]) for r in corpus]
+    fn(*rows[0])  # Warm caches (compiles matchers on first use)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            fn(*row)
+    return (time.perf_counter() - start) / (repeat * len(rows)) * 1e6
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark step-advance matching.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Labelled JSONL corpus")
+    parser.add_argument("--repeat", type=int, default=5000, help="Timed passes over the corpus")
+    parser.add_argument("--show-errors", action="store_true", help="List misclassified replies")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} labelled replies from {args.corpus}\n")
+
+    header = f"{'matcher':<10}{'µs/call':>9}{'accuracy':>10}{'precision':>11}{'recall':>8}{'FP':>5}{'FN':>5}"
+    print(header)
+    print("-" * len(header))
+
+    results = {}
+    for name, fn in IMPLEMENTATIONS.items():
+        stats = accuracy(fn, corpus)
+        stats["us_per_call"] = speed(fn, corpus, args.repeat)
+        results[name] = stats
+        print(f"{name:<10}{stats['us_per_call']:>9.2f}{stats['accuracy'] * 100:>9.1f}%"
+              f"{stats['precision'] * 100:>10.1f}%{stats['recall'] * 100:>7.1f}%"
+              f"{stats['false_positives']:>5}{stats['false_negatives']:>5}")
+
+    if args.show_errors:
+        for name, stats in results.items():
+            print(f"\n{name} errors:")
+            for kind, row in stats["errors"]:
+                print(f"  {kind:<15} [{row['topic']}/{row['step']}] {row['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Cancellation Benchmark
+Tokens and LLM slots spent on replies nobody will read, with and without
+cancelling superseded generations
+
+Students take turns against the real TutorSession and SimpleAIClient
+(streaming from benchmarks.mocks.MockUpstream), sharing one LLMScheduler.
+Some turns are followed by a second message before the reply arrives,
+as when a student hits enter again; some sessions run out of time while
+a reply is generating. With cancellation the stale reply stops at its
+next chunk, or leaves the queue if it hadn't started.
+
+Usage:
+    python -m benchmarks.cancellation
+    python -m benchmarks.cancellation --students 24 --resend-rate 0.5 --cap 4
+"""
+
+import argparse
+import random
+import threading
+import time
+from typing import Dict, List
+
+from client.ai_client import SimpleAIClient
+from client.scheduler import LLMScheduler
+from tutor_flow.session import NullStorage, TutorSession
+from utils.metrics import LLM_CANCELLED, LLM_WASTED_TOKENS
+from utils.timing import summarize
+
+from benchmarks.mocks import MockUpstream
+
+REPLIES = [
+    "It reminds me of packing for a trip and running out of room in my bag.",
+    "Can you explain that again?",
+    "What does O(n) mean here?",
+    "Why double the capacity instead of adding one slot?",
+]
+
+
+class Uncancellable:
+    """The same client without generation handles (the engine before cancellation)."""
+
+    def __init__(self, client: SimpleAIClient):
+        self.client = client
+
+    def generate_response(self, *args, **kwargs):
+        return self.client.generate_response(*args, **kwargs)
+
+
+def run(args: argparse.Namespace, cancel: bool) -> Dict[str, object]:
+    upstream = MockUpstream(latency=args.llm_latency, chunks=10, seed=args.seed)
+    client = SimpleAIClient(transport=upstream)
+    scheduler = LLMScheduler(client if cancel else Uncancellable(client), max_concurrent=args.cap)
+    rng = random.Random(args.seed)
+    latencies: List[float] = []
+    stale = [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.duration
+
+    def student(index: int):
+        tutor = TutorSession.start(f"student{index}", 'arraylist', 3, scheduler, NullStorage())
+        turn = 0
+        while time.perf_counter() < stop:
+            time.sleep(rng.uniform(0, args.think_time))
+            first = None
+            if rng.random() < args.resend_rate:
+                # Sent again before the reply came back
+                first = threading.Thread(target=tutor.handle_user_message,
+                                         args=(REPLIES[turn % len(REPLIES)],))
+                first.start()
+                time.sleep(rng.uniform(0.1, args.llm_latency * 0.8))
+                turn += 1
+                with lock:
+                    stale[0] += 1
+            start = time.perf_counter()
+            tutor.handle_user_message(REPLIES[turn % len(REPLIES)])
+            with lock:
+                latencies.append(time.perf_counter() - start)
+            if first is not None:
+                first.join()
+            turn += 1
+        # Time's up with one last reply generating
+        ender = threading.Thread(target=tutor.handle_user_message, args=("one more thing",))
+        ender.start()
+        time.sleep(args.llm_latency / 3)
+        tutor.cancel_generation('time_up')
+        ender.join()
+
+    cancelled_before = LLM_CANCELLED.total()
+    wasted_before = LLM_WASTED_TOKENS.total()
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(args.students)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'latency': summarize(latencies),
+        'stale': stale[0],
+        'calls': upstream.calls,
+        'completion_tokens': upstream.output_chars // 4,
+        'cancelled': LLM_CANCELLED.total() - cancelled_before,
+        'wasted': LLM_WASTED_TOKENS.total() - wasted_before,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark cancelling superseded generations.")
+    parser.add_argument("--students", type=int, default=16)
+    parser.add_argument("--cap", type=int, default=4, help="LLM calls in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Time to stream a reply (s)")
+    parser.add_argument("--resend-rate", type=float, default=0.3,
+                        help="Share of turns followed by another message before the reply")
+    parser.add_argument("--think-time", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--seed", type=int, default=11)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{args.students} students, cap {args.cap}, {args.resend_rate:.0%} of turns resent, "
+          f"~{args.llm_latency:.1f}s per reply\n")
+    print(f"{'':<10}{'turns':>7}{'stale':>7}{'upstream':>10}{'tokens out':>12}"
+          f"{'cancelled':>11}{'wasted':>8}{'p50':>9}{'p95':>9}")
+    for name, cancel in (("keep", False), ("cancel", True)):
+        result = run(args, cancel)
+        latency = result['latency']
+        print(f"{name:<10}{latency['count']:>7}{result['stale']:>7}{result['calls']:>10}"
+              f"{result['completion_tokens']:>12}{result['cancelled']:>11.0f}{result['wasted']:>8.0f}"
+              f"{latency['p50'] * 1000:>7.0f}ms{latency['p95'] * 1000:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+LLM Gateway Benchmark
+Upstream calls and latency with every replica behind one shared gateway
+
+Simulates several app replicas, each with a few concurrent students, all
+sending completions through client.llm_gateway over a Unix socket (or
+HTTP with --http). Part of the traffic is identical and deterministic
+(temperature 0) across students, which the gateway may share; a sampled
+opening (also identical, but never shared) and unique turns make up the rest.
+Compares against each replica calling the upstream directly, and prints
+the gateway's per-replica usage from /usage.
+
+The upstream is benchmarks.mocks.MockUpstream, so no API key is needed.
+
+Usage:
+    python -m benchmarks.llm_gateway
+    python -m benchmarks.llm_gateway --replicas 4 --students 8 --turns 6 --error-rate 0.1
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from client.llm_gateway import LLMGateway, start_gateway
+from client.transports import GatewayTransport, gateway_connection
+from utils.timing import summarize
+
+from benchmarks.mocks import MockUpstream
+
+CHARACTERS = ["Batman", "Wednesday Addams", "Spider-Man"]
+
+
+def requests_for(student: int, turns: int) -> List[Dict]:
+    """
+    A deterministic request and a sampled opening metaphor (both identical
+    for everyone with the same character), then unique turns.
+    """
+    character = CHARACTERS[student % len(CHARACTERS)]
+    shared = {"model": "gpt-4o-mini", "temperature": 0, "max_tokens": 200, "messages": [
+        {"role": "system", "content": f"Summarize how {character} explains ArrayLists."},
+        {"role": "user", "content": "In two sentences."},
+    ]}
+    opening = {"model": "gpt-4o-mini", "temperature": 0.7, "max_tokens": 400, "messages": [
+        {"role": "system", "content": f"You are {character}, explaining ArrayLists."},
+        {"role": "user", "content": "Give me an opening metaphor."},
+    ]}
+    return [shared, opening] + [{"model": "gpt-4o-mini", "temperature": 0.9, "max_tokens": 300, "messages": [
+        {"role": "system", "content": f"You are {character}, explaining ArrayLists."},
+        {"role": "user", "content": f"Student {student}, turn {turn}: it's like a backpack."},
+    ]} for turn in range(turns)]
+
+
+def run(transports: List, students: int, turns: int, stream: bool) -> Dict[str, object]:
+    """Every replica runs `students` concurrent students; returns latencies and failures."""
+    latencies: List[float] = []
+    failures = [0]
+    lock = threading.Lock()
+
+    def student(transport, index: int):
+        for request in requests_for(index, turns):
+            start = time.perf_counter()
+            try:
+                if stream:
+                    transport.stream(request, lambda delta: None)
+                else:
+                    transport.complete(request)
+            except Exception:
+                with lock:
+                    failures[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=student, args=(transport, r * students + s))
+               for r, transport in enumerate(transports) for s in range(students)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'latency': summarize(latencies), 'failures': failures[0],
+            'elapsed': time.perf_counter() - start}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the shared LLM gateway.")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--students", type=int, default=6, help="Concurrent students per replica")
+    parser.add_argument("--turns", type=int, default=4, help="Unique turns per student")
+    parser.add_argument("--latency", type=float, default=0.3, help="Upstream latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.05,
+                        help="Fraction of upstream calls that fail with a 503")
+    parser.add_argument("--http", action="store_true", help="Use TCP instead of a Unix socket")
+    parser.add_argument("--no-stream", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stream = not args.no_stream
+    total = args.replicas * args.students * (args.turns + 2)
+
+    # Each replica on its own: no sharing, no retries
+    direct = MockUpstream(latency=args.latency, error_rate=args.error_rate, seed=1)
+    direct_result = run([direct] * args.replicas, args.students, args.turns, stream)
+
+    upstream = MockUpstream(latency=args.latency, error_rate=args.error_rate, seed=1)
+    gateway = LLMGateway(upstream, rpm=100_000, tpm=10_000_000)
+    if args.http:
+        url = "http://127.0.0.1:0"
+        server = start_gateway(gateway, url)
+        url = "http://%s:%d" % server.server_address
+    else:
+        url = "unix://" + os.path.join(tempfile.mkdtemp(), "gateway.sock")
+        server = start_gateway(gateway, url)
+    transports = [GatewayTransport(url, replica=f"replica-{r}") for r in range(args.replicas)]
+    gateway_result = run(transports, args.students, args.turns, stream)
+
+    print(f"{args.replicas} replicas x {args.students} students, {total} requests, "
+          f"{'streamed' if stream else 'complete'}, {args.error_rate:.0%} upstream errors\n")
+    print(f"{'':<10}{'upstream':>10}{'failed':>8}{'p50':>9}{'p95':>9}{'wall':>8}")
+    for name, calls, result in (("direct", direct.calls, direct_result),
+                                ("gateway", upstream.calls, gateway_result)):
+        print(f"{name:<10}{calls:>10}{result['failures']:>8}"
+              f"{result['latency']['p50'] * 1000:>7.0f}ms{result['latency']['p95'] * 1000:>7.0f}ms"
+              f"{result['elapsed']:>7.1f}s")
+
+    conn = gateway_connection(url, timeout=5)
+    conn.request("GET", "/usage")
+    usage = json.loads(conn.getresponse().read())["replicas"]
+    conn.close()
+    print(f"\n{'replica':<12}{'requests':>10}{'upstream':>10}{'cached':>8}{'coalesced':>11}"
+          f"{'retries':>9}{'errors':>8}{'tokens':>9}")
+    for replica, totals in sorted(usage.items()):
+        tokens = totals['prompt_tokens'] + totals['completion_tokens']
+        print(f"{replica:<12}{totals['requests']:>10}{totals['upstream']:>10}{totals['cached']:>8}"
+              f"{totals['coalesced']:>11}{totals['retries']:>9}{totals['errors']:>8}{tokens:>9}")
+
+    server.shutdown()
+    if not args.http:
+        os.unlink(url[len("unix://"):])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+LLM Scheduler Benchmark
+Turn latency under a saturated LLM concurrency cap, FIFO vs deadline-aware
+fair scheduling
+
+Students at different points in their 10-minute session take turns
+against the real TutorSession, all sharing one LLMScheduler with a small
+concurrency cap. One extra student fires messages from several threads
+at once. Reports turn latency for students in their last minute, the
+rest, and the rapid-fire student, with the scheduler in FIFO mode and in
+its normal mode.
+
+Usage:
+    python -m benchmarks.llm_scheduler
+    python -m benchmarks.llm_scheduler --students 30 --cap 4 --llm-latency 0.5
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from client.scheduler import LLMScheduler
+from tutor_flow.session import NullStorage, TutorSession
+from utils.config import SESSION_DURATION
+from utils.timing import summarize
+
+from benchmarks.mocks import MockLLM
+
+REPLIES = [
+    "It reminds me of packing for a trip and running out of room in my bag.",
+    "Can you explain that again?",
+    "What does O(n) mean here?",
+    "Why double the capacity instead of adding one slot?",
+]
+
+GROUPS = ("last minute", "others", "rapid-fire")
+
+
+def run(args: argparse.Namespace, fifo: bool) -> Dict[str, Dict[str, float]]:
+    llm = MockLLM(median_latency=args.llm_latency, tail_factor=0.2, seed=args.seed)
+    scheduler = LLMScheduler(llm, max_concurrent=args.cap, fifo=fifo)
+    rng = random.Random(args.seed)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.duration
+
+    def record(group: str, seconds: float):
+        with lock:
+            latencies[group].append(seconds)
+
+    def student(index: int):
+        # Spread students over the session; every fifth is in its last minute
+        elapsed = SESSION_DURATION - rng.uniform(10, 50) if index % 5 == 0 \
+            else rng.uniform(0, SESSION_DURATION - 120)
+        group = "last minute" if index % 5 == 0 else "others"
+        tutor = TutorSession.start(f"student{index}", 'arraylist', 3, scheduler, NullStorage())
+        tutor.state.start_time = time.time() - elapsed
+        turn = 0
+        while time.perf_counter() < stop:
+            time.sleep(rng.uniform(0, args.think_time))
+            start = time.perf_counter()
+            tutor.handle_user_message(REPLIES[turn % len(REPLIES)])
+            record(group, time.perf_counter() - start)
+            turn += 1
+
+    def rapid_fire(llm_view):
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            llm_view.generate_response(system_prompt="You are a tutor.", user_message="??")
+            record("rapid-fire", time.perf_counter() - start)
+
+    # The rapid-fire student has just started, so the deadline alone wouldn't hold it back
+    spammer = scheduler.for_student("spammer", lambda: time.time() + SESSION_DURATION - 30)
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(args.students)]
+    threads += [threading.Thread(target=rapid_fire, args=(spammer,))
+                for _ in range(args.rapid_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {group: summarize(latencies[group]) for group in GROUPS}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark LLM request scheduling.")
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--cap", type=int, default=4, help="LLM calls in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Median LLM latency (s)")
+    parser.add_argument("--think-time", type=float, default=2.0,
+                        help="Max pause between a student's turns (s)")
+    parser.add_argument("--rapid-threads", type=int, default=4,
+                        help="Concurrent messages from the rapid-fire student")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{args.students} students + 1 rapid-fire ({args.rapid_threads} threads), "
+          f"cap {args.cap}, LLM ~{args.llm_latency * 1000:.0f}ms\n")
+    print(f"{'policy':<10}{'group':<14}{'turns':>7}{'p50':>9}{'p95':>9}{'max':>9}")
+    for name, fifo in (("fifo", True), ("deadline", False)):
+        for group, stats in run(args, fifo).items():
+            print(f"{name:<10}{group:<14}{stats['count']:>7}{stats['p50'] * 1000:>7.0f}ms"
+                  f"{stats['p95'] * 1000:>7.0f}ms{stats['max'] * 1000:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Load Generator
+Simulates N concurrent students end to end against the real session engine
+
+Each simulated student logs in, starts a session (picking a character in
+condition 1), takes scaffold turns, submits the quiz and the survey. The
+tutoring code is the app's own TutorSession; only the LLM and storage are
+mocked, with configurable latency.
+
+Usage:
+    python -m benchmarks.load_generator --students 60 --out results.json
+    python -m benchmarks.load_generator --students 60 --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from characters import get_all_character_names
+from content.static_quiz import get_quiz, label_quiz_answers, score_quiz
+from content.survey import (SURVEY_QUESTIONS, CHARACTER_SPECIFIC_QUESTIONS, label_survey_responses,
+                            validate_survey_complete)
+from tutor_flow.session import TutorSession
+from utils.timing import summarize
+
+from benchmarks.mocks import MockLLM, InMemoryStorage
+
+
+# One reply per scaffold step; each one advances the flow
+SCRIPTED_REPLIES = [
+    "It reminds me of packing for a trip and running out of room in my bag.",
+    "Yes, I'm ready to see the code.",
+    "Okay that makes sense, copying everything over is expensive.",
+    "We would have to move all 1000 items into the new array.",
+    "I think you set internalArray = newArray after the copy loop.",
+    "Knowing the resize cost helps me pick a good initial capacity.",
+]
+
+# Mix of advancing and non-advancing replies for randomized paths
+RANDOM_REPLIES = SCRIPTED_REPLIES + [
+    "hmm",
+    "Can you explain that again?",
+    "What does O(n) mean here?",
+    "I'm not sure I follow the copy part.",
+    "Why double the capacity instead of adding one slot?",
+]
+
+STAGES = ['login', 'session_start', 'character_select', 'turn', 'turn.prompt_build',
+          'turn.llm', 'quiz', 'survey']
+
+
+class LoadRun:
+    """One load-test run: simulated students plus the samples they produce."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.llm = MockLLM(
+            median_latency=args.llm_latency,
+            tail_factor=args.llm_tail,
+            error_rate=args.llm_error_rate,
+            seed=args.seed,
+        )
+        self.storage = InMemoryStorage(latency=args.db_latency, login_latency=args.login_latency)
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.turns = 0
+        self.completed = 0
+
+    async def timed(self, stage: str, fn, *args):
+        """Run a blocking stage in a worker thread and record its latency."""
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception:
+            self.errors[stage] += 1
+            raise
+        finally:
+            self.samples[stage].append(time.perf_counter() - start)
+
+    # -------- Stages that live in the app's callbacks --------
+
+    def submit_quiz(self, user_id: str, topic: str, answers: Dict[int, int]):
+        score, total, _ = score_quiz(topic, answers)
+        self.storage.save_quiz_responses(user_id, topic, label_quiz_answers(topic, answers),
+                                         score, total)
+
+    def submit_survey(self, session: TutorSession, responses: Dict):
+        is_complete, missing = validate_survey_complete(responses)
+        if not is_complete:
+            raise ValueError(f"Survey incomplete ({missing} missing)")
+        user_id, topic = session.state.user_id, session.state.session_id
+        session.flush()
+        self.storage.save_survey_responses(user_id, topic, label_survey_responses(responses))
+        self.storage.complete_session(user_id, topic)
+
+    # -------- Student --------
+
+    def _survey_responses(self, rng: random.Random, condition: int) -> Dict:
+        questions = dict(SURVEY_QUESTIONS)
+        if condition == 1:
+            questions.update(CHARACTER_SPECIFIC_QUESTIONS)
+
+        responses = {}
+        for key, q_data in questions.items():
+            if q_data['type'] == 'text':
+                responses[key] = "Simulated free-text answer."
+            else:
+                responses[key] = rng.randrange(len(q_data['options']))
+        return responses
+
+    async def simulate_student(self, index: int):
+        args = self.args
+        rng = random.Random(args.seed * 100_003 + index)
+        condition = args.conditions[index % len(args.conditions)]
+
+        # Stagger arrivals over the ramp-up window
+        await asyncio.sleep(rng.uniform(0, args.ramp_up))
+
+        try:
+            login = await self.timed('login', self.storage.authenticate,
+                                     f"student{index}@loadtest.local", "password")
+            user_id = login['localId']
+
+            session = await self.timed('session_start', TutorSession.start,
+                                       user_id, args.topic, condition, self.llm, self.storage)
+            if session.needs_character:
+                await self.timed('character_select', session.choose_character,
+                                 rng.choice(get_all_character_names()))
+
+            if args.path == 'scripted':
+                replies = SCRIPTED_REPLIES[:args.turns]
+            else:
+                replies = [rng.choice(RANDOM_REPLIES) for _ in range(args.turns)]
+
+            for reply in replies:
+                await asyncio.sleep(args.think_time * rng.uniform(0.5, 1.5))
+                result = await self.timed('turn', session.handle_user_message, reply)
+                for stage, seconds in result.timings.items():
+                    self.samples[f"turn.{stage}"].append(seconds)
+                self.turns += 1
+
+            answers = {i: rng.randrange(len(q.options)) for i, q in enumerate(get_quiz(args.topic))}
+            await self.timed('quiz', self.submit_quiz, user_id, args.topic, answers)
+
+            await self.timed('survey', self.submit_survey, session,
+                             self._survey_responses(rng, condition))
+            self.completed += 1
+
+        except Exception as e:
+            if args.verbose:
+                print(f"student {index}: {e}", file=sys.stderr)
+
+    async def run(self) -> Dict:
+        loop = asyncio.get_running_loop()
+        # Every student can be blocked in a stage at once
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.args.students + 8))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.simulate_student(i) for i in range(self.args.students)))
+        wall = time.perf_counter() - start
+
+        return self.results(wall)
+
+    def results(self, wall: float) -> Dict:
+        return {
+            'config': {k: v for k, v in vars(self.args).items()
+                       if k not in ('out', 'baseline', 'verbose')},
+            'timestamp': time.time(),
+            'wall_seconds': wall,
+            'students_completed': self.completed,
+            'throughput': {
+                'turns_per_second': self.turns / wall if wall else 0.0,
+                'students_per_minute': self.completed / wall * 60 if wall else 0.0,
+                'llm_calls': self.llm.calls,
+                'db_writes': self.storage.writes,
+            },
+            'stages': {stage: summarize(self.samples[stage])
+                       for stage in STAGES if self.samples.get(stage)},
+            'errors': dict(self.errors),
+        }
+
+
+def print_report(results: Dict, baseline: Dict = None):
+    """Print per-stage percentiles, with p95 deltas against a baseline run."""
+    print(f"\nStudents completed: {results['students_completed']}/{results['config']['students']}"
+          f"  wall={results['wall_seconds']:.1f}s")
+    tp = results['throughput']
+    print(f"Throughput: {tp['turns_per_second']:.2f} turns/s, "
+          f"{tp['students_per_minute']:.1f} students/min, "
+          f"{tp['llm_calls']} LLM calls, {tp['db_writes']} DB writes\n")
+
+    header = f"{'stage (ms)':<18}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    if baseline:
+        header += f"{'Δp95':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for stage, s in results['stages'].items():
+        line = (f"{stage:<18}{s['count']:>6}{s['p50'] * 1000:>9.0f}{s['p95'] * 1000:>9.0f}"
+                f"{s['p99'] * 1000:>9.0f}{s['max'] * 1000:>9.0f}")
+        if baseline and stage in baseline.get('stages', {}):
+            old = baseline['stages'][stage]['p95']
+            delta = (s['p95'] - old) / old * 100 if old else 0.0
+            line += f"{delta:>+9.1f}%"
+        print(line)
+
+    if results['errors']:
+        print(f"\nErrors: {results['errors']}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate concurrent students end to end.")
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--conditions', type=int, nargs='+', default=[1, 2, 3], choices=[1, 2, 3])
+    parser.add_argument('--topic', default='arraylist', choices=['arraylist', 'recursion'])
+    parser.add_argument('--path', default='scripted', choices=['scripted', 'random'])
+    parser.add_argument('--turns', type=int, default=6)
+    parser.add_argument('--think-time', type=float, default=2.0,
+                        help="Mean seconds a student waits before each message")
+    parser.add_argument('--ramp-up', type=float, default=5.0,
+                        help="Seconds over which students arrive")
+    parser.add_argument('--llm-latency', type=float, default=1.5, help="Median LLM latency (s)")
+    parser.add_argument('--llm-tail', type=float, default=0.5, help="Log-normal sigma of LLM latency")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--db-latency', type=float, default=0.05, help="Per round trip (s)")
+    parser.add_argument('--login-latency', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help="Write results JSON here")
+    parser.add_argument('--baseline', help="Compare against an earlier results JSON")
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(LoadRun(args).run())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Benchmark Mocks
+Stand-in LLM and storage backends for driving the real tutoring code headlessly
+"""
+
+import copy
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+class MockLLM:
+    """
+    Drop-in for SimpleAIClient that sleeps for a simulated latency and
+    returns a canned reply. Latency is log-normal-ish: a median with a
+    configurable tail, plus an optional error rate.
+    """
+
+    def __init__(self, median_latency: float = 1.5, tail_factor: float = 0.5,
+                 error_rate: float = 0.0, reply_words: int = 90, seed: Optional[int] = None):
+        self.median_latency = median_latency
+        self.tail_factor = tail_factor
+        self.error_rate = error_rate
+        self.reply_words = reply_words
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _sample_latency(self) -> float:
+        with self._lock:
+            return self.median_latency * self._rng.lognormvariate(0, self.tail_factor)
+
+    def generate_response(self, system_prompt: str, user_message: str,
+                          conversation_history: Optional[List[Dict]] = None,
+                          temperature: float = 0.9, max_tokens: int = 500,
+                          stop: Optional[List[str]] = None) -> str:
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(system_prompt) + len(user_message) + sum(
+                len(m['content']) for m in conversation_history or [])
+            fail = self._rng.random() < self.error_rate
+
+        time.sleep(self._sample_latency())
+
+        if fail:
+            raise Exception("OpenAI API call failed: simulated error")
+
+        return " ".join(["Mock tutor reply."] + ["word"] * min(self.reply_words, max_tokens))
+
+
+class InMemoryStorage:
+    """
+    In-memory stand-in for utils.database with simulated round-trip latency.
+
+    Implements the functions the app calls during a session, keeping the
+    same read-modify-write shape as the Firebase versions.
+    """
+
+    def __init__(self, latency: float = 0.05, login_latency: float = 0.3):
+        self.latency = latency
+        self.login_latency = login_latency
+        self.users: Dict[str, Dict] = defaultdict(lambda: {'sessions': {}})
+        self._lock = threading.Lock()
+        self.writes = 0
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _session(self, user_id: str, session_id: str) -> Dict:
+        return self.users[user_id]['sessions'].setdefault(session_id, {})
+
+    # -------- Auth --------
+
+    def authenticate(self, email: str, password: str) -> Dict:
+        """Simulated Firebase REST login."""
+        time.sleep(self.login_latency)
+        return {'localId': email.split('@')[0], 'email': email}
+
+    # -------- Writes --------
+
+    def save_session_start(self, user_id: str, session_id: str, condition: int):
+        self._round_trip()
+        with self._lock:
+            self.writes += 1
+            self._session(user_id, session_id).update({
+                'status': 'in_progress',
+                'start_time': time.time(),
+                'condition': condition,
+                'messages': [],
+                'scaffold_progress': [],
+                'snapshot': None
+            })
+
+    def save_message(self, user_id: str, session_id: str, role: str, content: str,
+                     step: Optional[str] = None, degraded: Optional[str] = None,
+                     generation: Optional[Dict] = None):
+        self._round_trip()  # read
+        message = {'role': role, 'content': content, 'timestamp': time.time()}
+        if step:
+            message['step'] = step
+        if degraded:
+            message['degraded'] = degraded
+        if generation:
+            message['generation'] = generation
+        self._round_trip()  # write
+        with self._lock:
+            self.writes += 1
+            self._session(user_id, session_id).setdefault('messages', []).append(message)
+
+    def save_scaffold_progress(self, user_id: str, session_id: str, step: str):
+        self._round_trip()
+        self._round_trip()
+        with self._lock:
+            self.writes += 1
+            self._session(user_id, session_id).setdefault('scaffold_progress', []).append(
+                {'step': step, 'timestamp': time.time()})
+
+    def save_snapshot(self, user_id: str, session_id: str, updates: Dict):
+        self._round_trip()
+        with self._lock:
+            self.writes += 1
+            session = self._session(user_id, session_id)
+            if session.get('snapshot') is None:
+                session['snapshot'] = {}
+            for path, value in updates.items():
+                node = session['snapshot']
+                *parents, key = path.split('/')
+                for parent in parents:
+                    node = node.setdefault(parent, {})
+                node[key] = value
+
+    def save_quiz_responses(self, user_id: str, session_id: str, responses: Dict,
+                            score: int, total: int):
+        self._round_trip()
+        with self._lock:
+            self.writes += 1
+            self._session(user_id, session_id).update({
+                'quiz_responses': responses,
+                'quiz_score': score,
+                'quiz_total': total,
+                'quiz_completed_time': time.time()
+            })
+
+    def save_survey_responses(self, user_id: str, session_id: str, responses: Dict):
+        self._round_trip()
+        with self._lock:
+            self.writes += 1
+            self._session(user_id, session_id).update({
+                'survey_responses': responses,
+                'survey_completed_time': time.time()
+            })
+
+    def complete_session(self, user_id: str, session_id: str):
+        self._round_trip()  # read
+        self._round_trip()  # write
+        with self._lock:
+            self.writes += 1
+            session = self._session(user_id, session_id)
+            messages = session.get('messages', [])
+            session.update({
+                'status': 'completed',
+                'end_time': time.time(),
+                'total_messages': len(messages),
+            })
+
+    # -------- Reads --------
+
+    def load_snapshot(self, user_id: str, session_id: str) -> Optional[Dict]:
+        self._round_trip()
+        with self._lock:
+            snapshot = self.users[user_id]['sessions'].get(session_id, {}).get('snapshot')
+            return copy.deepcopy(snapshot)
+
+    def get_session_status(self, user_id: str, session_id: str) -> str:
+        self._round_trip()
+        with self._lock:
+            return self.users[user_id]['sessions'].get(session_id, {}).get('status', 'not_started')
+
+
+class MockUpstreamError(Exception):
+    """Transient upstream failure, carrying a status code like openai's APIStatusError."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Simulated upstream error {status_code}")
+        self.status_code = status_code
+
+
+class MockUpstream:
+    """
+    Stand-in for client.transports.OpenAITransport behind the LLM gateway:
+    simulated latency, streamed in a few chunks, with an optional rate of
+    transient (retryable) failures.
+    """
+
+    def __init__(self, latency: float = 0.3, error_rate: float = 0.0, reply_words: int = 90,
+                 chunks: int = 6, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.reply_words = reply_words
+        self.chunks = chunks
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.output_chars = 0
+
+    def _start(self, request: Dict) -> str:
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.failures += 1
+        if fail:
+            time.sleep(self.latency / 4)
+            raise MockUpstreamError(503)
+        content = " ".join(["Mock tutor reply."] + ["word"] * self.reply_words)
+        # Cut off at max_tokens (~4 characters each), like the real API
+        limit = request.get("max_tokens")
+        return content[:limit * 4] if limit else content
+
+    def _completion(self, request: Dict, content: str):
+        from client.transports import Completion
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        limit = request.get("max_tokens")
+        cut_off = bool(limit) and len(content) >= limit * 4
+        return Completion(content=content, prompt_tokens=prompt_chars // 4,
+                          completion_tokens=len(content) // 4,
+                          finish_reason="length" if cut_off else "stop")
+
+    def complete(self, request: Dict, timeout: Optional[float] = None):
+        content = self._start(request)
+        time.sleep(self.latency)
+        with self._lock:
+            self.output_chars += len(content)
+        return self._completion(request, content)
+
+    def stream(self, request: Dict, on_delta, timeout: Optional[float] = None):
+        content = self._start(request)
+        size = -(-len(content) // self.chunks)
+        for i in range(0, len(content), size):
+            time.sleep(self.latency / self.chunks)
+            with self._lock:
+                self.output_chars += len(content[i:i + size])
+            # A cancelled generation raises here and generates nothing more
+            on_delta(content[i:i + size])
+        return self._completion(request, content)
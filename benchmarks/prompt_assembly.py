@@ -0,0 +1,94 @@
+"""
+Prompt Assembly Benchmark
+Per-turn cost of building the scaffolded system prompt
+
+Compares rendering the prompt from scratch each turn (topic lookup by name,
+str.format of the instruction blocks, Character.get_system_prompt) with the
+pre-rendered PROMPT_TEMPLATES prefixes, and checks both produce the same text.
+
+Usage:
+    python -m benchmarks.prompt_assembly
+    python -m benchmarks.prompt_assembly --repeat 5000 --context 5
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from characters import get_all_character_names, get_character
+from content.research_topics import RESEARCH_TOPICS
+from tutor_flow.prompt_templates import PROMPT_TEMPLATES, TUTOR_NAME, TurnPrompt, split_turn
+from tutor_flow.step_guide import StepGuide
+from tutor_flow.steps import ScaffoldStep
+from tutor_flow.transcript import Transcript
+
+Case = Tuple[str, ScaffoldStep, Optional[str], List[Dict[str, str]]]
+
+
+def render_from_scratch(topic_key: str, step: ScaffoldStep, character_name: Optional[str],
+                        window: List[Dict[str, str]]) -> TurnPrompt:
+    """How a turn's prompt was built before the template registry."""
+    topic = RESEARCH_TOPICS[topic_key]
+    if character_name:
+        system = get_character(character_name).get_system_prompt(topic.name)
+    else:
+        system = f"You are a helpful CS tutor teaching {topic.name}."
+    # Callers passed topic.name, so the lookup fell through to the name scan
+    system += "\n\n" + StepGuide.get_response_prompt(TUTOR_NAME, topic.name, step)
+    history, user_message = split_turn(window)
+    return TurnPrompt(system, history, user_message)
+
+
+def render_from_templates(topic_key: str, step: ScaffoldStep, character_name: Optional[str],
+                          window: List[Dict[str, str]]) -> TurnPrompt:
+    return PROMPT_TEMPLATES.build_turn(topic_key, step, character_name, window)
+
+
+def build_cases(context: int) -> List[Case]:
+    """Every topic x step x persona, each with `context` messages ending in the student's."""
+    cases = []
+    for topic_key in RESEARCH_TOPICS:
+        for step in ScaffoldStep:
+            transcript = Transcript()
+            for i in range(context - 1):
+                transcript.append("assistant" if (context - i) % 2 == 0 else "user",
+                                  f"Message {i} about {topic_key}. " * 8, step)
+            transcript.append("user", "I think it copies everything into the new array?", step)
+            window = transcript.chat()
+            for character_name in [None] + get_all_character_names():
+                cases.append((topic_key, step, character_name, window))
+    return cases
+
+
+def time_per_call(fn: Callable, cases: List[Case], repeat: int) -> float:
+    """Mean microseconds per prompt."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            fn(*case)
+    return (time.perf_counter() - start) / (repeat * len(cases)) * 1e6
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark scaffolded prompt assembly.")
+    parser.add_argument("--repeat", type=int, default=500, help="Passes over all combinations")
+    parser.add_argument("--context", type=int, default=5, help="Recent messages per prompt")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cases = build_cases(args.context)
+
+    mismatches = sum(render_from_scratch(*c) != render_from_templates(*c) for c in cases)
+    print(f"{len(cases)} topic x step x persona combinations, "
+          f"{len(PROMPT_TEMPLATES)} cached fragments, {mismatches} mismatched prompts\n")
+
+    scratch = time_per_call(render_from_scratch, cases, args.repeat)
+    templated = time_per_call(render_from_templates, cases, args.repeat)
+    print(f"{'from scratch':<16}{scratch:>8.2f} µs/prompt")
+    print(f"{'templates':<16}{templated:>8.2f} µs/prompt  ({scratch / templated:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
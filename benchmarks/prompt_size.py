@@ -0,0 +1,116 @@
+"""
+Prompt Size Report
+Estimated tokens per scaffolded turn, before and after de-duplicating context
+
+Before: the recent messages went to the model twice, once as text inside
+the system prompt (legacy_context below) and once as chat history, and
+the student's message appeared both in the prompt and as the user message.
+After: PromptTemplates.build_turn sends each message exactly once.
+
+Usage:
+    python -m benchmarks.prompt_size
+    python -m benchmarks.prompt_size --context 5 --tutor-words 120 --character Batman
+"""
+
+import argparse
+from typing import Optional
+
+from characters import get_all_character_names
+from content.research_topics import RESEARCH_TOPICS
+from tutor_flow.context import message_tokens
+from tutor_flow.prompt_templates import PROMPT_TEMPLATES, TUTOR_NAME, TurnPrompt
+from tutor_flow.step_guide import StepGuide
+from tutor_flow.steps import ScaffoldStep
+from tutor_flow.transcript import Transcript
+
+LEGACY_CLOSING = (
+    "Now respond as the tutor. Keep your reply under 150 words, "
+    "be clear and encouraging, and stay tightly focused on this stage."
+)
+
+
+def legacy_context(window: Transcript) -> str:
+    """The recent messages as the old system prompt quoted them."""
+    lines = []
+    for m in window:
+        prefix = "Student" if m.role == "user" else "Tutor"
+        lines.append(f"{prefix} ({m.step.value}): {m.content}")
+    return "\n".join(lines) if lines else "No recent context."
+
+
+def legacy_turn(topic_key: str, step: ScaffoldStep, character_name: Optional[str],
+                window: Transcript) -> TurnPrompt:
+    """The scaffolded turn as it was sent before build_turn."""
+    topic = RESEARCH_TOPICS[topic_key]
+    user_message = window[-1].content
+    system = (
+        PROMPT_TEMPLATES.system_prompt(topic_key, character_name) + "\n\n"
+        f"You are {TUTOR_NAME} teaching {topic.name}.\n"
+        f"Current scaffold stage: {step.value}.\n\n"
+        f"INSTRUCTIONS:\n{StepGuide.get_step_instructions(topic_key, step)}\n\n"
+        "Recent conversation context:\n"
+        f"{legacy_context(window)}\n\n"
+        f"Student just said:\n\"{user_message}\"\n\n"
+        f"{LEGACY_CLOSING}"
+    )
+    history = [{'role': m.role, 'content': m.content} for m in window[:-1]]
+    return TurnPrompt(system, history, user_message)
+
+
+def prompt_tokens(prompt: TurnPrompt) -> int:
+    """Estimated prompt tokens, counting per-message overhead."""
+    return (message_tokens(prompt.system_prompt) + message_tokens(prompt.user_message)
+            + sum(message_tokens(m['content']) for m in prompt.history))
+
+
+def sample_window(step: ScaffoldStep, context: int, tutor_words: int,
+                  student_words: int) -> Transcript:
+    """`context` alternating messages ending with the student's."""
+    window = Transcript()
+    for i in range(context):
+        from_student = (context - 1 - i) % 2 == 0
+        words = student_words if from_student else tutor_words
+        window.append("user" if from_student else "assistant",
+                      " ".join(["word"] * words), step)
+    return window
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare prompt sizes before/after de-duplication.")
+    parser.add_argument("--context", type=int, default=5, help="Messages in the context window")
+    parser.add_argument("--tutor-words", type=int, default=120)
+    parser.add_argument("--student-words", type=int, default=15)
+    parser.add_argument("--character", default=None, choices=get_all_character_names(),
+                        help="Condition 1 persona (default: condition 2 plain tutor)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    persona = args.character or "plain tutor (condition 2)"
+    print(f"Estimated tokens per turn, {args.context} context messages, {persona}\n")
+
+    header = f"{'topic':<12}{'step':<18}{'before':>8}{'after':>8}{'saved':>8}"
+    print(header)
+    print("-" * len(header))
+
+    total_before = total_after = 0
+    for topic_key in RESEARCH_TOPICS:
+        for step in ScaffoldStep:
+            window = sample_window(step, args.context, args.tutor_words, args.student_words)
+            before = prompt_tokens(legacy_turn(topic_key, step, args.character, window))
+            after = prompt_tokens(PROMPT_TEMPLATES.build_turn(topic_key, step, args.character,
+                                                              window.chat()))
+            total_before += before
+            total_after += after
+            print(f"{topic_key:<12}{step.value:<18}{before:>8}{after:>8}"
+                  f"{(before - after) / before * 100:>7.1f}%")
+
+    print("-" * len(header))
+    print(f"{'total':<30}{total_before:>8}{total_after:>8}"
+          f"{(total_before - total_after) / total_before * 100:>7.1f}%")
+    print("\nTokens are estimated at ~4 characters each (tutor_flow.context).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Transcript Replay
+Re-drives recorded student turns through the current scaffold flow
+
+Reads the detailed export (generate_detailed_csv_with_messages) as CSV, or
+the same rows as JSONL, and replays every student's user messages through
+TutorSession against a mock LLM. Reports turn latency, prompt sizes and
+step progressions, so two code versions can be compared on real traffic.
+
+Usage:
+    python -m benchmarks.replay research_data_detailed.csv --out replay_new.json
+    python -m benchmarks.replay research_data_detailed.csv --speed 0 --baseline replay_old.json
+"""
+
+import argparse
+import csv
+import json
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from tutor_flow.session import TutorSession
+from utils.timing import summarize
+
+from benchmarks.mocks import MockLLM, InMemoryStorage
+
+
+@dataclass
+class RecordedSession:
+    """One student's recorded conversation for one topic."""
+    user_id: str
+    topic: str
+    condition: int
+    rows: List[Dict] = field(default_factory=list)
+
+    def user_turns(self) -> List[Dict]:
+        """
+        User messages with their timestamp and the step the original run
+        was in when it answered (taken from the next assistant message).
+        """
+        turns = []
+        for i, row in enumerate(self.rows):
+            if row['role'] != 'user':
+                continue
+            recorded_step = None
+            for later in self.rows[i + 1:]:
+                if later['role'] == 'assistant':
+                    recorded_step = later.get('step') or None
+                    break
+            turns.append({
+                'content': row['content'],
+                'timestamp': _to_float(row.get('timestamp')),
+                'recorded_step': recorded_step,
+            })
+        return turns
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_sessions(path: str) -> List[RecordedSession]:
+    """Load a detailed export (CSV or JSONL) grouped into sessions."""
+    if path.endswith('.jsonl'):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    sessions: Dict[tuple, RecordedSession] = {}
+    for row in rows:
+        key = (row['user_id'], row['topic'])
+        if key not in sessions:
+            sessions[key] = RecordedSession(
+                user_id=row['user_id'],
+                topic=row['topic'],
+                condition=int(row.get('condition') or 0),
+            )
+        sessions[key].rows.append(row)
+
+    for session in sessions.values():
+        session.rows.sort(key=lambda r: int(r.get('message_number') or 0))
+
+    # Only sessions the current code knows how to run
+    return [s for s in sessions.values()
+            if s.condition in (1, 2, 3) and s.topic in ('arraylist', 'recursion')]
+
+
+class Replayer:
+    """Replays recorded sessions and collects per-turn measurements."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.llm = MockLLM(median_latency=args.llm_latency, tail_factor=args.llm_tail, seed=args.seed)
+        self.storage = InMemoryStorage(latency=args.db_latency, login_latency=0)
+        self.turn_latency: List[float] = []
+        self.llm_latency: List[float] = []
+        self.prompt_chars: List[float] = []
+        self.final_steps: Counter = Counter()
+        self.advances_per_session: List[float] = []
+        self.step_matches = 0
+        self.step_compared = 0
+
+    def replay_session(self, recorded: RecordedSession):
+        session = TutorSession.start(recorded.user_id, recorded.topic, recorded.condition,
+                                     self.llm, self.storage)
+        if session.needs_character:
+            session.choose_character(self.args.character)
+
+        advances = 0
+        previous_ts = None
+        for turn in recorded.user_turns():
+            # Recorded pacing, scaled by --speed (0 = no waiting)
+            if self.args.speed > 0 and previous_ts and turn['timestamp']:
+                time.sleep(max(0.0, turn['timestamp'] - previous_ts) / self.args.speed)
+            previous_ts = turn['timestamp']
+
+            start = time.perf_counter()
+            result = session.handle_user_message(turn['content'])
+            self.turn_latency.append(time.perf_counter() - start)
+            self.llm_latency.append(result.timings.get('llm', 0.0))
+            self.prompt_chars.append(result.prompt_chars)
+
+            if result.advanced:
+                advances += 1
+            if turn['recorded_step'] and result.step_after:
+                self.step_compared += 1
+                self.step_matches += turn['recorded_step'] == result.step_after
+
+        session.flush()
+        if session.state.scaffolded:
+            self.final_steps[session.state.flow.current_step.value] += 1
+            self.advances_per_session.append(advances)
+
+    def run(self, sessions: List[RecordedSession]) -> Dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.workers) as pool:
+            list(pool.map(self.replay_session, sessions))
+        wall = time.perf_counter() - start
+
+        return {
+            'code_version': _code_version(),
+            'source': self.args.source,
+            'timestamp': time.time(),
+            'sessions': len(sessions),
+            'turns': len(self.turn_latency),
+            'wall_seconds': wall,
+            'turn_latency': summarize(self.turn_latency),
+            'llm_latency': summarize(self.llm_latency),
+            'prompt_chars': summarize(self.prompt_chars),
+            'steps': {
+                'final_step_counts': dict(self.final_steps),
+                'advances_per_session': summarize(self.advances_per_session),
+                'agreement_with_recording': (self.step_matches / self.step_compared
+                                             if self.step_compared else None),
+            },
+        }
+
+
+def _code_version() -> Optional[str]:
+    """Short git revision of the code under test, if available."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    """Print the replay report, with changes against a baseline report."""
+    def delta(section: str, stat: str) -> str:
+        if not baseline:
+            return ""
+        old = baseline[section][stat]
+        new = report[section][stat]
+        return f"  ({(new - old) / old * 100:+.1f}%)" if old else ""
+
+    print(f"\nReplayed {report['sessions']} sessions / {report['turns']} turns "
+          f"at code version {report['code_version'] or 'unknown'}"
+          + (f" vs {baseline.get('code_version') or 'unknown'}" if baseline else ""))
+
+    for section, unit, scale in (('turn_latency', 'ms', 1000), ('llm_latency', 'ms', 1000),
+                                 ('prompt_chars', 'chars', 1)):
+        stats = report[section]
+        print(f"{section:<14} p50={stats['p50'] * scale:.0f}{unit}{delta(section, 'p50')}"
+              f"  p95={stats['p95'] * scale:.0f}{unit}{delta(section, 'p95')}"
+              f"  mean={stats['mean'] * scale:.0f}{unit}{delta(section, 'mean')}")
+
+    steps = report['steps']
+    print(f"final steps    {steps['final_step_counts']}")
+    if baseline:
+        print(f"  baseline     {baseline['steps']['final_step_counts']}")
+    print(f"advances/session mean={steps['advances_per_session']['mean']:.2f}")
+    if steps['agreement_with_recording'] is not None:
+        print(f"step agreement with recording: {steps['agreement_with_recording'] * 100:.1f}%")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay exported student transcripts.")
+    parser.add_argument('source', help="Detailed export (.csv or .jsonl)")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Pacing: 1 = recorded gaps, 10 = 10x faster, 0 = no waiting")
+    parser.add_argument('--workers', type=int, default=8, help="Sessions replayed concurrently")
+    parser.add_argument('--character', default='Batman', help="Tutor used for condition 1 sessions")
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--llm-tail', type=float, default=0.0)
+    parser.add_argument('--db-latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help="Write the report JSON here")
+    parser.add_argument('--baseline', help="Compare against an earlier report JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sessions = load_sessions(args.source)
+    if not sessions:
+        print(f"No replayable sessions in {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    report = Replayer(args).run(sessions)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(report, baseline)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
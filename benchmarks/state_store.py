@@ -0,0 +1,131 @@
+"""
+State Store Benchmark
+Cost of mirroring learner state per script run, and a replica hand-over check
+
+Runs sessions on "replica A", writes each student's record (phase, quiz
+fields and the full tutor snapshot) to a store after every turn, as the
+app does at the end of each script run, then rebuilds every session on
+"replica B" from the store alone and checks the transcripts line up.
+Compares the in-process store with RedisStateStore against the RESP
+stand-in server (utils.resp_server), or a real Redis via --url.
+
+Usage:
+    python -m benchmarks.state_store
+    python -m benchmarks.state_store --students 100 --turns 20 --url redis://localhost:6379/0
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from tutor_flow.session import NullStorage, TutorSession
+from utils.resp_server import start_server
+from utils.state_store import (
+    InProcessStateStore,
+    RedisStateStore,
+    RespClient,
+    StateStore,
+    learner_key,
+)
+from utils.timing import summarize
+
+from benchmarks.mocks import MockLLM
+
+REPLIES = [
+    "It reminds me of packing for a trip and running out of room in my bag.",
+    "Yes, I'm ready to see the code.",
+    "Okay that makes sense, copying everything over is expensive.",
+    "We would have to move all 1000 items into the new array.",
+]
+
+
+def record_for(tutor: TutorSession) -> Dict:
+    return {
+        'current_session_id': tutor.state.session_id,
+        'condition': tutor.state.condition,
+        'phase': 'learning',
+        'session_active': True,
+        'quiz_answers': {},
+        'tutor': tutor.snapshot(),
+    }
+
+
+def run(store: StateStore, students: int, turns: int) -> Dict[str, object]:
+    llm = MockLLM(median_latency=0, tail_factor=0, reply_words=90)
+    saves: List[float] = []
+    loads: List[float] = []
+    sizes: List[int] = []
+
+    # Replica A: sessions run and mirror their state after each turn
+    sessions = {}
+    for i in range(students):
+        user_id = f"student{i}"
+        tutor = TutorSession.start(user_id, 'arraylist', 2 if i % 2 else 3, llm, NullStorage())
+        for turn in range(turns):
+            tutor.handle_user_message(REPLIES[turn % len(REPLIES)])
+            record = record_for(tutor)
+            start = time.perf_counter()
+            store.set(learner_key(user_id), record)
+            saves.append(time.perf_counter() - start)
+        sizes.append(len(json.dumps(record)))
+        sessions[user_id] = tutor
+
+    # Replica B: rebuild every session from the store alone
+    mismatches = 0
+    for user_id, original in sessions.items():
+        start = time.perf_counter()
+        record = store.get(learner_key(user_id))
+        resumed = TutorSession.from_snapshot(user_id, record['current_session_id'],
+                                             record['condition'], record['tutor'],
+                                             llm, NullStorage())
+        loads.append(time.perf_counter() - start)
+        window = len(resumed.messages)
+        if resumed.transcript() != original.transcript()[-window:] \
+                or resumed.turns != original.turns:
+            mismatches += 1
+
+    return {
+        'save': summarize(saves),
+        'load': summarize(loads),
+        'record_bytes': sum(sizes) / len(sizes),
+        'mismatches': mismatches,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the shared session state store.")
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=15, help="Turns per student on replica A")
+    parser.add_argument("--url", default=None, help="Use this Redis instead of the stand-in")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = None
+    if args.url:
+        client = RespClient.from_url(args.url)
+    else:
+        server = start_server()
+        client = RespClient(*server.server_address)
+
+    stores = {'in-process': InProcessStateStore(), 'resp': RedisStateStore(client)}
+    print(f"{args.students} students x {args.turns} turns, "
+          f"{'Redis at ' + args.url if args.url else 'RESP stand-in'}\n")
+    print(f"{'store':<12}{'save p50':>10}{'save p95':>10}{'load p50':>10}"
+          f"{'record':>10}{'hand-over':>12}")
+    for name, store in stores.items():
+        result = run(store, args.students, args.turns)
+        status = "ok" if not result['mismatches'] else f"{result['mismatches']} bad"
+        print(f"{name:<12}{result['save']['p50'] * 1000:>8.2f}ms{result['save']['p95'] * 1000:>8.2f}ms"
+              f"{result['load']['p50'] * 1000:>8.2f}ms{result['record_bytes'] / 1024:>8.1f}KB"
+              f"{status:>12}")
+
+    client.close()
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
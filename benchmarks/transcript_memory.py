@@ -0,0 +1,143 @@
+"""
+Transcript Memory Benchmark
+Per-session memory and per-turn allocation of the conversation store
+
+Before: scaffolded sessions kept a list of ConversationMessage dataclasses
+(with a per-instance __dict__) and condition 3 a list of dicts, and every
+turn rebuilt a contents list and (role, content) pairs for the whole
+conversation to pick the context window. After: one slotted Transcript
+for both, whose ring buffer keeps the newest messages in chat format once
+the session has been prompted ("live"; a stored transcript has no ring).
+
+Usage:
+    python -m benchmarks.transcript_memory
+    python -m benchmarks.transcript_memory --sessions 500 --messages 80
+"""
+
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+from tutor_flow.context import clip_to_tokens, message_tokens
+from tutor_flow.steps import ScaffoldStep
+from tutor_flow.transcript import Transcript
+from utils.config import CONTEXT_TOKEN_BUDGET
+
+STEPS = list(ScaffoldStep)
+
+
+@dataclass
+class LegacyMessage:
+    """ConversationMessage as it was: a plain dataclass."""
+    role: str
+    content: str
+    step: ScaffoldStep
+    timestamp: float = field(default_factory=time.time)
+
+
+def legacy_window(messages: List[LegacyMessage], budget: int):
+    """The old per-turn context selection, for comparison."""
+    contents = [m.content for m in messages]
+    used, start = 0, len(contents)
+    for i in range(len(contents) - 1, -1, -1):
+        cost = message_tokens(contents[i])
+        if start < len(contents) and used + cost > budget:
+            break
+        used += cost
+        start = i
+    pairs = [(m.role, m.content) for m in messages]  # handed to the summary check
+    window = [{'role': m.role, 'content': clip_to_tokens(m.content, budget)}
+              for m in messages[start:]]
+    return start, window, pairs
+
+
+def message_text(i: int) -> str:
+    # Built per message, like text arriving from the model or the browser
+    return "".join(["word "] * (15 if i % 2 else 90)) + str(i)
+
+
+def fill_legacy(messages: int):
+    session = []
+    for i in range(messages):
+        session.append(LegacyMessage("user" if i % 2 else "assistant",
+                                     message_text(i), STEPS[i * len(STEPS) // messages]))
+    return session
+
+
+def fill_direct(messages: int):
+    return [{'role': "user" if i % 2 else "assistant", 'content': message_text(i),
+             'timestamp': time.time()} for i in range(messages)]
+
+
+def fill_transcript(messages: int, live: bool = False):
+    session = Transcript()
+    for i in range(messages):
+        session.append("user" if i % 2 else "assistant",
+                       message_text(i), STEPS[i * len(STEPS) // messages])
+    if live:
+        session.window(CONTEXT_TOKEN_BUDGET)  # Allocates the ring, as the first turn does
+    return session
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Bytes still allocated after building (and keeping) the result."""
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def turn_cost(select: Callable[[], object], repeat: int):
+    """(peak bytes allocated by one call, mean µs per call)."""
+    tracemalloc.start()
+    select()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        select()
+    return peak, (time.perf_counter() - start) / repeat * 1e6
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare transcript memory and per-turn allocation.")
+    parser.add_argument("--sessions", type=int, default=300, help="Live sessions in the process")
+    parser.add_argument("--messages", type=int, default=60, help="Messages per session")
+    parser.add_argument("--repeat", type=int, default=2000, help="Window selections to time")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{args.sessions} sessions x {args.messages} messages, "
+          f"{CONTEXT_TOKEN_BUDGET}-token context budget\n")
+
+    # Message text is identical in both layouts, so count it once and compare the rest
+    text = measure(lambda: [[message_text(i) for i in range(args.messages)]
+                            for _ in range(args.sessions)])
+    stored = measure(lambda: [fill_transcript(args.messages) for _ in range(args.sessions)]) - text
+    live = measure(lambda: [fill_transcript(args.messages, live=True)
+                            for _ in range(args.sessions)]) - text
+    print("Store overhead per session (excluding message text)")
+    for label, fill in (("dataclass list", fill_legacy), ("dict list (cond. 3)", fill_direct)):
+        legacy = measure(lambda: [fill(args.messages) for _ in range(args.sessions)]) - text
+        print(f"  {label:<20}{legacy / args.sessions / 1024:>8.1f} KiB")
+    print(f"  {'Transcript, stored':<20}{stored / args.sessions / 1024:>8.1f} KiB")
+    print(f"  {'Transcript, live':<20}{live / args.sessions / 1024:>8.1f} KiB")
+    print()
+
+    old_session, new_session = fill_legacy(args.messages), fill_transcript(args.messages, live=True)
+    old_peak, old_us = turn_cost(lambda: legacy_window(old_session, CONTEXT_TOKEN_BUDGET), args.repeat)
+    new_peak, new_us = turn_cost(lambda: new_session.window(CONTEXT_TOKEN_BUDGET), args.repeat)
+    print("Context window selection per turn")
+    print(f"  {'rebuild per turn':<20}{old_peak / 1024:>8.1f} KiB{old_us:>9.2f} µs")
+    print(f"  {'Transcript.window':<20}{new_peak / 1024:>8.1f} KiB{new_us:>9.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,10 @@ Admin Module
 Special admin users can test all conditions and access export
 """
 
+import time
 import streamlit as st
 from firebase_admin import db
+from utils.timing import timed_phase
 
 # Admin emails - add your email(s) here
 ADMIN_EMAILS = [
@@ -21,6 +23,7 @@ def is_admin(email: str) -> bool:
     return email.lower() in [e.lower() for e in ADMIN_EMAILS]
 
 
+@timed_phase('firebase_reads')
 def get_or_create_admin_user(user_id: str, email: str) -> dict:
     """
     Create or get admin user with special privileges.
@@ -69,28 +72,22 @@ def render_admin_dashboard():
         st.markdown("### Condition 1")
         st.write("**Character-Based Scaffolded**")
         st.caption("Character personalities + 5-step scaffolding + visuals")
-        if st.button("Test Condition 1", key="admin_c1", type="primary"):
-            st.session_state.admin_test_condition = 1
-            st.session_state.condition = 1
-            st.rerun()
+        st.button("Test Condition 1", key="admin_c1", type="primary",
+                  on_click=select_test_condition, args=(1,))
     
     with col2:
         st.markdown("### Condition 2")
         st.write("**Non-Character Scaffolded**")
         st.caption("Generic tutor + 5-step scaffolding + visuals")
-        if st.button("Test Condition 2", key="admin_c2", type="primary"):
-            st.session_state.admin_test_condition = 2
-            st.session_state.condition = 2
-            st.rerun()
+        st.button("Test Condition 2", key="admin_c2", type="primary",
+                  on_click=select_test_condition, args=(2,))
     
     with col3:
         st.markdown("### Condition 3")
         st.write("**Direct Chat (Control)**")
         st.caption("Plain Q&A, no scaffolding, no visuals")
-        if st.button("Test Condition 3", key="admin_c3", type="primary"):
-            st.session_state.admin_test_condition = 3
-            st.session_state.condition = 3
-            st.rerun()
+        st.button("Test Condition 3", key="admin_c3", type="primary",
+                  on_click=select_test_condition, args=(3,))
     
     st.write("---")
     
@@ -98,9 +95,7 @@ def render_admin_dashboard():
     with st.expander("🛠️ Admin Tools"):
         st.write("**Data Export**")
         st.write("Access the data export dashboard:")
-        if st.button("Go to Data Export"):
-            st.query_params.update({"admin": "true"})
-            st.rerun()
+        st.button("Go to Data Export", on_click=open_data_export)
         
         st.write("---")
         
@@ -127,6 +122,18 @@ def render_admin_dashboard():
         with col4:
             st.metric("Condition 3", condition_counts[3])
     
+    # Live timing of recent script runs in this process
+    with st.expander("⏱️ Performance"):
+        render_performance_panel()
+    
+    # Queueing for the LLM concurrency cap in this process
+    with st.expander("🚦 LLM Queue"):
+        render_llm_queue_panel()
+    
+    # Waiting room for new sessions while this process is at capacity
+    with st.expander("🚪 Admission"):
+        render_admission_panel()
+    
     # Session selection (like regular dashboard)
     st.write("---")
     st.subheader("Test Sessions")
@@ -157,21 +164,185 @@ def render_admin_dashboard():
                 st.caption(f"Difficulty: {session_config['difficulty']}")
             
             with col2:
-                if st.button("Start Test", key=f"admin_start_{session_id}", type="secondary"):
-                    # Set admin test flag
-                    st.session_state.is_admin_test = True
-                    # Call the regular start_session function
-                    from app_simplified import start_session
-                    start_session(session_id)
-                    st.rerun()
+                st.button("Start Test", key=f"admin_start_{session_id}", type="secondary",
+                          on_click=start_test_session, args=(session_id,))
             
             st.write("---")
     
     # Logout
-    if st.button("Logout"):
-        from utils.auth import logout_user
-        logout_user()
-        st.rerun()
+    from utils.auth import logout_user
+    st.button("Logout", on_click=logout_user)
+
+
+def render_performance_panel():
+    """Show per-phase percentiles and the slowest recent script runs."""
+    from utils.timing import RUN_PHASES, recent_runs, phase_summary, slowest_runs
+    
+    runs = recent_runs()
+    if not runs:
+        st.write("No runs recorded yet.")
+        return
+    
+    st.caption(f"Last {len(runs)} script runs in this server process")
+    
+    summary = phase_summary(runs)
+    st.write("**Per-phase timings (ms)**")
+    st.dataframe([
+        {
+            'phase': name,
+            'runs': stats['count'],
+            'p50': round(stats['p50'] * 1000),
+            'p95': round(stats['p95'] * 1000),
+            'p99': round(stats['p99'] * 1000),
+            'max': round(stats['max'] * 1000)
+        }
+        for name, stats in summary.items()
+    ], hide_index=True)
+    
+    st.write("**Slowest recent runs (ms)**")
+    rows = []
+    for run in slowest_runs(runs):
+        row = {
+            'time': time.strftime('%H:%M:%S', time.localtime(run.started_at)),
+            'page': run.label,
+            'total': round(run.total * 1000)
+        }
+        for name in RUN_PHASES:
+            row[name] = round(run.phases.get(name, 0.0) * 1000)
+        rows.append(row)
+    st.dataframe(rows, hide_index=True)
+    
+    st.button("Refresh", key="perf_refresh")
+
+
+def render_llm_queue_panel():
+    """Show the LLM scheduler's current queue and recent queue waits."""
+    from client.scheduler import get_llm_scheduler
+    
+    stats = get_llm_scheduler().stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Running", f"{stats['running']} / {stats['max_concurrent'] or '∞'}")
+    with col2:
+        st.metric("Waiting", stats['waiting'])
+    with col3:
+        st.metric("Students waiting", stats['students_waiting'])
+    
+    if not stats['wait']['count']:
+        st.write("No LLM calls yet.")
+        return
+    
+    st.write("**Queue wait by session time left (ms)**")
+    rows = [('all', stats['wait'])] + sorted(stats['wait_by_remaining'].items())
+    st.dataframe([
+        {
+            'time left': band,
+            'calls': wait['count'],
+            'p50': round(wait['p50'] * 1000),
+            'p95': round(wait['p95'] * 1000),
+            'max': round(wait['max'] * 1000)
+        }
+        for band, wait in rows
+    ], hide_index=True)
+    
+    st.button("Refresh", key="llm_queue_refresh")
+
+
+def render_admission_panel():
+    """Show capacity signals against their thresholds, and the waiting room queue."""
+    from client.admission import get_admission
+    
+    status = get_admission().status()
+    signals, thresholds = status['signals'], status['thresholds']
+    if not status['enabled']:
+        st.warning("Admission control is off: every new session starts straight away.")
+    elif status['breaches']:
+        st.error(f"At capacity ({', '.join(status['breaches'])}): new sessions wait.")
+    else:
+        st.success("Under capacity: new sessions start straight away.")
+    
+    st.dataframe([
+        {'signal': 'LLM calls in flight', 'now': signals.in_flight,
+         'limit': thresholds.max_in_flight},
+        {'signal': 'LLM queue depth', 'now': signals.queue_depth,
+         'limit': thresholds.max_queue_depth},
+        {'signal': 'LLM p95 (s)', 'now': round(signals.llm_p95, 2),
+         'limit': thresholds.max_llm_p95},
+        {'signal': 'DB p95 (s)', 'now': round(signals.db_p95, 2),
+         'limit': thresholds.max_db_p95},
+    ], hide_index=True)
+    
+    st.write(f"**Waiting room:** {len(status['queue'])} students")
+    if status['queue']:
+        st.dataframe([
+            {
+                'position': row['position'],
+                'user': row['user_id'],
+                'session': row['session_id'],
+                'waiting (s)': round(row['waiting']),
+                'last check (s)': round(row['last_check'])
+            }
+            for row in status['queue']
+        ], hide_index=True)
+    
+    st.write("**Thresholds**")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.number_input("Max in flight", min_value=1, step=1,
+                        value=thresholds.max_in_flight, key="admission_max_in_flight")
+    with col2:
+        st.number_input("Max queue depth", min_value=1, step=1,
+                        value=thresholds.max_queue_depth, key="admission_max_queue_depth")
+    with col3:
+        st.number_input("Max LLM p95 (s)", min_value=0.1, step=0.5,
+                        value=float(thresholds.max_llm_p95), key="admission_max_llm_p95")
+    with col4:
+        st.number_input("Max DB p95 (s)", min_value=0.1, step=0.5,
+                        value=float(thresholds.max_db_p95), key="admission_max_db_p95")
+    st.checkbox("Admission control on", value=status['enabled'], key="admission_enabled")
+    st.button("Apply", key="admission_apply", on_click=apply_admission_thresholds)
+    
+    # Watch the queue live: the countdown reruns the page every few seconds
+    if st.toggle("Live", key="admission_live"):
+        from widgets.countdown import session_countdown
+        session_countdown(time.time(), 3, key="admission_live_timer", label="Refresh in")
+    else:
+        st.button("Refresh", key="admission_refresh")
+
+
+def apply_admission_thresholds():
+    """Button callback: apply the admission thresholds from the admin panel."""
+    from client.admission import AdmissionThresholds, get_admission
+    
+    get_admission().set_thresholds(
+        AdmissionThresholds(
+            max_in_flight=int(st.session_state.admission_max_in_flight),
+            max_queue_depth=int(st.session_state.admission_max_queue_depth),
+            max_llm_p95=float(st.session_state.admission_max_llm_p95),
+            max_db_p95=float(st.session_state.admission_max_db_p95),
+        ),
+        enabled=st.session_state.admission_enabled,
+    )
+
+
+def select_test_condition(condition: int):
+    """Button callback: choose which condition the admin is testing."""
+    st.session_state.admin_test_condition = condition
+    st.session_state.condition = condition
+
+
+def open_data_export():
+    """Button callback: switch to the data export page."""
+    st.query_params.update({"admin": "true"})
+
+
+def start_test_session(session_id: str):
+    """Button callback: start a session in admin test mode."""
+    # Set admin test flag
+    st.session_state.is_admin_test = True
+    # Call the regular start_session function
+    from app_simplified import start_session
+    start_session(session_id)
 
 
 def start_admin_test_session(session_id: str):
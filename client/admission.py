@@ -0,0 +1,200 @@
+"""
+Admission Control
+Holds new learning sessions in a waiting room while this process is
+overloaded, so students already learning keep a usable tutor
+
+start_session asks the controller before starting a fresh session
+(resumed sessions were admitted before and go straight in). A student is
+admitted when the live capacity signals are all under their thresholds
+and nobody is ahead of them in line:
+
+    in_flight     LLM calls running or queued in the scheduler
+    queue_depth   LLM calls waiting for a concurrency slot
+    llm_p95       latency of completed LLM calls over the last LIVE_LATENCY_WINDOW
+    db_p95        database operation latency over the same window
+    (both read 0 until the window holds LIVE_LATENCY_MIN_SAMPLES samples)
+
+Otherwise they get a place in the queue. The waiting room checks back
+every ADMISSION_POLL_SECONDS; only the student at the front can be
+admitted on a check, which paces admissions so the signals can catch up
+with the load each new session adds. Thresholds are per process and can
+be changed live from the admin dashboard.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from client.scheduler import get_llm_scheduler
+from utils.config import (
+    ADMISSION_CONTROL,
+    ADMISSION_MAX_DB_P95,
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_LLM_P95,
+    ADMISSION_MAX_QUEUE_DEPTH,
+    ADMISSION_TICKET_TTL,
+    LIVE_LATENCY_MIN_SAMPLES,
+)
+from utils.metrics import DB_OPERATION_SECONDS, LLM_REQUEST_SECONDS, REGISTRY
+
+ADMISSIONS = REGISTRY.counter(
+    "tutor_admissions_total", "Learning sessions admitted or turned away, by outcome")
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "tutor_admission_wait_seconds", "Time students spent in the waiting room before admission")
+ADMISSION_WAITING = REGISTRY.gauge(
+    "tutor_admission_waiting", "Students in the waiting room")
+
+
+@dataclass
+class AdmissionThresholds:
+    """Limits above which new sessions wait."""
+    max_in_flight: int = ADMISSION_MAX_IN_FLIGHT
+    max_queue_depth: int = ADMISSION_MAX_QUEUE_DEPTH
+    max_llm_p95: float = ADMISSION_MAX_LLM_P95
+    max_db_p95: float = ADMISSION_MAX_DB_P95
+
+
+@dataclass
+class CapacitySignals:
+    """Live load on this process."""
+    in_flight: int = 0
+    queue_depth: int = 0
+    llm_p95: float = 0.0
+    db_p95: float = 0.0
+
+    def breaches(self, thresholds: AdmissionThresholds) -> List[str]:
+        """Names of the signals at or over their threshold."""
+        limits = {
+            'in_flight': thresholds.max_in_flight,
+            'queue_depth': thresholds.max_queue_depth,
+            'llm_p95': thresholds.max_llm_p95,
+            'db_p95': thresholds.max_db_p95,
+        }
+        return [name for name, limit in limits.items() if getattr(self, name) >= limit]
+
+
+def live_signals() -> CapacitySignals:
+    """Signals from the LLM scheduler and the windowed latency histograms."""
+    stats = get_llm_scheduler().stats()
+    return CapacitySignals(
+        in_flight=stats['running'] + stats['waiting'],
+        queue_depth=stats['waiting'],
+        llm_p95=LLM_REQUEST_SECONDS.recent_percentile(95, LIVE_LATENCY_MIN_SAMPLES),
+        db_p95=DB_OPERATION_SECONDS.recent_percentile(95, LIVE_LATENCY_MIN_SAMPLES),
+    )
+
+
+class _Ticket:
+    __slots__ = ("user_id", "session_id", "joined", "last_seen")
+
+    def __init__(self, user_id: str, session_id: str, now: float):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.joined = now
+        self.last_seen = now
+
+
+class AdmissionController:
+    """The waiting room: tickets in arrival order, keyed by user ID."""
+
+    def __init__(self, signals: Callable[[], CapacitySignals] = live_signals,
+                 thresholds: Optional[AdmissionThresholds] = None,
+                 enabled: bool = ADMISSION_CONTROL, ticket_ttl: float = ADMISSION_TICKET_TTL):
+        self.signals = signals
+        self.thresholds = thresholds or AdmissionThresholds()
+        self.enabled = enabled
+        self.ticket_ttl = ticket_ttl
+        self._tickets: "OrderedDict[str, _Ticket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def request(self, user_id: str, session_id: str) -> Optional[int]:
+        """
+        Ask to start a session. Returns None if admitted, else the
+        student's 1-based place in the queue. Call again to keep the place.
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            ticket = self._tickets.get(user_id)
+            if ticket is None:
+                if not self.enabled or (not self._tickets and self._healthy()):
+                    ADMISSIONS.inc(outcome='immediate')
+                    return None
+                ticket = self._tickets[user_id] = _Ticket(user_id, session_id, now)
+                ADMISSIONS.inc(outcome='queued')
+            ticket.session_id = session_id
+            ticket.last_seen = now
+
+            position = list(self._tickets).index(user_id) + 1
+            if position == 1 and (not self.enabled or self._healthy()):
+                del self._tickets[user_id]
+                ADMISSIONS.inc(outcome='after_wait')
+                ADMISSION_WAIT_SECONDS.observe(now - ticket.joined)
+                position = None
+            ADMISSION_WAITING.set(len(self._tickets))
+            return position
+
+    def leave(self, user_id: str):
+        """Give up a place in the queue (left the waiting room)."""
+        with self._lock:
+            if self._tickets.pop(user_id, None) is not None:
+                ADMISSIONS.inc(outcome='left')
+            ADMISSION_WAITING.set(len(self._tickets))
+
+    def _healthy(self) -> bool:
+        return not self.signals().breaches(self.thresholds)
+
+    def _expire(self, now: float):
+        """Drop students who stopped checking back (lock held)."""
+        for user_id, ticket in list(self._tickets.items()):
+            if now - ticket.last_seen > self.ticket_ttl:
+                del self._tickets[user_id]
+                ADMISSIONS.inc(outcome='abandoned')
+
+    # -------- Admin --------
+
+    def set_thresholds(self, thresholds: AdmissionThresholds, enabled: bool = True):
+        with self._lock:
+            self.thresholds = thresholds
+            self.enabled = enabled
+
+    def status(self) -> Dict[str, object]:
+        """Signals against thresholds, and the queue front to back."""
+        now = time.time()
+        signals = self.signals()
+        with self._lock:
+            self._expire(now)
+            queue = [
+                {
+                    'position': i + 1,
+                    'user_id': ticket.user_id,
+                    'session_id': ticket.session_id,
+                    'waiting': now - ticket.joined,
+                    'last_check': now - ticket.last_seen,
+                }
+                for i, ticket in enumerate(self._tickets.values())
+            ]
+            thresholds = AdmissionThresholds(**asdict(self.thresholds))
+            enabled = self.enabled
+        return {
+            'enabled': enabled,
+            'signals': signals,
+            'thresholds': thresholds,
+            'breaches': signals.breaches(thresholds),
+            'queue': queue,
+        }
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """The process-wide admission controller."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
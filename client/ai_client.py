@@ -3,22 +3,174 @@ Simple OpenAI Client Wrapper
 No CrewAI, no complex agent frameworks - just clean OpenAI API calls
 """
 
-import os
+import json
+import threading
+import time
 import streamlit as st
-from typing import Optional, List, Dict
-from openai import OpenAI
+from typing import Callable, Optional, List, Dict, Sequence, Tuple
+
+from client.transports import (
+    Completion, DeltaCallback, GatewayTransport, OpenAITransport, openai_api_key
+)
+from utils.config import CONTEXT_SUMMARY_CONCURRENT, LLM_GATEWAY_URL
+from utils.metrics import (
+    LLM_BACKGROUND_SECONDS, LLM_CANCELLED, LLM_ERRORS, LLM_REQUEST_SECONDS, LLM_TOKENS,
+    LLM_WASTED_TOKENS
+)
+from utils.tracing import annotate
+
+
+# Structured-output schema: tutor reply plus the step-advance decision
+TUTOR_TURN_SCHEMA = {
+    "name": "tutor_turn",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "reply": {"type": "string", "description": "The tutor's message to the student"},
+            "advance": {"type": "boolean",
+                        "description": "True if the student is ready for the next stage"},
+            "confidence": {"type": "number", "description": "Confidence in advance, 0 to 1"},
+        },
+        "required": ["reply", "advance", "confidence"],
+        "additionalProperties": False,
+    },
+}
+
+
+CHARS_PER_TOKEN = 4  # Rough estimate for tokens spent before the API reports usage
+
+
+class GenerationCancelled(Exception):
+    """The generation was cancelled before it finished (see GenerationHandle)."""
+
+
+class GenerationHandle:
+    """
+    One in-flight generation for a session's turn, cancellable from another
+    thread. A cancelled generation stops at its next streamed chunk (or
+    before it starts, if still queued) and raises GenerationCancelled.
+    """
+    
+    def __init__(self, session_key: str, turn: int):
+        self.session_key = session_key
+        self.turn = turn
+        self.reason: Optional[str] = None
+        self.started = False
+        self.prompt_chars = 0
+        self.completion_chars = 0
+        # From the last completion that finished under this handle
+        self.finish_reason: Optional[str] = None
+        self.completion_tokens = 0
+        # time.monotonic() by which the turn must be answered (TURN_LATENCY_BUDGET)
+        self.deadline: Optional[float] = None
+        self._counted = False
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+    
+    def cancel(self, reason: str):
+        """Ask the generation to stop; later calls keep the first reason."""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, if there is one."""
+        if self.deadline is None:
+            return None
+        return max(0.1, self.deadline - time.monotonic())
+    
+    def on_cancel(self, callback: Callable[[], None]):
+        """Run `callback` on cancel (now, if already cancelled)."""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def check(self):
+        """Raise GenerationCancelled if cancelled, counting what it wasted."""
+        if self.reason is None:
+            return
+        if not self._counted:
+            self._counted = True
+            stage = 'generating' if self.started else 'queued'
+            LLM_CANCELLED.inc(reason=self.reason, stage=stage)
+            if self.started:
+                LLM_WASTED_TOKENS.inc(self.prompt_chars // CHARS_PER_TOKEN, kind='prompt')
+                LLM_WASTED_TOKENS.inc(self.completion_chars // CHARS_PER_TOKEN, kind='completion')
+            annotate(cancelled=self.reason, cancelled_stage=stage)
+        raise GenerationCancelled(f"Generation for turn {self.turn} cancelled ({self.reason})")
+
+
+class GenerationRegistry:
+    """
+    The current generation handle per session. Starting a turn cancels the
+    session's previous one, so a student who submits again doesn't leave
+    the superseded reply running.
+    """
+    
+    def __init__(self):
+        self._handles: Dict[str, GenerationHandle] = {}
+        self._lock = threading.Lock()
+    
+    def begin(self, session_key: str, turn: int) -> GenerationHandle:
+        handle = GenerationHandle(session_key, turn)
+        with self._lock:
+            previous = self._handles.get(session_key)
+            self._handles[session_key] = handle
+        if previous is not None:
+            previous.cancel('superseded')
+        return handle
+    
+    def finish(self, handle: GenerationHandle):
+        with self._lock:
+            if self._handles.get(handle.session_key) is handle:
+                del self._handles[handle.session_key]
+    
+    def cancel(self, session_key: str, reason: str) -> bool:
+        """Cancel the session's in-flight generation, if any."""
+        with self._lock:
+            handle = self._handles.pop(session_key, None)
+        if handle is None:
+            return False
+        handle.cancel(reason)
+        return True
+    
+    def in_flight(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return [(key, handle.turn) for key, handle in self._handles.items()]
+
+
+# Shared by every client in the process, since sessions may each have their own
+GENERATIONS = GenerationRegistry()
+
+# Background summary calls in flight, kept apart from the scheduler's turn slots
+_SUMMARY_SLOTS = threading.BoundedSemaphore(max(1, CONTEXT_SUMMARY_CONCURRENT))
 
 
 class SimpleAIClient:
     """Handles all AI interactions with OpenAI"""
     
-    def __init__(self):
-        # Try Streamlit secrets first, then environment variable
-        try:
-            api_key = st.secrets["openai"]["api_key"]
-        except:
-            api_key = os.getenv('OPENAI_API_KEY')
+    def __init__(self, transport=None):
+        self.model = "gpt-4o-mini"  # Fast and cost-effective for research
+        # Straight to OpenAI, or via the shared gateway when one is configured
+        self.transport = transport or self._default_transport()
+    
+    @staticmethod
+    def _default_transport():
+        if LLM_GATEWAY_URL:
+            return GatewayTransport(LLM_GATEWAY_URL)
         
+        api_key = openai_api_key()
         if not api_key:
             st.error("""
             OpenAI API key not found!
@@ -36,12 +188,77 @@ class SimpleAIClient:
             """)
             raise ValueError("OPENAI_API_KEY not configured")
         
-        self.client = OpenAI(api_key=api_key)
-        self.model = "gpt-4o-mini"  # Fast and cost-effective for research
+        return OpenAITransport(api_key)
+    
+    def begin_generation(self, session_key: str, turn: int) -> GenerationHandle:
+        """Handle for a turn's generation; cancels the session's previous one."""
+        return GENERATIONS.begin(session_key, turn)
+    
+    def finish_generation(self, handle: GenerationHandle):
+        GENERATIONS.finish(handle)
+    
+    def cancel_generation(self, session_key: str, reason: str) -> bool:
+        """Cancel a session's in-flight generation (timer ran out, session left)."""
+        return GENERATIONS.cancel(session_key, reason)
+    
+    def _complete(self, method: str, messages: List[Dict], temperature: float,
+                  max_tokens: int, on_delta: Optional[DeltaCallback] = None,
+                  handle: Optional[GenerationHandle] = None, background: bool = False,
+                  **options) -> Completion:
+        """
+        Run one completion through the transport, recording latency and
+        usage. Background calls are timed apart from live turns, whose
+        latency drives admission control and degraded replies.
+        """
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **options,
+        }
+        if handle is not None:
+            # Streamed, so a cancel can stop it between chunks
+            handle.check()
+            handle.started = True
+            handle.prompt_chars = sum(len(m["content"]) for m in messages)
+            on_delta = self._cancellable(handle, on_delta)
+        # A cancel only lands between chunks, so a call that stalls before
+        # the first one is bounded by a timeout on the remaining budget instead
+        timeout = handle.remaining() if handle is not None else None
+        limits = {'timeout': timeout} if timeout is not None else {}
+        start = time.perf_counter()
+        if on_delta is not None:
+            completion = self.transport.stream(request, on_delta, **limits)
+        else:
+            completion = self.transport.complete(request, **limits)
+        # Only completed calls: a cancelled or failed one says little about
+        # how long a reply takes, and one of them alone would skew the live p95
+        histogram = LLM_BACKGROUND_SECONDS if background else LLM_REQUEST_SECONDS
+        histogram.observe(time.perf_counter() - start, method=method)
+        self._record_usage(completion, method)
+        if handle is not None:
+            handle.finish_reason = completion.finish_reason
+            handle.completion_tokens = completion.completion_tokens
+        return completion
+    
+    @staticmethod
+    def _cancellable(handle: GenerationHandle,
+                     on_delta: Optional[DeltaCallback]) -> DeltaCallback:
+        def forward(delta: str):
+            handle.completion_chars += len(delta)
+            handle.check()
+            if on_delta is not None:
+                on_delta(delta)
+        return forward
         
     def generate_response(self, system_prompt: str, user_message: str, 
                          conversation_history: Optional[List[Dict]] = None,
-                         temperature: float = 0.9) -> str:
+                         temperature: float = 0.9,
+                         on_delta: Optional[DeltaCallback] = None,
+                         handle: Optional[GenerationHandle] = None,
+                         max_tokens: int = 500,
+                         stop: Optional[Sequence[str]] = None) -> str:
         """
         Generate a response from OpenAI.
         
@@ -50,6 +267,12 @@ class SimpleAIClient:
             user_message: The user's current message
             conversation_history: Previous messages for context
             temperature: Creativity level (0.0-2.0)
+            on_delta: If given, stream the reply, calling this with each chunk
+            handle: If given, the generation can be cancelled through it
+                    (raises GenerationCancelled); it also gets the finish
+                    reason and completion tokens
+            max_tokens: Ceiling on the reply (see GenerationProfile)
+            stop: Stop sequences, if any
             
         Returns:
             The AI's response as a string
@@ -64,14 +287,12 @@ class SimpleAIClient:
         messages.append({"role": "user", "content": user_message})
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=500
-            )
+            options = {"stop": list(stop)} if stop else {}
+            completion = self._complete('generate_response', messages, temperature,
+                                        max_tokens=max_tokens, on_delta=on_delta, handle=handle,
+                                        **options)
             
-            result = response.choices[0].message.content.strip()
+            result = completion.content.strip()
             
             # Basic validation
             if not result or len(result) < 10:
@@ -79,9 +300,67 @@ class SimpleAIClient:
                 
             return result
             
+        except GenerationCancelled:
+            raise
         except Exception as e:
+            LLM_ERRORS.inc(method='generate_response', error=type(e).__name__)
             raise Exception(f"OpenAI API call failed: {str(e)}")
     
+    def summarize(self, system_prompt: str, user_message: str, temperature: float = 0.0,
+                  max_tokens: int = 400) -> str:
+        """
+        Background completion for rolling context summaries. Not a
+        generate_* method, so LLMScheduler doesn't give it a turn slot; at
+        most CONTEXT_SUMMARY_CONCURRENT run at once instead.
+        """
+        messages = [{"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message}]
+        try:
+            with _SUMMARY_SLOTS:
+                completion = self._complete('summarize', messages, temperature,
+                                            max_tokens=max_tokens, background=True)
+            return completion.content.strip()
+        except Exception as e:
+            LLM_ERRORS.inc(method='summarize', error=type(e).__name__)
+            raise Exception(f"OpenAI summary call failed: {str(e)}")
+    
+    def generate_structured_response(self, system_prompt: str, user_message: str,
+                                     conversation_history: Optional[List[Dict]] = None,
+                                     temperature: float = 0.9,
+                                     handle: Optional[GenerationHandle] = None,
+                                     max_tokens: int = 600) -> Dict:
+        """
+        Generate a reply and a step-advance decision in one completion.
+        
+        Returns:
+            {"reply": str, "advance": bool, "confidence": float}
+            
+        Raises:
+            Exception if the call fails or the output doesn't match the schema,
+            so the caller can fall back to the keyword heuristic.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        if conversation_history:
+            messages.extend(conversation_history)
+        messages.append({"role": "user", "content": user_message})
+        
+        try:
+            completion = self._complete(
+                'generate_structured_response', messages, temperature, max_tokens=max_tokens,
+                handle=handle,
+                response_format={"type": "json_schema", "json_schema": TUTOR_TURN_SCHEMA}
+            )
+            
+            decision = parse_tutor_turn(completion.content)
+            annotate(advance=decision["advance"], confidence=decision["confidence"])
+            return decision
+            
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            LLM_ERRORS.inc(method='generate_structured_response', error=type(e).__name__)
+            raise Exception(f"OpenAI structured call failed: {str(e)}")
+    
     def generate_initial_metaphor(self, character_prompt: str, 
                                   topic_prompt: str) -> str:
         """
@@ -94,9 +373,9 @@ class SimpleAIClient:
 {topic_prompt}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            completion = self._complete(
+                'generate_initial_metaphor',
+                [
                     {"role": "system", "content": full_prompt},
                     {"role": "user", "content": "Create the welcome message."}
                 ],
@@ -104,7 +383,7 @@ class SimpleAIClient:
                 max_tokens=250
             )
             
-            result = response.choices[0].message.content.strip()
+            result = completion.content.strip()
             
             # Validate it's not too generic
             if len(result) < 30:
@@ -118,5 +397,39 @@ class SimpleAIClient:
             return result
             
         except Exception as e:
+            LLM_ERRORS.inc(method='generate_initial_metaphor', error=type(e).__name__)
             # Return None to trigger fallback
             return None
+
+    def _record_usage(self, completion: Completion, method: str):
+        """Count prompt/completion tokens reported by the API."""
+        annotate(model=self.model, prompt_tokens=completion.prompt_tokens,
+                 completion_tokens=completion.completion_tokens,
+                 finish_reason=completion.finish_reason,
+                 llm_source=completion.source)
+        LLM_TOKENS.inc(completion.prompt_tokens, method=method, kind='prompt')
+        LLM_TOKENS.inc(completion.completion_tokens, method=method, kind='completion')
+
+
+def parse_tutor_turn(content: Optional[str]) -> Dict:
+    """Parse and validate a structured tutor turn; ValueError if malformed."""
+    data = json.loads(content or "")
+    if not isinstance(data, dict):
+        raise ValueError("Structured response is not an object")
+    
+    reply = data.get("reply")
+    if not isinstance(reply, str) or len(reply.strip()) < 10:
+        raise ValueError("Reply too short or empty")
+    if not isinstance(data.get("advance"), bool):
+        raise ValueError("Missing advance decision")
+    
+    try:
+        confidence = float(data.get("confidence"))
+    except (TypeError, ValueError):
+        raise ValueError("Missing confidence")
+    
+    return {
+        "reply": reply.strip(),
+        "advance": data["advance"],
+        "confidence": min(1.0, max(0.0, confidence)),
+    }
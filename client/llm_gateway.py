@@ -0,0 +1,563 @@
+"""
+LLM Gateway
+One process in front of OpenAI that every app replica sends completions to
+
+Each Streamlit replica on its own sees only its share of the traffic, so
+rate limits, caches and retries done per process don't add up. The gateway
+owns them for all replicas:
+
+- Global rate limiting: token buckets for requests and tokens per minute.
+  Requests queue for capacity (up to LLM_GATEWAY_MAX_WAIT) instead of
+  tripping OpenAI's 429s.
+- Response cache: an identical request within LLM_GATEWAY_CACHE_TTL is
+  answered without an API call.
+- Coalescing: identical requests in flight at the same time share one
+  API call, streamed to every waiter.
+  Both only for deterministic requests (temperature 0). A sampled reply
+  is meant for one student, so two students sending the same prompt
+  (the condition 2 opening, say) each get their own.
+- Retries with backoff on rate-limit, timeout and 5xx errors, as long as
+  nothing has been streamed back yet.
+- Per-replica usage (requests, cache hits, tokens, retries, queueing) at
+  GET /usage as JSON and GET /metrics in Prometheus format.
+
+Replicas use it by setting LLM_GATEWAY_URL; SimpleAIClient then sends its
+requests through client.transports.GatewayTransport.
+
+Usage:
+    python -m client.llm_gateway --listen unix:///tmp/tutor-llm.sock
+    python -m client.llm_gateway --listen http://127.0.0.1:8787
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import socketserver
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from client.transports import Completion, DeltaCallback, OpenAITransport, openai_api_key
+from utils.config import (
+    LLM_GATEWAY_CACHE_SIZE,
+    LLM_GATEWAY_CACHE_TTL,
+    LLM_GATEWAY_MAX_WAIT,
+    LLM_GATEWAY_RETRIES,
+    LLM_GATEWAY_RPM,
+    LLM_GATEWAY_TPM,
+    LLM_GATEWAY_URL,
+)
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger("tutor.gateway")
+
+CHARS_PER_TOKEN = 4
+
+GATEWAY_REQUESTS = REGISTRY.counter(
+    "tutor_gateway_requests_total", "Completion requests by replica and outcome")
+GATEWAY_TOKENS = REGISTRY.counter(
+    "tutor_gateway_tokens_total", "Tokens used by upstream calls, by the replica that caused them")
+GATEWAY_RETRIES = REGISTRY.counter(
+    "tutor_gateway_retries_total", "Upstream calls retried after a transient error")
+GATEWAY_QUEUE_SECONDS = REGISTRY.histogram(
+    "tutor_gateway_queue_seconds", "Time requests waited for rate-limit capacity")
+
+
+class RateLimited(Exception):
+    """No capacity within the allowed wait."""
+
+
+class ClientDisconnected(Exception):
+    """The replica hung up mid-stream (its generation was cancelled)."""
+
+
+class TokenBucket:
+    """
+    Capacity `per_minute`, refilled continuously. Reservations may take the
+    level below zero; the reserver then waits until it would be back at
+    zero, so callers are served in reservation order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount`; returns seconds until it is actually available."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float, now: float):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits, shared by all replicas."""
+
+    def __init__(self, rpm: float, tpm: float, max_wait: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Wait for capacity for one request of `tokens`; returns the wait in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+            if wait > self.max_wait:
+                self.requests.refund(1, now)
+                self.tokens.refund(tokens, now)
+                raise RateLimited(f"Rate limit queue is {wait:.0f}s deep")
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, reserved: int, used: int):
+        """Give back what a request reserved but didn't use."""
+        if used < reserved:
+            with self._lock:
+                self.tokens.refund(reserved - used, time.monotonic())
+
+
+class ResponseCache:
+    """Completions by request key, least recently used evicted, with a TTL."""
+
+    def __init__(self, ttl: float, size: int):
+        self.ttl = ttl
+        self.size = size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Completion]:
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, completion = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return completion
+
+    def put(self, key: str, completion: Completion):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, completion)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _InFlight:
+    """An upstream call that identical requests can wait on and stream from."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.result: Optional[Completion] = None
+        self.error: Optional[Exception] = None
+        self.done = False
+        self.followers = 0
+        self._cond = threading.Condition()
+
+    def publish(self, delta: str):
+        with self._cond:
+            self.chunks.append(delta)
+            self._cond.notify_all()
+
+    def finish(self, result: Optional[Completion] = None, error: Optional[Exception] = None):
+        with self._cond:
+            self.result, self.error, self.done = result, error, True
+            self._cond.notify_all()
+
+    def join(self):
+        """Count one more identical request reading this call."""
+        with self._cond:
+            self.followers += 1
+
+    def follow(self, on_delta: Optional[DeltaCallback]) -> Completion:
+        """
+        Replay the chunks so far, then the rest as they arrive; the result
+        at the end. Chunks are written to the follower's client outside
+        the lock, so a slow client holds up neither the leader nor the
+        other followers.
+        """
+        seen = 0
+        try:
+            while True:
+                with self._cond:
+                    while len(self.chunks) == seen and not self.done:
+                        self._cond.wait()
+                    new, done = self.chunks[seen:], self.done
+                    seen = len(self.chunks)
+                if on_delta is not None:
+                    for delta in new:
+                        on_delta(delta)
+                if done:
+                    break
+        finally:
+            with self._cond:
+                self.followers -= 1
+        if self.error is not None:
+            raise self.error
+        if on_delta is not None and not seen and self.result.content:
+            on_delta(self.result.content)  # Leader didn't stream
+        return self.result
+
+
+def request_key(request: Dict) -> str:
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+def shareable(request: Dict) -> bool:
+    """Deterministic requests may be answered from the cache or another caller's call."""
+    return request.get("temperature", 1) == 0
+
+
+def estimate_tokens(request: Dict) -> int:
+    """Prompt estimate plus max_tokens, reserved against the tokens-per-minute bucket."""
+    chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+    return chars // CHARS_PER_TOKEN + int(request.get("max_tokens") or 500)
+
+
+def retryable(error: Exception) -> bool:
+    """Rate-limit, timeout, connection and server errors are worth another try."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return type(error).__name__ in ("APITimeoutError", "APIConnectionError", "TimeoutError",
+                                    "ConnectionError")
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class ReplicaUsage:
+    """Running totals per replica, for /usage."""
+
+    FIELDS = ("requests", "upstream", "cached", "coalesced", "rejected", "errors",
+              "cancelled", "retries", "prompt_tokens", "completion_tokens", "queue_seconds")
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: dict.fromkeys(self.FIELDS, 0))
+        self._lock = threading.Lock()
+
+    def add(self, replica: str, **amounts):
+        with self._lock:
+            totals = self._totals[replica]
+            for field, amount in amounts.items():
+                totals[field] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {replica: dict(totals) for replica, totals in self._totals.items()}
+
+
+class LLMGateway:
+    """Rate limiting, caching, coalescing and retries around one upstream transport."""
+
+    def __init__(self, upstream, rpm: float = LLM_GATEWAY_RPM, tpm: float = LLM_GATEWAY_TPM,
+                 max_wait: float = LLM_GATEWAY_MAX_WAIT, cache_ttl: float = LLM_GATEWAY_CACHE_TTL,
+                 cache_size: int = LLM_GATEWAY_CACHE_SIZE, retries: int = LLM_GATEWAY_RETRIES):
+        self.upstream = upstream
+        self.limiter = RateLimiter(rpm, tpm, max_wait)
+        self.cache = ResponseCache(cache_ttl, cache_size)
+        self.retries = retries
+        self.usage = ReplicaUsage()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, replica: str, outcome: str):
+        GATEWAY_REQUESTS.inc(replica=replica, outcome=outcome)
+        self.usage.add(replica, requests=1, **{outcome: 1})
+
+    def complete(self, request: Dict, replica: str,
+                 on_delta: Optional[DeltaCallback] = None) -> Completion:
+        """Serve one request, streaming chunks to `on_delta` if given."""
+        if not shareable(request):
+            return self._call_upstream(request, replica, on_delta, stream=on_delta is not None)
+
+        key = request_key(request)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count(replica, "cached")
+            if on_delta is not None:
+                on_delta(cached.content)
+            return replace(cached, source="cached")
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+            else:
+                flight.join()
+
+        if not leader:
+            self._count(replica, "coalesced")
+            return replace(flight.follow(on_delta), source="coalesced")
+
+        def forward(delta: str):
+            nonlocal on_delta
+            flight.publish(delta)
+            if on_delta is None:
+                return
+            try:
+                on_delta(delta)
+            except ClientDisconnected:
+                # Stop generating unless identical requests are still reading
+                if not flight.followers:
+                    raise
+                on_delta = None
+
+        try:
+            completion = self._call_upstream(request, replica, forward, stream=on_delta is not None)
+        except Exception as e:
+            if isinstance(e, ClientDisconnected):
+                # Not the followers' own disconnect
+                flight.finish(error=RuntimeError("Identical request was cancelled mid-stream"))
+            else:
+                flight.finish(error=e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        self.cache.put(key, completion)
+        flight.finish(completion)
+        return completion
+
+    def _call_upstream(self, request: Dict, replica: str, forward: Optional[DeltaCallback],
+                       stream: bool) -> Completion:
+        reserved = estimate_tokens(request)
+        try:
+            waited = self.limiter.acquire(reserved)
+        except RateLimited:
+            self._count(replica, "rejected")
+            raise
+        GATEWAY_QUEUE_SECONDS.observe(waited)
+
+        streamed = False
+
+        def emit(delta: str):
+            nonlocal streamed
+            streamed = True
+            forward(delta)
+
+        for attempt in range(self.retries + 1):
+            try:
+                if stream:
+                    completion = self.upstream.stream(request, emit)
+                else:
+                    completion = self.upstream.complete(request)
+                break
+            except ClientDisconnected:
+                self._count(replica, "cancelled")
+                self.limiter.settle(reserved, 0)
+                raise
+            except Exception as e:
+                # Once a waiter has seen tokens, a retry would repeat them
+                if attempt == self.retries or streamed or not retryable(e):
+                    self._count(replica, "errors")
+                    self.limiter.settle(reserved, 0)
+                    raise
+                delay = _retry_after(e) or min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                logger.warning("Upstream %s, retry %d in %.1fs", type(e).__name__, attempt + 1, delay)
+                GATEWAY_RETRIES.inc(replica=replica)
+                self.usage.add(replica, retries=1)
+                time.sleep(delay)
+
+        used = completion.prompt_tokens + completion.completion_tokens
+        self.limiter.settle(reserved, used)
+        self._count(replica, "upstream")
+        self.usage.add(replica, prompt_tokens=completion.prompt_tokens,
+                       completion_tokens=completion.completion_tokens, queue_seconds=waited)
+        GATEWAY_TOKENS.inc(completion.prompt_tokens, replica=replica, kind="prompt")
+        GATEWAY_TOKENS.inc(completion.completion_tokens, replica=replica, kind="completion")
+        return completion
+
+
+# ---------------------------------------------------------
+# HTTP (over TCP or a Unix socket)
+# ---------------------------------------------------------
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def gateway(self) -> LLMGateway:
+        return self.server.gateway
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _send_json(self, status: int, data: Dict):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: Dict):
+        line = json.dumps(data).encode() + b"\n"
+        try:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise ClientDisconnected() from e
+
+    def _write_chunk_end(self):
+        try:
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise ClientDisconnected() from e
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/usage":
+            self._send_json(200, {"replicas": self.gateway.usage.snapshot(),
+                                  "cached_completions": len(self.gateway.cache)})
+        elif path == "/metrics":
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == "/health":
+            self._send_json(200, {"ok": True})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))["request"]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": "Expected {\"request\": {...}}"})
+            return
+        replica = self.headers.get("X-Replica", "unknown")
+
+        if path == "/v1/complete":
+            try:
+                completion = self.gateway.complete(request, replica)
+            except RateLimited as e:
+                self._send_json(429, {"error": str(e)})
+            except Exception as e:
+                self._send_json(502, {"error": f"{type(e).__name__}: {e}"})
+            else:
+                self._send_json(200, completion.to_dict())
+        elif path == "/v1/stream":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                try:
+                    completion = self.gateway.complete(
+                        request, replica, on_delta=lambda delta: self._write_chunk({"delta": delta}))
+                    self._write_chunk({"done": completion.to_dict()})
+                except RateLimited as e:
+                    self._write_chunk({"error": str(e), "status": 429})
+                except ClientDisconnected:
+                    raise
+                except Exception as e:
+                    self._write_chunk({"error": f"{type(e).__name__}: {e}", "status": 502})
+                self._write_chunk_end()
+            except ClientDisconnected:
+                self.close_connection = True
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+
+class _UnixGatewayServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # A full Unix socket backlog fails connects instead of queueing them
+
+
+class _TCPGatewayServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+def serve(gateway: LLMGateway, url: str):
+    """Bind the gateway at unix:///path.sock or http://host:port; returns the server."""
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        if os.path.exists(parsed.path):
+            os.unlink(parsed.path)  # Left over from a previous run
+        server = _UnixGatewayServer(parsed.path, GatewayHandler)
+    else:
+        port = 8787 if parsed.port is None else parsed.port  # 0 picks a free one
+        server = _TCPGatewayServer((parsed.hostname or "127.0.0.1", port), GatewayHandler)
+    server.gateway = gateway
+    return server
+
+
+def start_gateway(gateway: LLMGateway, url: str):
+    """Serve on a background thread (benchmarks, tests); returns the server."""
+    server = serve(gateway, url)
+    threading.Thread(target=server.serve_forever, name="llm-gateway", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared LLM gateway for all app replicas.")
+    parser.add_argument("--listen", default=LLM_GATEWAY_URL or "http://127.0.0.1:8787",
+                        help="unix:///path/to.sock or http://host:port")
+    parser.add_argument("--rpm", type=float, default=LLM_GATEWAY_RPM)
+    parser.add_argument("--tpm", type=float, default=LLM_GATEWAY_TPM)
+    parser.add_argument("--cache-ttl", type=float, default=LLM_GATEWAY_CACHE_TTL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    api_key = openai_api_key()
+    if not api_key:
+        parser.error("OPENAI_API_KEY not configured")
+
+    gateway = LLMGateway(OpenAITransport(api_key), rpm=args.rpm, tpm=args.tpm,
+                         cache_ttl=args.cache_ttl)
+    server = serve(gateway, args.listen)
+    logger.info("LLM gateway listening on %s", args.listen)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+LLM Request Scheduler
+Caps concurrent LLM calls per process and decides who goes next when the
+cap is reached
+
+Waiting requests are not served first-come first-served but by earliest
+due time, arrival order breaking ties:
+1. Deadline: a request is due LLM_QUEUE_TARGET_WAIT seconds after it
+   arrives, scaled down by the share of the session (start_time +
+   SESSION_DURATION) the student has left: with 30 seconds to go it is
+   due almost at once, just after the start it can wait the full target.
+2. Fair share: each call the student already has in flight pushes the
+   due time back by another LLM_QUEUE_TARGET_WAIT, so a student firing
+   off messages can't crowd others out. Each student's own requests stay
+   in order.
+Due times are fixed at arrival, so waiting requests age: a request can
+only be overtaken by one that arrived less than the target wait (plus
+that penalty) after it. Keeping the target around one LLM call bounds
+what the majority pays for the boost given to students near the end.
+
+TutorSession picks this up by itself: pass the scheduler as the session's
+LLM and the session schedules every call under its own user ID and
+deadline (see for_student).
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from client.ai_client import GenerationHandle, SimpleAIClient
+from utils.config import LLM_MAX_CONCURRENT, LLM_QUEUE_TARGET_WAIT, SESSION_DURATION
+from utils.metrics import REGISTRY
+from utils.timing import summarize
+
+LLM_QUEUE_SECONDS = REGISTRY.histogram(
+    "tutor_llm_queue_seconds", "Time LLM calls waited for a concurrency slot")
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "tutor_llm_queue_depth", "LLM calls waiting for a concurrency slot")
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "tutor_llm_in_flight", "LLM calls currently running")
+
+# Queue-wait stats are grouped by how much session time the student had left
+REMAINING_BANDS = ((60, "< 1 min"), (300, "1-5 min"), (math.inf, "> 5 min"))
+
+
+def remaining_band(remaining: Optional[float]) -> str:
+    if remaining is None:
+        return "not started"
+    for limit, label in REMAINING_BANDS:
+        if remaining < limit:
+            return label
+    return REMAINING_BANDS[-1][1]
+
+
+def due_time(arrived: float, remaining: Optional[float],
+             target_wait: float = LLM_QUEUE_TARGET_WAIT) -> float:
+    """When a request arriving at `arrived` should be served, given session time left."""
+    share = 1.0 if remaining is None else min(1.0, max(0.0, remaining / SESSION_DURATION))
+    return arrived + target_wait * share
+
+
+class _Waiter:
+    __slots__ = ("student", "due", "seq", "ready", "withdrawn")
+
+    def __init__(self, student: str, due: float, seq: int):
+        self.student = student
+        self.due = due
+        self.seq = seq
+        self.ready = threading.Event()
+        self.withdrawn = False
+
+
+class LLMScheduler:
+    """
+    Wraps one LLM client (SimpleAIClient) shared by every session in the
+    process. With `fifo=True` it queues in arrival order instead (for
+    comparison in benchmarks).
+    """
+
+    def __init__(self, llm, max_concurrent: int = LLM_MAX_CONCURRENT, fifo: bool = False,
+                 target_wait: float = LLM_QUEUE_TARGET_WAIT, history: int = 2000):
+        self.llm = llm
+        self.max_concurrent = max_concurrent
+        self.fifo = fifo
+        self.target_wait = target_wait
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._running: Counter = Counter()
+        self._active = 0
+        self._waiting = 0
+        self._seq = itertools.count()
+        self._waits: Deque[Tuple[str, float]] = deque(maxlen=history)
+
+    def for_student(self, student: str,
+                    deadline: Callable[[], Optional[float]]) -> "StudentLLM":
+        """The client one session uses; `deadline` is read at each call."""
+        return StudentLLM(self, student, deadline)
+
+    # -------- Slots --------
+
+    @contextmanager
+    def slot(self, student: str, deadline: Optional[float] = None,
+             handle: Optional[GenerationHandle] = None):
+        """
+        Hold one concurrency slot for the enclosed call. If `handle` is
+        cancelled while waiting, leaves the queue and raises GenerationCancelled.
+        """
+        if not self.max_concurrent:
+            yield
+            return
+        self._acquire(student, deadline, handle)
+        try:
+            yield
+        finally:
+            self._release(student)
+
+    def _acquire(self, student: str, deadline: Optional[float],
+                 handle: Optional[GenerationHandle] = None):
+        now = time.time()
+        remaining = None if deadline is None else deadline - now
+        band = remaining_band(remaining)
+        start = time.perf_counter()
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._start(student)
+                waiter = None
+            else:
+                waiter = _Waiter(student, due_time(now, remaining, self.target_wait),
+                                 next(self._seq))
+                self._queues.setdefault(student, deque()).append(waiter)
+                self._waiting += 1
+                LLM_QUEUE_DEPTH.set(self._waiting)
+        if waiter is not None:
+            if handle is not None:
+                handle.on_cancel(lambda: self._withdraw(waiter))
+            waiter.ready.wait()
+            if waiter.withdrawn:
+                handle.check()
+
+        waited = time.perf_counter() - start
+        LLM_QUEUE_SECONDS.observe(waited, remaining=band)
+        with self._lock:
+            self._waits.append((band, waited))
+
+    def _start(self, student: str):
+        self._active += 1
+        self._running[student] += 1
+        LLM_IN_FLIGHT.set(self._active)
+
+    def _release(self, student: str):
+        with self._lock:
+            self._active -= 1
+            self._running[student] -= 1
+            if not self._running[student]:
+                del self._running[student]
+            self._dispatch()
+            LLM_IN_FLIGHT.set(self._active)
+
+    def _withdraw(self, waiter: _Waiter):
+        """Take a cancelled call out of the queue, if it's still waiting."""
+        with self._lock:
+            queue = self._queues.get(waiter.student)
+            if queue is None or waiter not in queue:
+                return
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.student]
+            self._waiting -= 1
+            waiter.withdrawn = True
+            LLM_QUEUE_DEPTH.set(self._waiting)
+        waiter.ready.set()
+
+    def _priority(self, waiter: _Waiter) -> Tuple:
+        if self.fifo:
+            return (waiter.seq,)
+        return (waiter.due + self.target_wait * self._running[waiter.student], waiter.seq)
+
+    def _dispatch(self):
+        """Hand free slots to the best waiting students (lock held)."""
+        while self._waiting and self._active < self.max_concurrent:
+            # Only the head of each student's queue competes
+            waiter = min((queue[0] for queue in self._queues.values()), key=self._priority)
+            queue = self._queues[waiter.student]
+            queue.popleft()
+            if not queue:
+                del self._queues[waiter.student]
+            self._waiting -= 1
+            self._start(waiter.student)
+            waiter.ready.set()
+        LLM_QUEUE_DEPTH.set(self._waiting)
+
+    # -------- Stats --------
+
+    def stats(self) -> Dict[str, object]:
+        """Current queue and recent waits, overall and by session time left."""
+        with self._lock:
+            waits = list(self._waits)
+            stats = {
+                'max_concurrent': self.max_concurrent,
+                'running': self._active,
+                'waiting': self._waiting,
+                'students_waiting': len(self._queues),
+            }
+        by_band: Dict[str, List[float]] = {}
+        for band, waited in waits:
+            by_band.setdefault(band, []).append(waited)
+        stats['wait'] = summarize([waited for _, waited in waits])
+        stats['wait_by_remaining'] = {band: summarize(values) for band, values in by_band.items()}
+        return stats
+
+
+class StudentLLM:
+    """
+    One session's view of the scheduler. Has whichever generate_* methods
+    the wrapped client has, each run inside a scheduler slot.
+    """
+
+    def __init__(self, scheduler: LLMScheduler, student: str,
+                 deadline: Callable[[], Optional[float]]):
+        self.scheduler = scheduler
+        self.student = student
+        self.deadline = deadline
+
+    def __getattr__(self, name: str):
+        method = getattr(self.scheduler.llm, name)
+        if not name.startswith("generate_"):
+            return method
+
+        def scheduled(*args, **kwargs):
+            with self.scheduler.slot(self.student, self.deadline(), kwargs.get('handle')):
+                return method(*args, **kwargs)
+
+        return scheduled
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """The process-wide scheduler around one SimpleAIClient."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(SimpleAIClient())
+        return _scheduler
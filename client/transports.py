@@ -0,0 +1,190 @@
+"""
+LLM Transports
+How SimpleAIClient reaches the model: straight to OpenAI, or through the
+shared gateway process (client.llm_gateway) that every app replica uses
+
+A transport takes an OpenAI chat.completions request as a dict and returns
+a Completion, either in one piece (complete) or token by token (stream).
+An optional `timeout` bounds how long the call may wait for the model.
+"""
+
+import json
+import os
+import socket
+from dataclasses import asdict, dataclass
+from http.client import HTTPConnection
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import streamlit as st
+
+DeltaCallback = Callable[[str], None]
+
+
+@dataclass
+class Completion:
+    """One finished completion, however it was produced."""
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    finish_reason: Optional[str] = None
+    source: str = "upstream"  # Via the gateway: upstream, cached or coalesced
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Completion":
+        return cls(**{k: data[k] for k in cls.__dataclass_fields__ if k in data})
+
+
+def openai_api_key() -> Optional[str]:
+    """Streamlit secrets first, then the OPENAI_API_KEY environment variable."""
+    try:
+        return st.secrets["openai"]["api_key"]
+    except Exception:
+        return os.getenv('OPENAI_API_KEY')
+
+
+class OpenAITransport:
+    """Calls the OpenAI API from this process."""
+
+    def __init__(self, api_key: str):
+        # Imported here so replicas that only talk to the gateway don't need it
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key)
+
+    def _client(self, timeout: Optional[float]):
+        # A call with a deadline gets no retries: by the time one would start,
+        # the turn is better served by a fallback reply
+        if timeout is None:
+            return self.client
+        return self.client.with_options(timeout=timeout, max_retries=0)
+
+    def complete(self, request: Dict, timeout: Optional[float] = None) -> Completion:
+        response = self._client(timeout).chat.completions.create(**request)
+        choice = response.choices[0]
+        usage = response.usage
+        return Completion(
+            content=choice.message.content or "",
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            finish_reason=choice.finish_reason,
+        )
+
+    def stream(self, request: Dict, on_delta: DeltaCallback,
+               timeout: Optional[float] = None) -> Completion:
+        chunks = self._client(timeout).chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True})
+        parts, finish_reason, usage = [], None, None
+        try:
+            for chunk in chunks:
+                if chunk.usage is not None:
+                    usage = chunk.usage  # Last chunk, no choices
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+        finally:
+            # If on_delta raised (a cancelled generation), hanging up stops the generation
+            chunks.close()
+        return Completion(
+            content="".join(parts),
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            finish_reason=finish_reason,
+        )
+
+
+# ---------------------------------------------------------
+# Gateway client
+# ---------------------------------------------------------
+
+class GatewayError(Exception):
+    """The gateway refused or failed a request."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Gateway error {status}: {message}")
+        self.status = status
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """HTTP over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def gateway_connection(url: str, timeout: Optional[float] = None) -> HTTPConnection:
+    """Connection to a gateway at unix:///path/to.sock or http://host:port."""
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return UnixHTTPConnection(parsed.path, timeout)
+    return HTTPConnection(parsed.hostname or "127.0.0.1", parsed.port or 80, timeout=timeout)
+
+
+def default_replica() -> str:
+    """How this process identifies itself to the gateway."""
+    return os.getenv('TUTOR_REPLICA') or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class GatewayTransport:
+    """
+    Sends completions to the shared gateway, which owns rate limiting,
+    caching, coalescing and retries for every replica.
+    """
+
+    def __init__(self, url: str, replica: Optional[str] = None, timeout: float = 120.0):
+        self.url = url
+        self.replica = replica or default_replica()
+        self.timeout = timeout
+
+    def _post(self, path: str, request: Dict, timeout: Optional[float] = None):
+        conn = gateway_connection(self.url, min(timeout or self.timeout, self.timeout))
+        body = json.dumps({"request": request}).encode()
+        conn.request("POST", path, body=body, headers={
+            "Content-Type": "application/json",
+            "X-Replica": self.replica,
+        })
+        return conn, conn.getresponse()
+
+    def complete(self, request: Dict, timeout: Optional[float] = None) -> Completion:
+        conn, response = self._post("/v1/complete", request, timeout)
+        try:
+            data = json.loads(response.read() or b"{}")
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise GatewayError(response.status, data.get("error", response.reason))
+        return Completion.from_dict(data)
+
+    def stream(self, request: Dict, on_delta: DeltaCallback,
+               timeout: Optional[float] = None) -> Completion:
+        conn, response = self._post("/v1/stream", request, timeout)
+        try:
+            if response.status != 200:
+                data = json.loads(response.read() or b"{}")
+                raise GatewayError(response.status, data.get("error", response.reason))
+            # One JSON object per line: {"delta"}..., then {"done"} or {"error"}
+            result = None
+            for line in response:
+                event = json.loads(line)
+                if "delta" in event:
+                    on_delta(event["delta"])
+                elif "done" in event:
+                    result = Completion.from_dict(event["done"])
+                elif "error" in event:
+                    raise GatewayError(event.get("status", 502), event["error"])
+            if result is None:
+                raise GatewayError(502, "Stream ended without a result")
+            return result
+        finally:
+            conn.close()
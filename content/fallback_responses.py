@@ -0,0 +1,156 @@
+"""
+Fallback Responses
+Pre-authored tutor replies for each topic and scaffold step, served when
+the LLM is too slow or failing
+
+Replies are looked up by (topic, step, character), falling back to the
+plain tutor voice for that step and then to the built-in replies below,
+which every topic gets from its own content (metaphor, crisis, solution).
+content/generate_fallbacks.py writes a richer library offline, with
+several variants per step in each character's voice; a turn picks a
+variant by turn number, so a student who hits several degraded turns in a
+row doesn't see the same text twice.
+
+File format (FALLBACK_LIBRARY_FILE):
+
+    {"topics": {"arraylist": {"student_metaphor": {
+        "": ["plain tutor reply", ...],
+        "Batman": ["reply in Batman's voice", ...]}}}}
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from content.research_topics import RESEARCH_TOPICS, ResearchTopic, get_research_topic
+from utils.config import FALLBACK_LIBRARY_FILE
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Written to work whatever the student just said at that step
+DEFAULT_REPLIES = {
+    "initial_metaphor": (
+        "Hello! Let's learn about {name}.\n\n"
+        "{metaphor_prompt}\n\n"
+        "What does this remind you of from your own experience?"
+    ),
+    "student_metaphor": (
+        "That's a helpful way to picture it! Now here's the problem we need to "
+        "solve: {agent_crisis}\n\n"
+        "Are you ready to see how Java code handles this?"
+    ),
+    "code_structure": (
+        "Let's look at what the code has to do. The key part is this: {code_focus}\n\n"
+        "Walk through those steps one at a time. Which one do you think does "
+        "the most work, and why?"
+    ),
+    "code_usage": (
+        "Now let's think about what this means when a real program runs. "
+        "Java handles a lot of this for you, but the work still happens.\n\n"
+        "Why might it still be important to understand what's going on under the hood?"
+    ),
+    "practice": (
+        "Give it a try in your own words or in code. Here's what we're aiming "
+        "for: {agent_solution}\n\n"
+        "What would your first step look like?"
+    ),
+    "reflection": (
+        "Let's wrap up. How would you explain {name} to a classmate, and how "
+        "does understanding what happens behind the scenes help you write "
+        "better programs?"
+    ),
+}
+
+GENERIC_REPLY = "Let's take that one step at a time. Can you tell me more about what you're thinking?"
+
+LibraryKey = Tuple[str, str, str]
+
+
+def default_reply(topic: ResearchTopic, step: str) -> str:
+    """The built-in reply for one topic and step."""
+    template = DEFAULT_REPLIES.get(step)
+    if template is None:
+        return GENERIC_REPLY
+    return template.format(
+        name=topic.name,
+        metaphor_prompt=topic.metaphor_prompt,
+        agent_crisis=topic.agent_crisis,
+        agent_solution=topic.agent_solution,
+        code_focus=topic.code_focus,
+    )
+
+
+class FallbackLibrary:
+    """Reply variants keyed by (topic key, step, character or "")."""
+
+    def __init__(self, entries: Optional[Dict[LibraryKey, List[str]]] = None):
+        self._entries: Dict[LibraryKey, List[str]] = {}
+        for key, replies in (entries or {}).items():
+            if replies:
+                self._entries[key] = list(replies)
+        # Built-in replies are the last resort for every topic and step
+        for topic in RESEARCH_TOPICS.values():
+            for step in DEFAULT_REPLIES:
+                self._entries.setdefault((topic.key, step, ""), [default_reply(topic, step)])
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "FallbackLibrary":
+        """Read a library file; a missing or unreadable file leaves only the built-in replies."""
+        path = path or FALLBACK_LIBRARY_FILE
+        if path and not os.path.isabs(path):
+            path = os.path.join(_ROOT, path)
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read fallback library %s: %s", path, e)
+            return cls()
+        return cls({
+            (topic_key, step, character): replies
+            for topic_key, steps in data.get('topics', {}).items()
+            for step, characters in steps.items()
+            for character, replies in characters.items()
+        })
+
+    def to_json(self) -> Dict:
+        """The library in the file format."""
+        topics: Dict = {}
+        for (topic_key, step, character), replies in sorted(self._entries.items()):
+            topics.setdefault(topic_key, {}).setdefault(step, {})[character] = replies
+        return {'topics': topics}
+
+    def __len__(self) -> int:
+        return sum(len(replies) for replies in self._entries.values())
+
+    def replies(self, topic_key: str, step: str, character: Optional[str] = None) -> List[str]:
+        """Variants for a step in the character's voice, else the plain tutor's."""
+        if character:
+            replies = self._entries.get((topic_key, step, character))
+            if replies:
+                return replies
+        replies = self._entries.get((topic_key, step, ""))
+        if replies:
+            return replies
+        return [default_reply(get_research_topic(topic_key), step)]
+
+    def lookup(self, topic_key: str, step: str, character: Optional[str] = None,
+               turn: int = 0) -> str:
+        """One reply for this turn."""
+        replies = self.replies(topic_key, step, character)
+        return replies[turn % len(replies)]
+
+
+_library: Optional[FallbackLibrary] = None
+
+
+def get_fallback_library() -> FallbackLibrary:
+    """The library from FALLBACK_LIBRARY_FILE, loaded on first use."""
+    global _library
+    if _library is None:
+        _library = FallbackLibrary.load()
+    return _library
@@ -0,0 +1,91 @@
+"""
+Fallback Library Generator
+Write the pre-authored fallback replies (content/fallback_responses.py)
+offline, with the same prompts the live tutor uses
+
+For every topic, scaffold step and character (plus the plain tutor of
+condition 2) asks the LLM for several replies that fit the step whatever
+the student has just said. Review the file before deploying it: these
+replies reach students without any live model in the loop.
+
+Usage:
+    python -m content.generate_fallbacks                      # all topics and characters
+    python -m content.generate_fallbacks --variants 5 --topic arraylist
+    python -m content.generate_fallbacks --no-characters --output /tmp/fallbacks.json
+"""
+
+import argparse
+import json
+import os
+from typing import Iterable, List, Optional
+
+from characters import get_all_character_names
+from content.fallback_responses import FallbackLibrary
+from content.research_topics import RESEARCH_TOPICS
+from tutor_flow.prompt_templates import PROMPT_TEMPLATES
+from tutor_flow.steps import ScaffoldStep
+from utils.config import FALLBACK_LIBRARY_FILE
+
+# FALLBACK_LIBRARY_FILE is relative to the repo root, as FallbackLibrary.load reads it
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GENERIC_TURN = (
+    "The student's latest message is not available. Reply for this stage in a "
+    "way that makes sense whatever they just said: don't quote them or refer to "
+    "specifics of their answer, and end with a question that keeps this stage going."
+)
+
+
+def generate_library(llm, topic_keys: Iterable[str], character_names: Iterable[Optional[str]],
+                     variants: int, temperature: float = 0.9) -> FallbackLibrary:
+    """Ask `llm` (SimpleAIClient or a mock) for `variants` replies per topic x step x character."""
+    entries = {}
+    for topic_key in topic_keys:
+        for character_name in character_names:
+            for step in ScaffoldStep:
+                system_prompt = PROMPT_TEMPLATES.turn_prefix(topic_key, step, character_name)
+                replies: List[str] = []
+                for _ in range(variants):
+                    reply = llm.generate_response(
+                        system_prompt=system_prompt,
+                        user_message=GENERIC_TURN,
+                        temperature=temperature,
+                    ).strip()
+                    if reply and reply not in replies:
+                        replies.append(reply)
+                entries[(topic_key, step.value, character_name or "")] = replies
+                print(f"{topic_key:<12}{step.value:<18}{character_name or '(tutor)':<20}"
+                      f"{len(replies)} replies")
+    return FallbackLibrary(entries)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the fallback reply library.")
+    parser.add_argument("--output", default=os.path.join(_ROOT, FALLBACK_LIBRARY_FILE),
+                        help="Library file (JSON)")
+    parser.add_argument("--topic", action="append", choices=sorted(RESEARCH_TOPICS),
+                        help="Only this topic (repeatable); default all")
+    parser.add_argument("--variants", type=int, default=3, help="Replies per topic, step and character")
+    parser.add_argument("--no-characters", action="store_true",
+                        help="Only the plain tutor voice (condition 2)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from client.ai_client import SimpleAIClient
+
+    args = parse_args(argv)
+    characters = [None] if args.no_characters else [None] + get_all_character_names()
+    library = generate_library(SimpleAIClient(), args.topic or list(RESEARCH_TOPICS),
+                               characters, args.variants)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(library.to_json(), f, indent=2, ensure_ascii=False)
+    print(f"\nWrote {len(library)} replies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,79 @@ Updated with Professor's "Stop Sign" and "Suitcase" methodologies
 """
 
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Optional
+
+# -------------------------------------------------------------------------
+# STEP ADVANCE MATCHERS
+# When the student's reply moves the scaffold to the next step. Per step:
+#   phrases   - advance if any of these appears as whole words (any case)
+#   patterns  - same, but as regular expressions
+#   block     - never advance if any of these appears ("not ready")
+#   min_chars - advance only if the stripped reply is at least this long
+# Steps without an entry never advance on their own.
+# -------------------------------------------------------------------------
+DEFAULT_ADVANCE_MATCHERS = {
+    "initial_metaphor": {
+        # Any reasonably substantive metaphor/response
+        "min_chars": 16,
+    },
+    "student_metaphor": {
+        # Only when they explicitly signal readiness
+        "phrases": ["ready", "go", "show me", "yes", "ok", "okay",
+                    "understand", "yep", "yeah"],
+        "block": ["not ready", "not yet", "don't understand", "dont understand",
+                  "do not understand", "not ok", "not okay"],
+    },
+    "code_structure": {
+        # Acknowledgment of the manual logic / "hidden work"
+        "phrases": ["makes sense", "i see", "got it", "understand"],
+        "patterns": [r"oh{2,}"],
+        "block": ["doesn't make sense", "doesnt make sense", "does not make sense",
+                  "don't understand", "dont understand", "do not understand",
+                  "don't see", "dont see", "don't get it", "dont get it"],
+    },
+    "code_usage": {
+        # Any minimal engagement moves them on to practice
+        "min_chars": 11,
+    },
+}
+
+
+# -------------------------------------------------------------------------
+# GENERATION PROFILES
+# How the tutor's reply is generated at each step:
+#   max_tokens  - hard ceiling on the reply; the prompts ask for under 80
+#                 words (opening) or 150 words (every reply, plus code when
+#                 the step shows it), so this leaves headroom, not a target
+#   temperature - sampling temperature
+#   stop        - stop sequences (the model starting to write the student's part)
+# Compare against the recorded finish_reason and completion_tokens per
+# step (tutor_reply_tokens, tutor_reply_finish_total) before tightening.
+# -------------------------------------------------------------------------
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Generation settings for the tutor's reply at one scaffold step."""
+    max_tokens: int = 300
+    temperature: float = 0.9
+    stop: tuple[str, ...] = ("\nStudent:", "\nStudent (")
+
+
+DEFAULT_GENERATION_PROFILES = {
+    "initial_metaphor": GenerationProfile(max_tokens=160),
+    "student_metaphor": GenerationProfile(max_tokens=260),
+    "code_structure": GenerationProfile(max_tokens=450),  # pseudocode or Java
+    "code_usage": GenerationProfile(max_tokens=380),
+    "practice": GenerationProfile(max_tokens=380),        # feedback on their code
+    "reflection": GenerationProfile(max_tokens=260),
+}
+
+
+def _with_phrases(matchers: dict, step: str, extra: list) -> dict:
+    """Copy of `matchers` with extra acknowledgment phrases for one step."""
+    step_matcher = dict(matchers[step])
+    step_matcher["phrases"] = step_matcher.get("phrases", []) + extra
+    return {**matchers, step: step_matcher}
+
 
 @dataclass
 # content/research_topics.py
@@ -28,6 +100,8 @@ class ResearchTopic:
         agent_solution: str,
         code_focus: str,
         instructions: dict[str, str],
+        advance_matchers: Optional[dict[str, dict]] = None,
+        generation_profiles: Optional[dict[str, GenerationProfile]] = None,
     ):
         self.key = key
         self.name = name
@@ -39,6 +113,9 @@ class ResearchTopic:
         self.agent_solution = agent_solution
         self.code_focus = code_focus
         self.instructions = instructions
+        self.advance_matchers = advance_matchers or DEFAULT_ADVANCE_MATCHERS
+        # Per-step overrides on top of the defaults
+        self.generation_profiles = {**DEFAULT_GENERATION_PROFILES, **(generation_profiles or {})}
 
     def instructions_for(self, step_name: str) -> str:
         """
@@ -46,6 +123,12 @@ class ResearchTopic:
         """
         return self.instructions.get(step_name, "")
 
+    def generation_profile(self, step_name: str) -> GenerationProfile:
+        """
+        Return the generation settings for a given scaffold step.
+        """
+        return self.generation_profiles.get(step_name, GenerationProfile())
+
 
 # -------------------------------------------------------------------------
 # TOPIC 1: ARRAYLIST (The Suitcase / Dynamic Resizing)
@@ -137,7 +220,9 @@ ARRAYLIST_TOPIC = ResearchTopic(
             "3. End with the insight that ArrayList abstracts away the complexity, "
             "but the underlying O(n) behavior still matters for performance."
         ),
-    }
+    },
+    advance_matchers=_with_phrases(DEFAULT_ADVANCE_MATCHERS, "code_structure",
+                                   ["copy", "copies", "copying", "expensive", "heavy"]),
 )
 # -------------------------------------------------------------------------
 # TOPIC 2: RECURSION (The Stop Sign / Base Case)
@@ -217,7 +302,12 @@ RECURSION_TOPIC = ResearchTopic(
             "3. Ask them to explain, in their own words, how the call stack fills "
             "and then unwinds in the factorial example."
         ),
-    }
+    },
+    advance_matchers=_with_phrases(DEFAULT_ADVANCE_MATCHERS, "code_structure",
+                                   ["base case", "stop sign", "stops", "forever",
+                                    "infinite", "stack overflow"]),
+    # Factorial is shown twice: without the base case, then with it
+    generation_profiles={"code_structure": GenerationProfile(max_tokens=520)},
 )
 
 RESEARCH_TOPICS = {
@@ -183,13 +183,27 @@ def get_quiz(topic_key: str) -> List[QuizQuestion]:
         return []
 
 
+def label_quiz_answers(topic_key: str, user_answers: dict) -> dict:
+    """
+    Pair each answer's option index with its option text, for storage.
+    
+    Returns:
+        dict mapping question index to {'index': option index, 'label': option text}
+    """
+    quiz = get_quiz(topic_key)
+    return {
+        i: {'index': index, 'label': quiz[i].options[index]}
+        for i, index in user_answers.items()
+    }
+
+
 def score_quiz(topic_key: str, user_answers: dict) -> tuple:
     """
     Score a quiz.
     
     Args:
         topic_key: 'arraylist' or 'recursion'
-        user_answers: dict mapping question index to selected answer text
+        user_answers: dict mapping question index to selected option index
     
     Returns:
         (score, total, results_list)
@@ -200,9 +214,10 @@ def score_quiz(topic_key: str, user_answers: dict) -> tuple:
     score = 0
     
     for i, question in enumerate(quiz):
-        user_answer = user_answers.get(i)
+        user_index = user_answers.get(i)
+        user_answer = question.options[user_index] if user_index is not None else None
         correct_answer = question.options[question.correct_index]
-        is_correct = user_answer == correct_answer
+        is_correct = user_index == question.correct_index
         
         if is_correct:
             score += 1
@@ -4,7 +4,7 @@ Post-session survey to gather qualitative feedback
 """
 
 import streamlit as st
-from typing import Dict
+from typing import Callable, Dict, List
 
 
 # TODO: Refine these based on research goals
@@ -106,73 +106,83 @@ CHARACTER_SPECIFIC_QUESTIONS = {
 }
 
 
-def render_survey(topic_name: str, condition: int) -> Dict:
+def _is_answered(value) -> bool:
+    """Option index 0 is a valid answer, so only None/empty count as missing."""
+    return value is not None and value != ''
+
+
+def _render_choice(label: str, key: str, options: List[str]):
+    """Radio question whose stored value is the selected option index."""
+    st.radio(
+        label,
+        options=range(len(options)),
+        format_func=lambda idx: options[idx],
+        key=f"survey_{key}",
+        index=None
+    )
+
+
+def render_survey(topic_name: str, condition: int, on_submit: Callable):
     """
-    Render the survey and return responses.
+    Render the survey as a single form.
+    
+    Answers are sent to the server together when the form is submitted,
+    so answering a question does not trigger a rerun. Read them in
+    `on_submit` with collect_survey_responses().
     
     Args:
         topic_name: Name of the topic (for substitution in questions)
         condition: 1 (character), 2 (non-character), or 3 (control)
-    
-    Returns:
-        Dict of responses
+        on_submit: Callback run when the form is submitted
     """
     st.header("📋 Quick Survey")
     st.write(f"Please share your thoughts about learning {topic_name}")
     st.write("This will help us improve the learning experience!")
     st.write("---")
     
-    responses = {}
-    
-    # Render standard questions
-    for key, q_data in SURVEY_QUESTIONS.items():
-        q_text = q_data['text'].format(topic=topic_name)
-        
-        if q_data['type'] == 'likert_5':
-            response = st.radio(
-                q_text,
-                options=q_data['options'],
-                key=f"survey_{key}",
-                index=None
-            )
-            responses[key] = response
-            st.write("")  # Spacing
+    with st.form("survey_form"):
+        # Render standard questions
+        for key, q_data in SURVEY_QUESTIONS.items():
+            q_text = q_data['text'].format(topic=topic_name)
             
-        elif q_data['type'] == 'text':
-            response = st.text_area(
-                q_text,
-                placeholder=q_data.get('placeholder', ''),
-                key=f"survey_{key}"
-            )
-            responses[key] = response
-            st.write("")
+            if q_data['type'] in ('likert_5', 'yes_no'):
+                _render_choice(q_text, key, q_data['options'])
+                st.write("")  # Spacing
+                
+            elif q_data['type'] == 'text':
+                st.text_area(
+                    q_text,
+                    placeholder=q_data.get('placeholder', ''),
+                    key=f"survey_{key}"
+                )
+                st.write("")
+        
+        # Add character-specific questions if condition 1
+        if condition == 1:
+            st.write("---")
+            st.subheader("About the Character")
             
-        elif q_data['type'] == 'yes_no':
-            response = st.radio(
-                q_text,
-                options=q_data['options'],
-                key=f"survey_{key}",
-                index=None
-            )
-            responses[key] = response
-            st.write("")
-    
-    # Add character-specific questions if condition 1
-    if condition == 1:
-        st.write("---")
-        st.subheader("About the Character")
+            for key, q_data in CHARACTER_SPECIFIC_QUESTIONS.items():
+                _render_choice(q_data['text'], key, q_data['options'])
+                st.write("")
         
-        for key, q_data in CHARACTER_SPECIFIC_QUESTIONS.items():
-            response = st.radio(
-                q_data['text'],
-                options=q_data['options'],
-                key=f"survey_{key}",
-                index=None
-            )
-            responses[key] = response
-            st.write("")
+        st.write("---")
+        st.form_submit_button("Submit Survey", type="primary", on_click=on_submit)
+
+
+def collect_survey_responses(condition: int) -> Dict:
+    """
+    Read the submitted survey answers from session state.
     
-    return responses
+    Returns:
+        Dict of responses; choice questions hold the option index,
+        text questions hold the text
+    """
+    keys = list(SURVEY_QUESTIONS.keys())
+    if condition == 1:
+        keys += list(CHARACTER_SPECIFIC_QUESTIONS.keys())
+    
+    return {key: st.session_state.get(f"survey_{key}") for key in keys}
 
 
 def validate_survey_complete(responses: Dict) -> tuple:
@@ -186,7 +196,7 @@ def validate_survey_complete(responses: Dict) -> tuple:
     
     answered = 0
     for key in required_keys:
-        if key in responses and responses[key]:
+        if key in responses and _is_answered(responses[key]):
             answered += 1
     
     missing = len(required_keys) - answered
@@ -195,12 +205,35 @@ def validate_survey_complete(responses: Dict) -> tuple:
     return is_complete, missing
 
 
+def label_survey_responses(responses: Dict) -> Dict:
+    """
+    Pair each choice answer's option index with its option text, for storage.
+    
+    Returns:
+        Dict of responses; choice questions hold {'index': option index,
+        'label': option text}, text questions hold the text
+    """
+    questions = {**SURVEY_QUESTIONS, **CHARACTER_SPECIFIC_QUESTIONS}
+    
+    labeled = {}
+    for key, value in responses.items():
+        options = questions.get(key, {}).get('options')
+        if options and isinstance(value, int):
+            labeled[key] = {'index': value, 'label': options[value]}
+        else:
+            labeled[key] = value
+    return labeled
+
+
 def get_survey_summary(responses: Dict) -> str:
     """Create a summary string of survey responses for export."""
     summary_parts = []
     
     for key, value in responses.items():
-        if value:
+        # Stored choice answers carry their option text next to the index
+        if isinstance(value, dict):
+            value = value.get('label')
+        if _is_answered(value):
             summary_parts.append(f"{key}={value}")
     
     return " | ".join(summary_parts)
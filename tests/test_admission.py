@@ -0,0 +1,75 @@
+import pytest
+
+from client import admission
+from client.admission import AdmissionController, AdmissionThresholds, CapacitySignals
+
+
+@pytest.fixture
+def signals():
+    return CapacitySignals()
+
+
+@pytest.fixture
+def controller(signals):
+    return AdmissionController(signals=lambda: signals,
+                               thresholds=AdmissionThresholds(max_in_flight=4, max_queue_depth=2,
+                                                              max_llm_p95=10.0, max_db_p95=2.0),
+                               enabled=True, ticket_ttl=30)
+
+
+def test_admits_immediately_when_healthy(controller):
+    assert controller.request("ana", "arraylist") is None
+
+
+def test_queues_in_arrival_order_when_overloaded(controller, signals):
+    signals.in_flight = 4
+    assert controller.request("ana", "arraylist") == 1
+    assert controller.request("ben", "arraylist") == 2
+    # Checking back keeps your place
+    assert controller.request("ana", "arraylist") == 1
+    assert controller.request("ben", "recursion") == 2
+
+
+def test_only_the_front_of_the_line_is_admitted(controller, signals):
+    signals.queue_depth = 2
+    controller.request("ana", "arraylist")
+    controller.request("ben", "arraylist")
+    signals.queue_depth = 0
+    assert controller.request("ben", "arraylist") == 2
+    # Nobody jumps the line while it is non-empty, even when healthy
+    assert controller.request("cal", "arraylist") == 3
+    assert controller.request("ana", "arraylist") is None
+    assert controller.request("ben", "arraylist") is None
+    assert controller.request("cal", "arraylist") is None
+
+
+def test_leaving_moves_the_line_up(controller, signals):
+    signals.llm_p95 = 12.0
+    controller.request("ana", "arraylist")
+    controller.request("ben", "arraylist")
+    controller.leave("ana")
+    assert controller.request("ben", "arraylist") == 1
+
+
+def test_students_who_stop_checking_back_lose_their_place(controller, signals, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "time", lambda: now[0])
+    signals.db_p95 = 5.0
+    controller.request("ana", "arraylist")
+    now[0] += 20
+    controller.request("ben", "arraylist")
+    now[0] += 20
+    assert controller.request("ben", "arraylist") == 1
+
+
+def test_disabled_controller_admits_everyone(controller, signals):
+    signals.in_flight = 100
+    controller.set_thresholds(controller.thresholds, enabled=False)
+    assert controller.request("ana", "arraylist") is None
+
+
+def test_breaches_lists_signals_at_or_over_threshold():
+    thresholds = AdmissionThresholds(max_in_flight=4, max_queue_depth=2,
+                                     max_llm_p95=10.0, max_db_p95=2.0)
+    assert CapacitySignals(in_flight=3, queue_depth=1).breaches(thresholds) == []
+    assert CapacitySignals(in_flight=4, db_p95=2.5).breaches(thresholds) == ['in_flight', 'db_p95']
@@ -0,0 +1,46 @@
+from tutor_flow.advance import StepMatcher, matchers_for_topic
+
+
+def test_phrases_match_whole_words_only():
+    matcher = StepMatcher({"phrases": ["go", "ok"]})
+    assert matcher("ok, let's go")
+    assert not matcher("the algorithm is in the book")
+
+
+def test_multi_word_phrase_allows_any_whitespace():
+    matcher = StepMatcher({"phrases": ["makes sense"]})
+    assert matcher("That MAKES\n  sense now")
+    assert not matcher("that makes no sense")
+
+
+def test_block_phrase_wins_over_advance_phrase():
+    matcher = StepMatcher({"phrases": ["ready"], "block": ["not ready"]})
+    assert matcher("I'm ready")
+    assert not matcher("I'm not ready")
+    assert not matcher("ready? no, not ready yet")
+
+
+def test_patterns_are_regexes():
+    matcher = StepMatcher({"patterns": [r"oh{2,}"]})
+    assert matcher("Ohhh, I see")
+    assert not matcher("oh, what?")
+
+
+def test_min_chars_alone_advances_on_long_enough_replies():
+    matcher = StepMatcher({"min_chars": 10})
+    assert matcher("a long enough reply")
+    assert not matcher("   short   ")
+
+
+def test_min_chars_applies_before_phrases():
+    matcher = StepMatcher({"phrases": ["yes"], "min_chars": 10})
+    assert not matcher("yes")
+    assert matcher("yes, I can see it")
+
+
+def test_empty_spec_never_advances():
+    assert not StepMatcher({})("anything at all")
+
+
+def test_unknown_topic_gets_default_matchers():
+    assert matchers_for_topic("no such topic").keys() == matchers_for_topic("arraylist").keys()
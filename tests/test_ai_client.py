@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from client.ai_client import GenerationCancelled, GenerationHandle, SimpleAIClient
+from client.transports import Completion
+from utils.metrics import LLM_REQUEST_SECONDS
+
+
+class FakeTransport:
+    """Records the timeout of each call; streams one chunk or fails."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.timeouts = []
+
+    def complete(self, request, timeout=None):
+        return self.stream(request, lambda delta: None, timeout)
+
+    def stream(self, request, on_delta, timeout=None):
+        self.timeouts.append(timeout)
+        if self.error is not None:
+            raise self.error
+        on_delta("reply")
+        return Completion("reply", prompt_tokens=5, completion_tokens=1, finish_reason="stop")
+
+
+def samples():
+    return LLM_REQUEST_SECONDS.render()
+
+
+def complete(client, handle=None):
+    return client._complete("generate_response", [{"role": "user", "content": "hi"}],
+                            temperature=0.9, max_tokens=50, handle=handle)
+
+
+def test_timeout_follows_the_turn_deadline():
+    transport = FakeTransport()
+    client = SimpleAIClient(transport=transport)
+    complete(client)
+    handle = GenerationHandle("ana/arraylist", turn=1)
+    handle.deadline = time.monotonic() + 5
+    complete(client, handle)
+    assert transport.timeouts[0] is None
+    assert 4 < transport.timeouts[1] <= 5
+
+
+def test_failed_and_cancelled_calls_are_not_timed():
+    before = samples()
+    with pytest.raises(TimeoutError):
+        complete(SimpleAIClient(transport=FakeTransport(TimeoutError())))
+    handle = GenerationHandle("ana/arraylist", turn=1)
+    handle.started = True
+    client = SimpleAIClient(transport=FakeTransport())
+    handle.cancel("over_budget")
+    with pytest.raises(GenerationCancelled):
+        complete(client, handle)
+    assert samples() == before
+
+    complete(client)
+    assert samples() != before
@@ -0,0 +1,37 @@
+from content.static_quiz import get_quiz, label_quiz_answers, score_quiz
+from content.survey import get_survey_summary, label_survey_responses
+
+
+def test_quiz_answers_are_stored_with_their_option_text():
+    quiz = get_quiz('arraylist')
+    answers = {i: q.correct_index for i, q in enumerate(quiz)}
+    answers[0] = 0
+
+    labeled = label_quiz_answers('arraylist', answers)
+
+    assert labeled[0] == {'index': 0, 'label': quiz[0].options[0]}
+    assert labeled[1] == {'index': quiz[1].correct_index,
+                          'label': quiz[1].options[quiz[1].correct_index]}
+    # Scoring still works on the indices
+    assert score_quiz('arraylist', answers)[0] == len(quiz) - 1
+
+
+def test_survey_choice_answers_get_labels_and_text_answers_pass_through():
+    labeled = label_survey_responses({
+        'engagement': 0,
+        'would_use_again': 2,
+        'character_helpful': 4,
+        'what_liked': "The examples",
+    })
+
+    assert labeled['engagement'] == {'index': 0, 'label': 'Strongly Disagree'}
+    assert labeled['would_use_again'] == {'index': 2, 'label': 'Maybe'}
+    assert labeled['character_helpful'] == {'index': 4, 'label': 'Strongly Agree'}
+    assert labeled['what_liked'] == "The examples"
+
+
+def test_export_summary_shows_labels_for_new_and_older_records():
+    stored = label_survey_responses({'engagement': 3, 'what_improve': ""})
+    assert get_survey_summary(stored) == "engagement=Agree"
+    # Records saved before indices were stored hold the text directly
+    assert get_survey_summary({'engagement': 'Agree'}) == "engagement=Agree"
@@ -0,0 +1,60 @@
+import json
+import os
+
+from content.fallback_responses import DEFAULT_REPLIES, GENERIC_REPLY, FallbackLibrary
+from content.research_topics import get_research_topic
+from utils.config import FALLBACK_LIBRARY_FILE
+
+
+def test_builtin_reply_for_every_topic_and_step():
+    library = FallbackLibrary()
+    topic = get_research_topic("arraylist")
+    for step in DEFAULT_REPLIES:
+        reply = library.lookup("arraylist", step)
+        assert reply and "{" not in reply
+    assert topic.name in library.lookup("arraylist", "initial_metaphor")
+
+
+def test_variants_rotate_by_turn():
+    library = FallbackLibrary({("arraylist", "practice", ""): ["one", "two", "three"]})
+    assert [library.lookup("arraylist", "practice", turn=t) for t in range(4)] == \
+        ["one", "two", "three", "one"]
+
+
+def test_character_voice_falls_back_to_plain_tutor():
+    library = FallbackLibrary({
+        ("arraylist", "practice", ""): ["plain"],
+        ("arraylist", "practice", "Batman"): ["batman"],
+    })
+    assert library.lookup("arraylist", "practice", "Batman") == "batman"
+    assert library.lookup("arraylist", "practice", "Yoda") == "plain"
+    assert library.lookup("arraylist", "practice") == "plain"
+
+
+def test_unknown_step_gets_generic_reply():
+    assert FallbackLibrary().lookup("arraylist", "no_such_step") == GENERIC_REPLY
+
+
+def test_library_file_round_trip(tmp_path):
+    library = FallbackLibrary({("recursion", "reflection", "Batman"): ["a", "b"]})
+    path = tmp_path / "fallbacks.json"
+    path.write_text(json.dumps(library.to_json()))
+    loaded = FallbackLibrary.load(str(path))
+    assert loaded.replies("recursion", "reflection", "Batman") == ["a", "b"]
+    assert len(loaded) == len(library)
+
+
+def test_missing_or_broken_file_leaves_builtin_replies(tmp_path):
+    builtin = len(FallbackLibrary())
+    assert len(FallbackLibrary.load(str(tmp_path / "missing.json"))) == builtin
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json")
+    assert len(FallbackLibrary.load(str(broken))) == builtin
+
+
+def test_generator_writes_where_the_app_reads(monkeypatch, tmp_path):
+    from content import fallback_responses
+    from content.generate_fallbacks import parse_args
+    monkeypatch.chdir(tmp_path)
+    output = parse_args([]).output
+    assert output == os.path.join(fallback_responses._ROOT, FALLBACK_LIBRARY_FILE)
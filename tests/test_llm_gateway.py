@@ -0,0 +1,137 @@
+import pytest
+
+from client import llm_gateway
+from client.llm_gateway import LLMGateway, RateLimited, RateLimiter, ResponseCache, TokenBucket
+from client.transports import Completion
+
+
+# -------- TokenBucket --------
+
+def test_bucket_starts_full_and_serves_without_waiting():
+    bucket = TokenBucket(per_minute=60)
+    bucket.updated = 0.0
+    assert bucket.reserve(60, now=0.0) == 0.0
+
+
+def test_bucket_wait_is_time_to_refill_the_overdraft():
+    bucket = TokenBucket(per_minute=60)  # 1 per second
+    bucket.updated = 0.0
+    bucket.reserve(60, now=0.0)
+    assert bucket.reserve(3, now=0.0) == pytest.approx(3.0)
+    # Later reservations queue behind earlier ones
+    assert bucket.reserve(2, now=0.0) == pytest.approx(5.0)
+
+
+def test_bucket_refills_continuously_up_to_capacity():
+    bucket = TokenBucket(per_minute=60)
+    bucket.updated = 0.0
+    bucket.reserve(60, now=0.0)
+    assert bucket.reserve(10, now=10.0) == 0.0
+    bucket.refund(1000, now=10.0)
+    assert bucket.level == bucket.capacity
+
+
+def test_bucket_reservation_is_capped_at_capacity():
+    bucket = TokenBucket(per_minute=60)
+    bucket.updated = 0.0
+    assert bucket.reserve(600, now=0.0) == 0.0
+
+
+# -------- RateLimiter --------
+
+def test_limiter_rejects_and_refunds_beyond_max_wait():
+    limiter = RateLimiter(rpm=600, tpm=600, max_wait=0.5)
+    assert limiter.acquire(600) == 0.0
+    with pytest.raises(RateLimited):
+        limiter.acquire(100)  # ~10 s to refill
+    assert limiter.tokens.level == pytest.approx(0.0, abs=1.0)
+    assert limiter.requests.level == pytest.approx(599.0, abs=1.0)
+
+
+def test_limiter_settle_returns_unused_tokens():
+    limiter = RateLimiter(rpm=600, tpm=600, max_wait=0.5)
+    limiter.acquire(600)
+    limiter.settle(reserved=600, used=100)
+    assert limiter.tokens.level == pytest.approx(500.0, abs=1.0)
+    limiter.settle(reserved=100, used=150)  # Overruns aren't charged twice
+    assert limiter.tokens.level == pytest.approx(500.0, abs=1.0)
+
+
+def test_limiter_waits_for_short_overdrafts():
+    limiter = RateLimiter(rpm=6000, tpm=60_000, max_wait=1.0)
+    limiter.acquire(60_000)
+    assert 0.0 < limiter.acquire(50) <= 0.1
+
+
+# -------- ResponseCache --------
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_gateway.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_cache_returns_entries_until_they_expire(clock):
+    cache = ResponseCache(ttl=10, size=4)
+    completion = Completion("reply")
+    cache.put("key", completion)
+    assert cache.get("key") is completion
+    clock[0] += 10
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = ResponseCache(ttl=10, size=2)
+    cache.put("a", Completion("a"))
+    cache.put("b", Completion("b"))
+    cache.get("a")
+    cache.put("c", Completion("c"))
+    assert cache.get("b") is None
+    assert cache.get("a").content == "a"
+    assert cache.get("c").content == "c"
+
+
+def test_cache_with_no_ttl_is_off():
+    cache = ResponseCache(ttl=0, size=2)
+    cache.put("a", Completion("a"))
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+# -------- Sharing --------
+
+class CountingUpstream:
+    """Answers every request with a fresh completion, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, request):
+        self.calls += 1
+        return Completion(f"reply {self.calls}", prompt_tokens=10, completion_tokens=5)
+
+
+def request(temperature):
+    return {"model": "gpt-4o-mini", "temperature": temperature, "max_tokens": 50,
+            "messages": [{"role": "user", "content": "Give me an opening metaphor."}]}
+
+
+def test_deterministic_requests_are_cached():
+    upstream = CountingUpstream()
+    gateway = LLMGateway(upstream, cache_ttl=60)
+    first = gateway.complete(request(0), "replica-0")
+    second = gateway.complete(request(0), "replica-1")
+    assert upstream.calls == 1
+    assert second.content == first.content and second.source == "cached"
+
+
+def test_sampled_requests_are_never_shared():
+    upstream = CountingUpstream()
+    gateway = LLMGateway(upstream, cache_ttl=60)
+    first = gateway.complete(request(0.9), "replica-0")
+    second = gateway.complete(request(0.9), "replica-1")
+    assert upstream.calls == 2
+    assert first.content != second.content
+    assert len(gateway.cache) == 0
@@ -0,0 +1,16 @@
+from utils.metrics import Histogram
+
+
+def test_recent_percentile_needs_min_samples():
+    histogram = Histogram("test_seconds", "Test", window=60)
+    histogram.observe(25.0)
+    assert histogram.recent_percentile(95) == 25.0
+    assert histogram.recent_percentile(95, min_samples=20) == 0.0
+
+
+def test_one_slow_sample_does_not_move_the_p95():
+    histogram = Histogram("test_seconds", "Test", window=60)
+    for _ in range(19):
+        histogram.observe(1.0)
+    histogram.observe(25.0)
+    assert histogram.recent_percentile(95, min_samples=20) == 1.0
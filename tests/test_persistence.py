@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from utils.persistence import WriteQueue, in_background_write
+
+
+def test_writes_run_in_submission_order():
+    queue = WriteQueue()
+    done = []
+
+    def write(i):
+        # Earlier writes take longer, so only the queue keeps them in order
+        time.sleep(0.002 * (10 - i))
+        done.append(i)
+
+    for i in range(10):
+        queue.submit(write, i)
+    queue.flush(timeout=5)
+    assert done == list(range(10))
+
+
+def test_writes_for_one_session_never_overlap():
+    queue = WriteQueue()
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def write():
+        with lock:
+            running.append(1)
+            if len(running) > 1:
+                overlaps.append(1)
+        time.sleep(0.005)
+        with lock:
+            running.pop()
+
+    for _ in range(8):
+        queue.submit(write)
+    queue.flush(timeout=5)
+    assert not overlaps
+
+
+def test_failed_write_does_not_block_later_ones():
+    queue = WriteQueue()
+
+    def fail():
+        raise RuntimeError("write failed")
+
+    failed = queue.submit(fail)
+    later = queue.submit(lambda: "written")
+    assert later.result(timeout=5) == "written"
+    with pytest.raises(RuntimeError):
+        failed.result()
+
+
+def test_writes_know_they_run_in_the_background():
+    queue = WriteQueue()
+    assert not in_background_write()
+    assert queue.submit(in_background_write).result(timeout=5)
@@ -0,0 +1,26 @@
+from client.ai_client import GenerationHandle
+from tutor_flow.session import TutorSession
+from utils.metrics import REPLY_FINISH
+
+
+def finished_handle(finish_reason, completion_tokens=0):
+    handle = GenerationHandle("ana:arraylist", turn=1)
+    handle.finish_reason = finish_reason
+    handle.completion_tokens = completion_tokens
+    return handle
+
+
+def test_record_generation_reports_how_the_reply_ended():
+    before = REPLY_FINISH.total()
+    record = TutorSession._record_generation(finished_handle("length", 120), "practice",
+                                             max_tokens=120, reply="x" * 400)
+    assert record == {'max_tokens': 120, 'finish_reason': 'length',
+                      'completion_tokens': 120, 'chars': 400}
+    assert REPLY_FINISH.total() == before + 1
+
+
+def test_record_generation_is_none_without_a_finish_reason():
+    before = REPLY_FINISH.total()
+    assert TutorSession._record_generation(None, "practice", 120, "reply") is None
+    assert TutorSession._record_generation(finished_handle(None), "practice", 120, "reply") is None
+    assert REPLY_FINISH.total() == before
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from tutor_flow.context import RollingSummary
+from tutor_flow.snapshot import SNAPSHOT_VERSION, SnapshotWriter, restore_window, usable
+from tutor_flow.steps import ScaffoldStep
+from tutor_flow.transcript import Transcript
+from utils.config import CONTEXT_MAX_MESSAGES
+
+
+def make_session(messages: int = 0):
+    """The parts of a TutorSession a SnapshotWriter reads."""
+    session = SimpleNamespace(
+        state=SimpleNamespace(condition=1, character_name="Batman", start_time=100.0,
+                              flow=SimpleNamespace(current_step=ScaffoldStep.INITIAL_METAPHOR)),
+        messages=Transcript(), turns=0, summary=RollingSummary(),
+    )
+    for _ in range(messages):
+        add_message(session)
+    return session
+
+
+def add_message(session):
+    index = len(session.messages)
+    session.messages.append("user" if index % 2 else "assistant", f"message {index}",
+                            ScaffoldStep.INITIAL_METAPHOR, timestamp=float(index))
+
+
+def test_first_delta_is_everything():
+    session = make_session(2)
+    delta = SnapshotWriter().delta(session)
+    assert delta['version'] == SNAPSHOT_VERSION
+    assert delta['character'] == "Batman"
+    assert delta['counters/messages'] == 2
+    assert delta['window/m0'] == [0, "assistant", "message 0", "initial_metaphor", 0.0]
+    assert delta['window/m1'][0] == 1
+
+
+def test_later_deltas_carry_only_changes():
+    session = make_session(2)
+    writer = SnapshotWriter()
+    writer.delta(session)
+    assert writer.delta(session) is None
+
+    add_message(session)
+    add_message(session)
+    session.turns += 1
+    session.state.flow.current_step = ScaffoldStep.STUDENT_METAPHOR
+    assert writer.delta(session) == {
+        'step': "student_metaphor",
+        'counters/messages': 4,
+        'counters/turns': 1,
+        'window/m2': [2, "assistant", "message 2", "initial_metaphor", 2.0],
+        'window/m3': [3, "user", "message 3", "initial_metaphor", 3.0],
+    }
+
+
+def test_delta_reuses_ring_slots():
+    session = make_session(4)
+    writer = SnapshotWriter(ring_size=4)
+    writer.delta(session)
+    add_message(session)
+    delta = writer.delta(session)
+    assert delta['window/m0'][0] == 4
+
+
+def test_full_snapshot_is_nested_and_restores_the_window():
+    session = make_session(CONTEXT_MAX_MESSAGES + 5)
+    snapshot = SnapshotWriter().full(session)
+    assert snapshot['counters'] == {'messages': CONTEXT_MAX_MESSAGES + 5, 'turns': 0}
+    assert len(snapshot['window']) == CONTEXT_MAX_MESSAGES
+    assert usable(snapshot, 1) and not usable(snapshot, 3)
+
+    restored = restore_window(snapshot)
+    assert [m.content for m in restored] == \
+        [m.content for m in session.messages[-CONTEXT_MAX_MESSAGES:]]
+
+
+def test_resumed_writer_counts_from_base():
+    session = make_session(2)
+    writer = SnapshotWriter(base=10, stored=2)
+    assert writer.delta(session)['counters/messages'] == 12
+    add_message(session)
+    delta = writer.delta(session)
+    assert delta['window/m0'] == [12, "assistant", "message 2", "initial_metaphor", 2.0]
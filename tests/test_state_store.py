@@ -0,0 +1,123 @@
+import io
+import time
+
+import pytest
+
+from utils import state_store
+from utils.resp_server import start_server
+from utils.state_store import (
+    InProcessStateStore,
+    RedisStateStore,
+    RespClient,
+    RespError,
+    StateStore,
+    encode_command,
+    load_learner,
+    read_reply,
+    save_learner,
+)
+
+
+@pytest.fixture
+def server():
+    server = start_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    host, port = server.server_address
+    client = RespClient(host, port)
+    yield client
+    client.close()
+
+
+def test_reply_parsing():
+    stream = io.BytesIO(b"+OK\r\n:42\r\n$5\r\nhello\r\n$-1\r\n*2\r\n$1\r\na\r\n:1\r\n-ERR nope\r\n")
+    assert read_reply(stream) == "OK"
+    assert read_reply(stream) == 42
+    assert read_reply(stream) == b"hello"
+    assert read_reply(stream) is None
+    assert read_reply(stream) == [b"a", 1]
+    with pytest.raises(RespError):
+        read_reply(stream)
+
+
+def test_commands_are_arrays_of_bulk_strings():
+    assert encode_command("SET", "k", b"v\r\n") == b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$3\r\nv\r\n\r\n"
+    assert read_reply(io.BytesIO(encode_command("GET", "k"))) == [b"GET", b"k"]
+
+
+def test_client_server_round_trip(client):
+    assert client.execute("PING") == "PONG"
+    assert client.execute("SET", "key", b"value\r\nwith newline") == "OK"
+    assert client.execute("GET", "key") == b"value\r\nwith newline"
+    assert client.execute("EXISTS", "key", "other") == 1
+    assert client.execute("DEL", "key") == 1
+    assert client.execute("GET", "key") is None
+    with pytest.raises(RespError):
+        client.execute("NOSUCHCOMMAND")
+
+
+def test_databases_are_separate(server):
+    host, port = server.server_address
+    first, second = RespClient(host, port, db=1), RespClient(host, port, db=2)
+    first.execute("SET", "key", "one")
+    assert second.execute("GET", "key") is None
+    assert first.execute("GET", "key") == b"one"
+
+
+def test_client_reconnects_after_the_connection_drops(client):
+    client.execute("SET", "key", "value")
+    client._sock.close()
+    assert client.execute("GET", "key") == b"value"
+
+
+def test_expired_keys_are_gone(client):
+    client.execute("SET", "key", "value", "PX", "1")
+    client.execute("SET", "kept", "value", "EX", "60")
+    time.sleep(0.01)
+    assert client.execute("GET", "key") is None
+    assert 0 < client.execute("TTL", "kept") <= 60
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda client: RedisStateStore(client),
+    lambda client: InProcessStateStore(),
+], ids=["redis", "in-process"])
+def test_stores_round_trip_documents(client, make_store):
+    store = make_store(client)
+    document = {'phase': 'learning', 'snapshot': {'counters': {'messages': 3}}}
+    store.set("tutor:learner:ana", document, ttl=60)
+    assert store.get("tutor:learner:ana") == document
+    store.delete("tutor:learner:ana")
+    assert store.get("tutor:learner:ana") is None
+
+
+def test_state_store_is_abstract():
+    with pytest.raises(TypeError):
+        StateStore()
+
+
+class DownClient(RespClient):
+    """A client whose server is unreachable."""
+
+    def execute(self, *args):
+        raise ConnectionError("Connection refused")
+
+
+def test_unreachable_store_is_logged_not_raised(monkeypatch, caplog):
+    monkeypatch.setattr(state_store, "_store", RedisStateStore(DownClient()))
+    assert load_learner("ana") is None
+    assert save_learner("ana", {'phase': 'learning'}) is False
+    assert "Error loading learner state" in caplog.text
+    assert "Error saving learner state" in caplog.text
+
+
+def test_learner_records_round_trip(client, monkeypatch):
+    monkeypatch.setattr(state_store, "_store", RedisStateStore(client))
+    assert load_learner("ana") is None
+    assert save_learner("ana", {'phase': 'quiz'})
+    assert load_learner("ana") == {'phase': 'quiz'}
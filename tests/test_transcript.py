@@ -0,0 +1,40 @@
+from tutor_flow.transcript import Transcript
+
+
+def filled(count: int, ring_size: int = 4) -> Transcript:
+    transcript = Transcript(ring_size=ring_size)
+    for i in range(count):
+        transcript.append("user" if i % 2 else "assistant", f"message {i}")
+    return transcript
+
+
+def test_window_is_the_newest_messages_up_to_the_ring_size():
+    start, window = filled(10).window(budget_tokens=1000)
+    assert start == 6
+    assert [m['content'] for m in window] == [f"message {i}" for i in range(6, 10)]
+
+
+def test_ring_is_kept_up_to_date_after_the_first_window():
+    transcript = filled(6)
+    transcript.window(1000)
+    first = transcript.window(1000)[1][-1]
+    transcript.append("assistant", "newest")
+    start, window = transcript.window(1000)
+    assert start == 3 and window[-1] == {'role': 'assistant', 'content': 'newest'}
+    # Ring entries are built once and reused, not rebuilt per turn
+    assert window[-2] is first
+
+
+def test_window_respects_the_token_budget_and_clips_the_newest():
+    transcript = Transcript(ring_size=4)
+    transcript.append("user", "short")
+    transcript.append("assistant", "word " * 400)
+    start, window = transcript.window(budget_tokens=50)
+    assert start == 1 and len(window) == 1
+    assert len(window[0]['content']) < len("word " * 400)
+
+
+def test_chat_covers_messages_older_than_the_ring():
+    transcript = filled(7)
+    assert [m['content'] for m in transcript.chat(1)] == [f"message {i}" for i in range(1, 7)]
+    assert transcript.pairs(5) == [("user", "message 5"), ("assistant", "message 6")]
@@ -1,7 +1,10 @@
 # tutor_flow/__init__.py
 
 from .steps import ScaffoldStep, ConversationMessage
+from .transcript import Transcript
 from .flow_manager import TutorFlow
 from .step_guide import StepGuide
+from .session import TutorSession, SessionState, TurnResult, NullStorage
 
-__all__ = ["ScaffoldStep", "ConversationMessage", "TutorFlow", "StepGuide"]
\ No newline at end of file
+__all__ = ["ScaffoldStep", "ConversationMessage", "Transcript", "TutorFlow", "StepGuide",
+           "TutorSession", "SessionState", "TurnResult", "NullStorage"]
\ No newline at end of file
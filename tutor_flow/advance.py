@@ -0,0 +1,73 @@
+# tutor_flow/advance.py
+"""
+Compiles the step-advance matcher definitions on each ResearchTopic
+(see DEFAULT_ADVANCE_MATCHERS) into one regex per step.
+
+Phrases match as whole words, so "go" no longer fires on "algorithm" nor
+"ok" on "book". Block phrases live in the same regex as a capturing
+alternative, so a check is one lowercase + one findall over the reply.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Pattern
+
+from content.research_topics import (
+    DEFAULT_ADVANCE_MATCHERS,
+    ResearchTopic,
+    get_research_topic,
+)
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    """Regex alternation of literal phrases, any whitespace between words."""
+    parts = [r"\s+".join(re.escape(word) for word in phrase.lower().split())
+             for phrase in phrases]
+    # Longest first so "not ready" wins over "ready"
+    return "|".join(sorted(parts, key=len, reverse=True))
+
+
+class StepMatcher:
+    """One scaffold step's advance rule, compiled."""
+
+    __slots__ = ("regex", "min_chars")
+
+    def __init__(self, spec: dict):
+        self.min_chars: int = spec.get("min_chars", 0)
+        self.regex: Optional[Pattern] = None
+
+        advance = [_alternation(spec.get("phrases", []))] + list(spec.get("patterns", []))
+        advance = "|".join(part for part in advance if part)
+        if advance:
+            block = _alternation(spec.get("block", []))
+            # Block hits fill group 1; advance hits leave it empty
+            source = rf"\b(?:({block})|{advance})\b" if block else rf"\b(?:{advance})\b"
+            self.regex = re.compile(source)
+
+    def __call__(self, message: str) -> bool:
+        if self.min_chars and len(message.strip()) < self.min_chars:
+            return False
+        if self.regex is None:
+            return bool(self.min_chars)
+
+        hits = self.regex.findall(message.lower())
+        if not self.regex.groups:
+            return bool(hits)
+        return bool(hits) and not any(hits)
+
+
+def compile_matchers(definitions: Dict[str, dict]) -> Dict[str, StepMatcher]:
+    return {step: StepMatcher(spec) for step, spec in definitions.items()}
+
+
+@lru_cache(maxsize=None)
+def matchers_for_topic(topic_name: str) -> Dict[str, StepMatcher]:
+    """Compiled matchers for a topic (by key or name), built once per process."""
+    try:
+        topic: ResearchTopic = get_research_topic(topic_name)
+        definitions = topic.advance_matchers
+    except ValueError:
+        definitions = DEFAULT_ADVANCE_MATCHERS
+    return compile_matchers(definitions)
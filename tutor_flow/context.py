@@ -0,0 +1,91 @@
+# tutor_flow/context.py
+"""
+Token-budgeted conversation context.
+
+The prompt carries the newest messages that fit a token budget, rather than
+a fixed message count, so one pasted code block can't blow up a prompt and
+short turns don't waste it. Messages that fall out of the window are folded
+into a rolling summary by a background LLM call, off the request path.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .steps import ConversationMessage
+
+logger = logging.getLogger("tutor.context")
+
+# Rough estimate for English text and code with OpenAI tokenizers; good
+# enough to budget with, and free compared to running a tokenizer per turn.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators per chat message
+
+_summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summary")
+
+# (previous summary, [(role, content), ...]) -> new summary
+Summarizer = Callable[[str, List[Tuple[str, str]]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` down to roughly `max_tokens`, marking the cut."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + " …[truncated]"
+
+
+class RollingSummary:
+    """
+    Summary of the messages before the context window.
+
+    update() hands newly dropped messages to a summarizer on a worker
+    thread and returns immediately; the prompt uses whatever summary is
+    current. At most one summary job per conversation runs at a time.
+    """
+
+    def __init__(self, text: str = "", covered: int = 0):
+        self.text: str = text
+        self.covered: int = covered   # Messages [0, covered) are in the summary
+        self._pending: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def update(self, messages: Sequence[ConversationMessage], upto: int, summarize: Summarizer):
+        """Fold messages[covered:upto] into the summary in the background."""
+        with self._lock:
+            if upto <= self.covered or (self._pending is not None and not self._pending.done()):
+                return
+            previous, start = self.text, self.covered
+            batch = [(m.role, m.content) for m in messages[start:upto]]
+
+            def job():
+                try:
+                    text = summarize(previous, batch)
+                except Exception as e:
+                    logger.warning("Context summary failed: %s", e)
+                    return
+                with self._lock:
+                    self.text, self.covered = text, upto
+
+            # Keep the job's spans in the turn that triggered it
+            context = contextvars.copy_context()
+            self._pending = _summary_executor.submit(context.run, job)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the in-flight summary (if any) is done."""
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            pending.result(timeout=timeout)
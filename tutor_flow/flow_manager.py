@@ -1,8 +1,11 @@
 # tutor_flow/flow_manager.py
 
 from __future__ import annotations
-from typing import List
-from .steps import ScaffoldStep, ConversationMessage, RoleType
+from typing import Dict, List, Optional, Tuple
+from .steps import ScaffoldStep, RoleType
+from .advance import matchers_for_topic
+from .context import RollingSummary
+from .transcript import Transcript
 
 
 class TutorFlow:
@@ -17,58 +20,59 @@ class TutorFlow:
         self.topic_name: str = topic_name
         self.character_name: str = character_name
         self.current_step: ScaffoldStep = ScaffoldStep.INITIAL_METAPHOR
-        self.messages: List[ConversationMessage] = []
+        self.messages: Transcript = Transcript()
+        self._advance_matchers = matchers_for_topic(topic_name)
+        # Messages older than the context window, summarized in the background
+        self.summary = RollingSummary()
+
+    @classmethod
+    def restore(cls, topic_name: str, character_name: str, step: ScaffoldStep,
+                messages: Transcript, summary: RollingSummary) -> "TutorFlow":
+        """A flow picking up where a snapshot left off (see tutor_flow.snapshot)."""
+        flow = cls(topic_name, character_name)
+        flow.current_step = step
+        flow.messages = messages
+        flow.summary = summary
+        return flow
 
     # -------- Message management --------
 
     def add_message(self, role: RoleType, content: str) -> None:
         """Append a message tagged with the current scaffold step."""
-        msg = ConversationMessage(
-            role=role,
-            content=content,
-            step=self.current_step,
-        )
-        self.messages.append(msg)
+        self.messages.append(role, content, self.current_step)
 
-    def get_recent_context(self, n: int = 5) -> List[ConversationMessage]:
-        """Return the last n messages for prompt context."""
-        if n <= 0:
-            return []
-        return self.messages[-n:]
+    def select_context(self, budget_tokens: int) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        The newest messages that fit `budget_tokens` (estimated), oldest first
+        and in chat format, with the index of the first one.
+        """
+        return self.messages.window(budget_tokens)
 
     # -------- Step logic --------
 
     def should_advance_step(self, user_message: str) -> bool:
         """
         Decide whether to move to the next scaffold step based on the
-        student's latest message.
+        student's latest message, using the topic's advance matchers.
         """
-        user_lower = user_message.lower()
-
-        if self.current_step == ScaffoldStep.INITIAL_METAPHOR:
-            # Move on once they give a reasonably substantive metaphor/response
-            return len(user_message.strip()) > 15
-
-        if self.current_step == ScaffoldStep.STUDENT_METAPHOR:
-            # Only advance when they explicitly signal readiness
-            ready_terms = ["ready", "go", "show me", "yes", "ok", "okay",
-                           "understand", "yep", "yeah"]
-            return any(term in user_lower for term in ready_terms)
-
-        if self.current_step == ScaffoldStep.CODE_STRUCTURE:
-            # Advance after acknowledgment of manual logic / "hidden work"
-            ack_terms = ["makes sense", "i see", "copy", "expensive",
-                         "heavy", "got it", "understand", "ohhh"]
-            return any(term in user_lower for term in ack_terms)
+        matcher = self._advance_matchers.get(self.current_step.value)
+        return matcher is not None and matcher(user_message)
 
-        if self.current_step == ScaffoldStep.CODE_USAGE:
-            # Move to practice once they engage at least minimally
-            return len(user_message.strip()) > 10
-
-        if self.current_step == ScaffoldStep.PRACTICE:
-            next_step = ScaffoldStep.REFLECTION
+    def decide_advance(self, user_message: str, decision: Optional[dict] = None,
+                       min_confidence: float = 0.0) -> bool:
+        """
+        Use the model's step decision ({reply, advance, confidence}) when
+        there is one confident enough, else the keyword heuristic.
+        """
+        if decision is not None and decision.get("confidence", 0.0) >= min_confidence:
+            return bool(decision["advance"]) and self.next_step() is not None
+        return self.should_advance_step(user_message)
 
-        return False
+    def next_step(self) -> Optional[ScaffoldStep]:
+        """The step after the current one, or None at the end."""
+        steps = list(ScaffoldStep)
+        idx = steps.index(self.current_step)
+        return steps[idx + 1] if idx < len(steps) - 1 else None
 
     def advance_step(self) -> None:
         """Advance to the next scaffold step if one exists."""
@@ -0,0 +1,135 @@
+# tutor_flow/prompt_templates.py
+"""
+Pre-rendered prompt fragments and the canonical turn builder.
+
+A scaffolded turn's system prompt depends only on (topic, step, character)
+plus the rolling summary, so the static part is rendered once per
+combination and reused. The conversation goes to the model once, as chat
+messages, with the student's latest message last (build_turn).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from characters import get_all_character_names, get_character
+from content.research_topics import RESEARCH_TOPICS, get_research_topic
+
+from .step_guide import StepGuide
+from .steps import ScaffoldStep
+
+# The scaffold prompts always address the model as "Tutor"; the persona
+# comes from the character system prompt in front of them.
+TUTOR_NAME = "Tutor"
+
+
+@dataclass
+class TurnPrompt:
+    """Everything sent to the model for one turn; each message appears once."""
+    system_prompt: str
+    history: List[Dict[str, str]]
+    user_message: str
+
+    @property
+    def chars(self) -> int:
+        return (len(self.system_prompt) + len(self.user_message)
+                + sum(len(m['content']) for m in self.history))
+
+
+def split_turn(window: Sequence[Dict[str, str]]) -> Tuple[List[Dict[str, str]], str]:
+    """
+    Split a context window in chat format into history and the student's
+    latest message. The latest user message need not be last (a visual can
+    follow it); it is taken out of the history either way. The history
+    shares its dicts with the window.
+    """
+    last_user = next((i for i in range(len(window) - 1, -1, -1)
+                      if window[i]['role'] == 'user'), None)
+    if last_user is None:
+        return list(window), ""
+    return list(window[:last_user]) + list(window[last_user + 1:]), window[last_user]['content']
+
+
+class PromptTemplates:
+    """Cache of static prompt fragments keyed by (kind, topic, step(s), character)."""
+
+    def __init__(self):
+        self._fragments: Dict[Tuple, str] = {}
+
+    def _get(self, key: Tuple, render: Callable[[], str]) -> str:
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            # Unknown combinations are rendered on first use and kept
+            fragment = self._fragments[key] = render()
+        return fragment
+
+    def warm(self, topic_keys: Iterable[str], character_names: Iterable[Optional[str]]):
+        """Render every topic x step x character combination up front."""
+        steps = list(ScaffoldStep)
+        for topic_key in topic_keys:
+            for character_name in character_names:
+                for i, step in enumerate(steps):
+                    next_step = steps[i + 1] if i + 1 < len(steps) else None
+                    self.turn_prefix(topic_key, step, character_name)
+                    self.structured_prefix(topic_key, step, next_step, character_name)
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    # -------- Fragments --------
+
+    def system_prompt(self, topic_key: str, character_name: Optional[str] = None) -> str:
+        """Character persona (condition 1) or the plain tutor line (condition 2)."""
+        def render() -> str:
+            topic = get_research_topic(topic_key)
+            if character_name:
+                return get_character(character_name).get_system_prompt(topic.name)
+            return f"You are a helpful CS tutor teaching {topic.name}."
+        return self._get(("system", topic_key, character_name), render)
+
+    def turn_prefix(self, topic_key: str, step: ScaffoldStep,
+                    character_name: Optional[str] = None) -> str:
+        """System prompt plus the stage instructions for a reply."""
+        return self._get(
+            ("turn", topic_key, step, character_name),
+            lambda: (self.system_prompt(topic_key, character_name) + "\n\n"
+                     + StepGuide.get_response_prompt(TUTOR_NAME, topic_key, step)),
+        )
+
+    def structured_prefix(self, topic_key: str, step: ScaffoldStep,
+                          next_step: Optional[ScaffoldStep],
+                          character_name: Optional[str] = None) -> str:
+        """As turn_prefix, for the structured reply + advance decision prompt."""
+        return self._get(
+            ("structured", topic_key, step, next_step, character_name),
+            lambda: (self.system_prompt(topic_key, character_name) + "\n\n"
+                     + StepGuide.get_structured_response_prompt(TUTOR_NAME, topic_key,
+                                                                step, next_step)),
+        )
+
+    # -------- Per-turn assembly --------
+
+    def build_turn(self, topic_key: str, step: ScaffoldStep, character_name: Optional[str],
+                   window: Sequence[Dict[str, str]], summary: str = "",
+                   structured: bool = False,
+                   next_step: Optional[ScaffoldStep] = None) -> TurnPrompt:
+        """
+        The one place a scaffolded turn's messages are put together: cached
+        instructions (+ summary) as the system prompt, the context window
+        (Transcript.window) as chat history, and the student's latest message
+        as the user message.
+        """
+        if structured:
+            system_prompt = self.structured_prefix(topic_key, step, next_step, character_name)
+        else:
+            system_prompt = self.turn_prefix(topic_key, step, character_name)
+        if summary:
+            system_prompt += f"\n\nSummary of earlier conversation: {summary}"
+
+        history, user_message = split_turn(window)
+        return TurnPrompt(system_prompt, history, user_message)
+
+
+PROMPT_TEMPLATES = PromptTemplates()
+PROMPT_TEMPLATES.warm(RESEARCH_TOPICS, [None] + get_all_character_names())
@@ -0,0 +1,797 @@
+# tutor_flow/session.py
+"""
+Headless tutoring session engine.
+
+All conversation logic for the three study conditions lives here, with no
+Streamlit dependency. The LLM client and the storage backend are injected,
+so the same engine runs under the Streamlit app, benchmarks, CLIs and
+worker processes.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from content.fallback_responses import get_fallback_library
+from content.research_topics import GenerationProfile, ResearchTopic, get_research_topic
+from utils.config import (
+    CONTEXT_SUMMARIES,
+    CONTEXT_SUMMARY_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    DEGRADE_LLM_P95,
+    LIVE_LATENCY_MIN_SAMPLES,
+    LLM_STEP_DECISIONS,
+    SESSION_DURATION,
+    STEP_DECISION_MIN_CONFIDENCE,
+    TURN_LATENCY_BUDGET,
+)
+from utils.metrics import (
+    ACTIVE_SESSIONS,
+    DEGRADED_TURNS,
+    LLM_REQUEST_SECONDS,
+    REPLY_FINISH,
+    REPLY_TOKENS,
+    SCAFFOLD_TRANSITIONS,
+)
+from utils.persistence import WriteQueue
+from utils.timing import TurnTimer, phase
+from utils.tracing import annotate, span, traced
+from __delete_later.visuals import get_topic_visual
+
+from .context import RollingSummary, clip_to_tokens
+from .flow_manager import TutorFlow
+from .prompt_templates import PROMPT_TEMPLATES, TurnPrompt, split_turn
+from .snapshot import SnapshotWriter, restore_window, usable
+from .step_guide import StepGuide
+from .steps import ScaffoldStep
+from .transcript import Transcript
+
+
+FALLBACK_RESPONSE = "I'm having trouble responding. Could you try rephrasing that?"
+
+# Why a scaffolded reply came from the fallback library (recorded with the message)
+DEGRADED_ERROR = 'error'              # the LLM call failed
+DEGRADED_OVER_BUDGET = 'over_budget'  # no reply within TURN_LATENCY_BUDGET
+DEGRADED_LLM_SLOW = 'llm_slow'        # live LLM p95 above DEGRADE_LLM_P95; not called
+
+SCAFFOLDED_CONDITIONS = (1, 2)
+
+# Direct chat (condition 3) has no steps; scaffolded replies use the topic's per-step profiles
+DIRECT_PROFILE = GenerationProfile(max_tokens=500)
+
+# Room for the JSON around a structured reply (reply, advance, confidence)
+STRUCTURED_OVERHEAD_TOKENS = 60
+
+SUMMARY_PROMPT = (
+    "You keep running notes on a tutoring conversation about {topic}. Merge the "
+    "new messages into the existing summary. Keep what the student understood, "
+    "what they struggled with, and the metaphors and examples used. "
+    "Write at most {words} words of plain prose."
+)
+
+# Sessions that have started and not ended; abandoned ones drop out when
+# their Streamlit session is garbage collected.
+_live_sessions: "weakref.WeakSet[TutorSession]" = weakref.WeakSet()
+
+
+def _active_sessions_by_condition() -> Dict[Tuple, float]:
+    counts = Counter(s.state.condition for s in list(_live_sessions) if not s.ended)
+    return {(('condition', condition),): count for condition, count in counts.items()}
+
+
+ACTIVE_SESSIONS.set_function(_active_sessions_by_condition)
+
+
+class LLMClient(Protocol):
+    """
+    Anything that can produce a tutor reply (SimpleAIClient, mocks).
+    Clients may also offer generate_structured_response(), returning
+    {reply, advance, confidence}, for model-judged step advances,
+    for_student(user_id, deadline), returning the client one session
+    should use (client.scheduler.LLMScheduler), and begin_generation(),
+    finish_generation() and cancel_generation() for cancellable turns
+    (client.ai_client.GenerationHandle).
+    """
+
+    def generate_response(self, system_prompt: str, user_message: str,
+                          conversation_history: Optional[List[Dict]] = None,
+                          temperature: float = 0.9, max_tokens: int = 500,
+                          stop: Optional[List[str]] = None) -> str:
+        ...
+
+
+class SessionStorage(Protocol):
+    """
+    Persistence used by the engine. The utils.database module satisfies
+    this as-is; NullStorage and benchmark backends are drop-in alternatives.
+    """
+
+    def save_session_start(self, user_id: str, session_id: str, condition: int): ...
+
+    def save_message(self, user_id: str, session_id: str, role: str, content: str,
+                     step: Optional[str] = None, degraded: Optional[str] = None,
+                     generation: Optional[Dict] = None): ...
+
+    def save_scaffold_progress(self, user_id: str, session_id: str, step: str): ...
+
+    def save_snapshot(self, user_id: str, session_id: str, updates: Dict): ...
+
+    def load_snapshot(self, user_id: str, session_id: str) -> Optional[Dict]: ...
+
+
+class NullStorage:
+    """Storage that discards everything (admin test sessions)."""
+
+    def save_session_start(self, user_id, session_id, condition):
+        pass
+
+    def save_message(self, user_id, session_id, role, content, step=None, degraded=None,
+                     generation=None):
+        pass
+
+    def save_scaffold_progress(self, user_id, session_id, step):
+        pass
+
+    def save_snapshot(self, user_id, session_id, updates):
+        pass
+
+    def load_snapshot(self, user_id, session_id):
+        return None
+
+
+@dataclass
+class SessionState:
+    """Everything that describes one student's learning session."""
+    user_id: str
+    session_id: str                                    # topic key, e.g. 'arraylist'
+    condition: int
+    character_name: Optional[str] = None               # condition 1 only
+    flow: Optional[TutorFlow] = None                   # conditions 1 & 2
+    messages: Transcript = field(default_factory=Transcript)  # condition 3
+    summary: RollingSummary = field(default_factory=RollingSummary)  # condition 3: never summarized; flows keep their own
+    start_time: Optional[float] = None                 # set when learning begins
+
+    @property
+    def scaffolded(self) -> bool:
+        return self.condition in SCAFFOLDED_CONDITIONS
+
+    @property
+    def started(self) -> bool:
+        return self.start_time is not None
+
+
+@dataclass
+class TurnResult:
+    """What happened during one student turn."""
+    reply: str
+    step_before: Optional[str] = None
+    step_after: Optional[str] = None
+    prompt_chars: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+    cancelled: bool = False                            # superseded or session left; no reply added
+    degraded: Optional[str] = None                     # reply from the fallback library, and why
+    generation: Optional[Dict] = None                  # max_tokens, finish_reason and lengths of the reply
+
+    @property
+    def advanced(self) -> bool:
+        return self.step_before != self.step_after
+
+
+class TutorSession:
+    """
+    Drives one learning session: start, (character choice), initial
+    message, and student turns for all three conditions.
+    """
+
+    def __init__(self, state: SessionState, llm: LLMClient, storage: SessionStorage,
+                 step_decisions: Optional[bool] = None):
+        self.state = state
+        # A shared scheduler (client.scheduler) queues this session's calls
+        # under its student and deadline
+        if hasattr(llm, 'for_student'):
+            llm = llm.for_student(state.user_id, self.deadline)
+        self.llm = llm
+        self.storage = storage
+        # Model-judged step advances need an LLM with structured output
+        if step_decisions is None:
+            step_decisions = LLM_STEP_DECISIONS
+        self.step_decisions = step_decisions and hasattr(llm, 'generate_structured_response')
+        # Writes run in the background, in order, while the LLM generates
+        self.writes = WriteQueue()
+        self.ended = False
+        self.turns = 0
+        # Incremental snapshot for resuming after a reconnect or restart
+        self._snapshot = SnapshotWriter()
+        _live_sessions.add(self)
+
+    # -------- Lifecycle --------
+
+    @classmethod
+    def start(cls, user_id: str, session_id: str, condition: int,
+              llm: LLMClient, storage: SessionStorage,
+              step_decisions: Optional[bool] = None) -> "TutorSession":
+        """
+        Create a session and record its start.
+
+        Condition 2 and 3 sessions begin learning immediately; condition 1
+        waits for choose_character().
+        """
+        session = cls(SessionState(user_id, session_id, condition), llm, storage,
+                      step_decisions)
+        storage.save_session_start(user_id, session_id, condition)
+
+        if session.state.scaffolded:
+            session.state.flow = TutorFlow(session.topic.name, "Tutor")
+            if condition == 2:
+                session.begin()
+        else:
+            session.begin()
+
+        return session
+
+    @classmethod
+    def resume(cls, user_id: str, session_id: str, condition: int,
+               llm: LLMClient, storage: SessionStorage,
+               step_decisions: Optional[bool] = None) -> Optional["TutorSession"]:
+        """
+        Rebuild an in-progress session from its stored snapshot, in one read.
+
+        Returns None if there is no usable snapshot (never got past the
+        start, or written by an incompatible version); start() it instead.
+        """
+        return cls.from_snapshot(user_id, session_id, condition,
+                                 storage.load_snapshot(user_id, session_id),
+                                 llm, storage, step_decisions)
+
+    @classmethod
+    def from_snapshot(cls, user_id: str, session_id: str, condition: int,
+                      snapshot: Optional[Dict], llm: LLMClient, storage: SessionStorage,
+                      step_decisions: Optional[bool] = None) -> Optional["TutorSession"]:
+        """
+        Rebuild a session from a snapshot (see tutor_flow.snapshot), or None
+        if it can't be used. The restored transcript holds the snapshot's
+        message window; older messages stay in storage and reach the prompt
+        via the summary.
+        """
+        if not usable(snapshot, condition):
+            return None
+
+        transcript = restore_window(snapshot)
+        counters = snapshot.get('counters', {})
+        base = counters.get('messages', len(transcript)) - len(transcript)
+        stored_summary = snapshot.get('summary', {})
+        summary = RollingSummary(stored_summary.get('text', ''),
+                                 max(0, stored_summary.get('covered', 0) - base))
+
+        state = SessionState(user_id, session_id, condition,
+                             character_name=snapshot.get('character'),
+                             start_time=snapshot['start_time'])
+        if state.scaffolded:
+            state.flow = TutorFlow.restore(get_research_topic(session_id).name, "Tutor",
+                                           ScaffoldStep(snapshot['step']), transcript, summary)
+        else:
+            state.messages, state.summary = transcript, summary
+
+        session = cls(state, llm, storage, step_decisions)
+        session.turns = counters.get('turns', 0)
+        session._snapshot = SnapshotWriter(base, len(transcript))
+        return session
+
+    @property
+    def topic(self) -> ResearchTopic:
+        return get_research_topic(self.state.session_id)
+
+    @property
+    def needs_character(self) -> bool:
+        """True while a condition 1 session is waiting for a character choice."""
+        return self.state.condition == 1 and not self.state.started
+
+    def choose_character(self, character_name: str):
+        """Pick the tutor character (condition 1) and begin learning."""
+        self.state.character_name = character_name
+        self.begin()
+
+    def begin(self):
+        """Start the learning clock and post the opening message."""
+        self.state.start_time = time.time()
+
+        if self.state.scaffolded:
+            self.generate_initial_message()
+        else:
+            # Condition 3: simple welcome message, no LLM call
+            welcome = (f"Hello! I'm here to answer your questions about {self.topic.name}. "
+                       "What would you like to know?")
+            self._add_direct_message('assistant', welcome)
+            self.writes.submit(self.storage.save_message, self.state.user_id,
+                               self.state.session_id, 'assistant', welcome)
+
+        self._save_snapshot()
+
+    def time_remaining(self, duration: float, now: Optional[float] = None) -> float:
+        """Seconds left in a learning phase of `duration` seconds."""
+        if not self.state.started:
+            return duration
+        now = time.time() if now is None else now
+        return max(0.0, self.state.start_time + duration - now)
+
+    def deadline(self) -> Optional[float]:
+        """When the learning phase ends (time.time() scale), once it has started."""
+        if not self.state.started:
+            return None
+        return self.state.start_time + SESSION_DURATION
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait for all queued writes to land."""
+        self.writes.flush(timeout)
+
+    def end(self):
+        """Mark the session finished (survey submitted or abandoned)."""
+        self.ended = True
+        self.cancel_generation('ended')
+
+    # -------- Generations --------
+
+    @property
+    def generation_key(self) -> str:
+        return f"{self.state.user_id}/{self.state.session_id}"
+
+    def _begin_generation(self):
+        """
+        A cancellable handle for this turn's LLM calls, if the client
+        supports them. Starting it cancels the previous turn's generation
+        if that is still running.
+        """
+        begin = getattr(self.llm, 'begin_generation', None)
+        return begin(self.generation_key, self.turns) if begin else None
+
+    def _finish_generation(self, handle):
+        if handle is not None:
+            self.llm.finish_generation(handle)
+
+    def cancel_generation(self, reason: str) -> bool:
+        """Stop this session's in-flight reply, e.g. when the timer runs out."""
+        cancel = getattr(self.llm, 'cancel_generation', None)
+        return bool(cancel and cancel(self.generation_key, reason))
+
+    @staticmethod
+    def _generation_args(handle) -> Dict:
+        return {'handle': handle} if handle is not None else {}
+
+    @staticmethod
+    def _start_budget(handle) -> Optional[threading.Timer]:
+        """Cancel the turn's generation if it runs past TURN_LATENCY_BUDGET."""
+        if handle is None or not TURN_LATENCY_BUDGET:
+            return None
+        handle.deadline = time.monotonic() + TURN_LATENCY_BUDGET
+        timer = threading.Timer(TURN_LATENCY_BUDGET, handle.cancel, args=(DEGRADED_OVER_BUDGET,))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    # -------- Degraded replies --------
+
+    @staticmethod
+    def _llm_too_slow() -> bool:
+        """
+        True while the live LLM p95 is over DEGRADE_LLM_P95 (serve fallbacks
+        without calling it). Needs LIVE_LATENCY_MIN_SAMPLES completed calls
+        in the window, so one slow call can't trip it for everyone.
+        """
+        return (DEGRADE_LLM_P95 is not None
+                and LLM_REQUEST_SECONDS.recent_percentile(95, LIVE_LATENCY_MIN_SAMPLES) > DEGRADE_LLM_P95)
+
+    def _fallback_reply(self, reason: str) -> str:
+        """A pre-authored reply for the current step and character, counted as degraded."""
+        step = self.state.flow.current_step.value
+        DEGRADED_TURNS.inc(reason=reason, step=step)
+        annotate(degraded=reason)
+        return get_fallback_library().lookup(self.state.session_id, step, self._persona(), self.turns)
+
+    # -------- Generation profiles --------
+
+    def _profile(self, step: Optional[ScaffoldStep] = None) -> GenerationProfile:
+        """The topic's generation settings for a step (default: the current one)."""
+        if not self.state.scaffolded:
+            return DIRECT_PROFILE
+        step = step or self.state.flow.current_step
+        return self.topic.generation_profile(step.value)
+
+    @staticmethod
+    def _profile_args(profile: GenerationProfile) -> Dict:
+        return {'temperature': profile.temperature, 'max_tokens': profile.max_tokens,
+                'stop': list(profile.stop) or None}
+
+    def _structured_max_tokens(self) -> int:
+        """A structured reply is written for the current step or the next one."""
+        flow = self.state.flow
+        return (max(self._profile().max_tokens, self._profile(flow.next_step()).max_tokens)
+                + STRUCTURED_OVERHEAD_TOKENS)
+
+    @staticmethod
+    def _record_generation(handle, step: str, max_tokens: int, reply: str) -> Optional[Dict]:
+        """
+        How the reply's generation ended, for tuning each step's profile:
+        finish_reason 'length' means it was cut off at max_tokens. None if
+        the client doesn't report it (no generation handle).
+        """
+        if handle is None or handle.finish_reason is None:
+            return None
+        REPLY_TOKENS.observe(handle.completion_tokens, step=step)
+        REPLY_FINISH.inc(step=step, finish_reason=handle.finish_reason)
+        return {
+            'max_tokens': max_tokens,
+            'finish_reason': handle.finish_reason,
+            'completion_tokens': handle.completion_tokens,
+            'chars': len(reply),
+        }
+
+    # -------- Transcript --------
+
+    @property
+    def messages(self) -> Transcript:
+        """The conversation, for whichever condition this is."""
+        if self.state.scaffolded:
+            return self.state.flow.messages
+        return self.state.messages
+
+    @property
+    def summary(self) -> RollingSummary:
+        """Rolling summary of the messages before the context window."""
+        if self.state.scaffolded:
+            return self.state.flow.summary
+        return self.state.summary
+
+    def transcript(self) -> List[Tuple[str, str]]:
+        """All messages so far as (role, content) pairs, oldest first."""
+        return self.messages.pairs()
+
+    def _add_direct_message(self, role: str, content: str):
+        self.state.messages.append(role, content)
+
+    # -------- Prompts --------
+
+    def _persona(self) -> Optional[str]:
+        """The tutor character whose voice the prompts use (condition 1 only)."""
+        return self.state.character_name if self.state.condition == 1 else None
+
+    def _system_prompt(self) -> str:
+        return PROMPT_TEMPLATES.system_prompt(self.state.session_id, self._persona())
+
+    def generate_initial_message(self):
+        """Generate the opening metaphor message (conditions 1 & 2)."""
+        topic = self.topic
+        flow = self.state.flow
+
+        if self.state.condition == 1:
+            system_prompt = self._system_prompt()
+        else:
+            system_prompt = (
+                f"You are a helpful CS tutor teaching {topic.name}.\n\n"
+                "Your goal is to help the student understand the topic through:\n"
+                "1) metaphors and analogies\n"
+                "2) conceptual understanding\n"
+                "3) code examples\n"
+                "4) usage explanations\n\n"
+                "Be clear, encouraging, and keep responses under 150 words."
+            )
+
+        metaphor_prompt = StepGuide.get_metaphor_prompt(
+            "Tutor", topic.name, topic.concept
+        )
+
+        profile = self._profile()
+        degraded, generation = (DEGRADED_LLM_SLOW if self._llm_too_slow() else None), None
+        if degraded is None:
+            handle = self._begin_generation()
+            try:
+                with phase("llm"):
+                    initial_message = self.llm.generate_response(
+                        system_prompt=system_prompt,
+                        user_message=metaphor_prompt,
+                        **self._profile_args(profile),
+                        **self._generation_args(handle)
+                    )
+                generation = self._record_generation(handle, flow.current_step.value,
+                                                     profile.max_tokens, initial_message)
+            except Exception:
+                degraded = DEGRADED_ERROR
+            finally:
+                self._finish_generation(handle)
+        if degraded is not None:
+            initial_message = self._fallback_reply(degraded)
+
+        flow.add_message("assistant", initial_message)
+        self.writes.submit(self.storage.save_message, self.state.user_id,
+                           self.state.session_id, "assistant", initial_message,
+                           step=flow.current_step.value, degraded=degraded,
+                           generation=generation)
+
+    # -------- Turns --------
+
+    def handle_user_message(self, user_input: str) -> TurnResult:
+        """
+        Handle one student message for whichever condition this is. If the
+        student sends another message while this one's reply is still
+        generating, this reply is cancelled and the result says so.
+        """
+        self.turns += 1
+        handle = self._begin_generation()
+        # Scaffolded turns over their latency budget get a fallback reply instead
+        budget = self._start_budget(handle) if self.state.scaffolded else None
+        try:
+            if self.state.scaffolded:
+                result = self.handle_user_message_scaffolded(user_input, handle)
+            else:
+                result = self.handle_user_message_direct(user_input, handle)
+        finally:
+            if budget is not None:
+                budget.cancel()
+            self._finish_generation(handle)
+        self._save_snapshot()
+        return result
+
+    def snapshot(self) -> Dict:
+        """The whole current snapshot, e.g. for the shared session state store."""
+        return self._snapshot.full(self)
+
+    def _save_snapshot(self):
+        """Queue this turn's snapshot changes behind its other writes."""
+        updates = self._snapshot.delta(self)
+        if updates:
+            self.writes.submit(self.storage.save_snapshot, self.state.user_id,
+                               self.state.session_id, updates)
+
+    @traced("handle_user_message_scaffolded")
+    def handle_user_message_scaffolded(self, user_input: str, handle=None) -> TurnResult:
+        """Handle user message for scaffolded conditions (1 & 2)."""
+        flow = self.state.flow
+        user_id, session_id = self.state.user_id, self.state.session_id
+        timer = TurnTimer("scaffolded_turn")
+        step_before = flow.current_step.value
+        annotate(user_id=user_id, topic=session_id, condition=self.state.condition,
+                 step_before=step_before)
+
+        # Add user message
+        flow.add_message('user', user_input)
+        self.writes.submit(self.storage.save_message, user_id, session_id, 'user', user_input)
+
+        # While the LLM is too slow, answer from the fallback library without calling it
+        degraded = DEGRADED_LLM_SLOW if self._llm_too_slow() else None
+
+        # Reply and step decision from one completion, when enabled
+        decision, decision_prompt_chars, decision_max_tokens = None, 0, 0
+        if degraded is None and self.step_decisions and flow.next_step() is not None:
+            decision, decision_prompt_chars, decision_max_tokens = self._structured_turn(timer, handle)
+
+        # Check step advancement (the model's decision, else the keyword matchers)
+        advance = flow.decide_advance(user_input, decision, STEP_DECISION_MIN_CONFIDENCE)
+        annotate(step_decision='model' if decision is not None else 'heuristic')
+        if advance:
+            self._advance_step(step_before)
+
+        generation = None
+        if decision is not None and decision['advance'] == advance:
+            # The structured reply was written for the step we're now in
+            response = decision['reply']
+            prompt_chars = decision_prompt_chars
+            generation = self._record_generation(handle, flow.current_step.value,
+                                                 decision_max_tokens, response)
+        elif degraded is not None:
+            response = self._fallback_reply(degraded)
+            prompt_chars = 0
+        else:
+            # Generate response
+            with timer.stage("prompt_build"), span("prompt_build"):
+                prompt = PROMPT_TEMPLATES.build_turn(
+                    session_id,
+                    flow.current_step,
+                    self._persona(),
+                    self._flow_context(),
+                    flow.summary.text,
+                )
+
+            profile = self._profile()
+            with timer.stage("llm"), span("generate_response"):
+                try:
+                    response = self.llm.generate_response(
+                        system_prompt=prompt.system_prompt,
+                        user_message=prompt.user_message,
+                        conversation_history=prompt.history,
+                        **self._profile_args(profile),
+                        **self._generation_args(handle)
+                    )
+                    generation = self._record_generation(handle, flow.current_step.value,
+                                                         profile.max_tokens, response)
+                except Exception as e:
+                    over_budget = handle is not None and handle.reason == DEGRADED_OVER_BUDGET
+                    if handle is not None and handle.cancelled and not over_budget:
+                        return self._cancelled_turn(timer, step_before)
+                    annotate(fallback=True, error=str(e))
+                    degraded = DEGRADED_OVER_BUDGET if over_budget else DEGRADED_ERROR
+                    response = self._fallback_reply(degraded)
+            prompt_chars = prompt.chars
+
+        # Add response
+        flow.add_message('assistant', response)
+        self.writes.submit(self.storage.save_message, user_id, session_id, 'assistant',
+                           response, step=flow.current_step.value, degraded=degraded,
+                           generation=generation)
+
+        timer.log()
+        annotate(step_after=flow.current_step.value)
+        return TurnResult(
+            reply=response,
+            step_before=step_before,
+            step_after=flow.current_step.value,
+            prompt_chars=prompt_chars,
+            timings=dict(timer.stages),
+            degraded=degraded,
+            generation=generation,
+        )
+
+    def _cancelled_turn(self, timer: TurnTimer, step_before: Optional[str] = None) -> TurnResult:
+        """The turn's reply was cancelled; the student's message stays, no reply is added."""
+        timer.log()
+        step_after = self.state.flow.current_step.value if self.state.scaffolded else None
+        return TurnResult(
+            reply="",
+            step_before=step_before,
+            step_after=step_after,
+            timings=dict(timer.stages),
+            cancelled=True,
+        )
+
+    # -------- Context --------
+
+    def _flow_context(self) -> List[Dict[str, str]]:
+        """Recent scaffolded messages within the token budget; older ones go to the summary."""
+        flow = self.state.flow
+        start, recent = flow.select_context(CONTEXT_TOKEN_BUDGET)
+        self._update_summary(flow.summary, flow.messages, start)
+        return recent
+
+    def _update_summary(self, summary: RollingSummary, messages: Transcript, upto: int):
+        if CONTEXT_SUMMARIES and upto > summary.covered:
+            summary.update(messages, upto, self._summarize)
+
+    def _summarize(self, previous: str, batch: List[Tuple[str, str]]) -> str:
+        """Background job: fold `batch` into the previous summary."""
+        transcript = "\n".join(
+            f"{'Student' if role == 'user' else 'Tutor'}: "
+            f"{clip_to_tokens(content, CONTEXT_SUMMARY_TOKENS)}"
+            for role, content in batch
+        )
+        # Clients with summarize() keep this off the turn slots and turn latency
+        summarize = getattr(self.llm, 'summarize', None) or self.llm.generate_response
+        with span("summarize_context", messages=len(batch)):
+            summary = summarize(
+                system_prompt=SUMMARY_PROMPT.format(topic=self.topic.name,
+                                                    words=CONTEXT_SUMMARY_TOKENS * 3 // 4),
+                user_message=f"Summary so far:\n{previous or '(none)'}\n\nNew messages:\n{transcript}",
+                temperature=0.0,  # Deterministic, so the LLM gateway may cache it
+                max_tokens=CONTEXT_SUMMARY_TOKENS * 2,
+            )
+        return clip_to_tokens(summary, CONTEXT_SUMMARY_TOKENS)
+
+    # -------- Steps --------
+
+    def _advance_step(self, step_before: str):
+        """Move to the next scaffold step, recording it (and any visual)."""
+        flow = self.state.flow
+        user_id, session_id = self.state.user_id, self.state.session_id
+
+        flow.advance_step()
+        SCAFFOLD_TRANSITIONS.inc(topic=session_id, from_step=step_before,
+                                 to_step=flow.current_step.value)
+        self.writes.submit(self.storage.save_scaffold_progress, user_id, session_id,
+                           flow.current_step.value)
+
+        # Show visual if advancing to CODE_STRUCTURE
+        if flow.current_step == ScaffoldStep.CODE_STRUCTURE:
+            visual = f"📊 **Visual Diagram:**\n{get_topic_visual(session_id)}"
+            flow.add_message('assistant', visual)
+            self.writes.submit(self.storage.save_message, user_id, session_id,
+                               'assistant', visual, step=flow.current_step.value)
+
+    def _structured_turn(self, timer: TurnTimer,
+                         handle=None) -> Tuple[Optional[Dict], int, int]:
+        """
+        Ask for the reply and the advance decision in one completion.
+        Returns (decision, prompt chars, max_tokens sent), or (None, 0, 0)
+        if the call fails or its output doesn't parse (or was cancelled;
+        the plain reply that follows then stops too).
+        """
+        flow = self.state.flow
+        # Fixed before the call: the step may advance before it's recorded
+        max_tokens = self._structured_max_tokens()
+
+        with timer.stage("prompt_build"), span("prompt_build", structured=True):
+            prompt = PROMPT_TEMPLATES.build_turn(
+                self.state.session_id,
+                flow.current_step,
+                self._persona(),
+                self._flow_context(),
+                flow.summary.text,
+                structured=True,
+                next_step=flow.next_step(),
+            )
+
+        with timer.stage("llm"), span("generate_structured_response"):
+            try:
+                decision = self.llm.generate_structured_response(
+                    system_prompt=prompt.system_prompt,
+                    user_message=prompt.user_message,
+                    conversation_history=prompt.history,
+                    temperature=self._profile().temperature,
+                    max_tokens=max_tokens,
+                    **self._generation_args(handle)
+                )
+            except Exception as e:
+                annotate(fallback=True, error=str(e))
+                return None, 0, 0
+
+        return decision, prompt.chars, max_tokens
+
+    @traced("handle_user_message_direct")
+    def handle_user_message_direct(self, user_input: str, handle=None) -> TurnResult:
+        """Handle user message for direct chat condition (3)."""
+        topic = self.topic
+        user_id, session_id = self.state.user_id, self.state.session_id
+        timer = TurnTimer("direct_turn")
+        annotate(user_id=user_id, topic=session_id, condition=self.state.condition)
+
+        # Add user message
+        self._add_direct_message('user', user_input)
+        self.writes.submit(self.storage.save_message, user_id, session_id, 'user', user_input)
+
+        with timer.stage("prompt_build"), span("prompt_build"):
+            # Build conversation history: newest messages within the token budget.
+            # No summary of older ones: the control condition's prompt stays plain
+            _, window = self.state.messages.window(CONTEXT_TOKEN_BUDGET)
+            history, user_message = split_turn(window)
+
+            # Simple system prompt - no scaffolding
+            system_prompt = f"""You are a helpful assistant answering questions about {topic.name} in Java.
+
+Provide clear, accurate answers. Include code examples when helpful. Be concise."""
+            prompt = TurnPrompt(system_prompt, history, user_message)
+
+        degraded, generation = None, None
+        with timer.stage("llm"), span("generate_response"):
+            try:
+                response = self.llm.generate_response(
+                    system_prompt=prompt.system_prompt,
+                    user_message=prompt.user_message,
+                    conversation_history=prompt.history,
+                    **self._profile_args(DIRECT_PROFILE),
+                    **self._generation_args(handle)
+                )
+                generation = self._record_generation(handle, 'direct', DIRECT_PROFILE.max_tokens,
+                                                     response)
+            except Exception as e:
+                if handle is not None and handle.cancelled:
+                    return self._cancelled_turn(timer)
+                annotate(fallback=True, error=str(e))
+                # Direct chat has no steps to fall back on; just record it
+                degraded = DEGRADED_ERROR
+                DEGRADED_TURNS.inc(reason=degraded, step='direct')
+                response = FALLBACK_RESPONSE
+
+        # Add response
+        self._add_direct_message('assistant', response)
+        self.writes.submit(self.storage.save_message, user_id, session_id, 'assistant', response,
+                           degraded=degraded, generation=generation)
+
+        timer.log()
+        return TurnResult(
+            reply=response,
+            prompt_chars=prompt.chars,
+            timings=dict(timer.stages),
+            degraded=degraded,
+            generation=generation,
+        )
@@ -0,0 +1,122 @@
+# tutor_flow/snapshot.py
+"""
+Versioned snapshots of a live session, for resuming after a dropped
+websocket or a redeploy.
+
+A snapshot holds what the engine needs to carry on: condition, character,
+learning start time, scaffold step, rolling summary, counters, and the
+newest messages (the same ring the prompt window draws from). It lives
+next to the full transcript in storage and is written incrementally: after
+each turn only the changed fields and the new messages go out, as one
+multi-path update. Message slots are reused modulo the ring size, so the
+snapshot stays small however long the conversation gets. The same
+document, whole, is part of the student's record in the shared session
+state store (utils.state_store).
+
+Layout (under users/<uid>/sessions/<sid>/snapshot):
+    version, condition, character, start_time, step,
+    counters/{messages, turns}, summary/{text, covered},
+    window/m<slot>: [index, role, content, step, timestamp]
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from utils.config import CONTEXT_MAX_MESSAGES
+
+from .steps import ConversationMessage
+from .transcript import Transcript
+
+SNAPSHOT_VERSION = 1
+
+
+def _encode(index: int, message: ConversationMessage) -> List:
+    # Firebase drops nulls inside lists, so "no step" (condition 3) is ""
+    step = message.step.value if message.step else ""
+    return [index, message.role, message.content, step, message.timestamp]
+
+
+class SnapshotWriter:
+    """
+    Tracks what a session has already written and produces the next delta,
+    or the whole snapshot on demand (full()).
+
+    Indices in the snapshot are absolute message numbers. A resumed session
+    holds only the restored window, so `base` is the number of messages
+    before it and `stored` how many of the session's messages the snapshot
+    already has.
+    """
+
+    def __init__(self, base: int = 0, stored: int = 0,
+                 ring_size: int = CONTEXT_MAX_MESSAGES):
+        self.base = base
+        self.ring_size = ring_size
+        self._written: Dict[str, object] = {}
+        self._stored = base + stored
+
+    def _fields(self, session) -> Dict[str, object]:
+        state = session.state
+        return {
+            'version': SNAPSHOT_VERSION,
+            'condition': state.condition,
+            'character': state.character_name,
+            'start_time': state.start_time,
+            'step': state.flow.current_step.value if state.flow else None,
+            'counters/messages': self.base + len(session.messages),
+            'counters/turns': session.turns,
+            'summary/text': session.summary.text,
+            'summary/covered': self.base + session.summary.covered,
+        }
+
+    def _window(self, session, first: int) -> Dict[str, List]:
+        """Slots for messages from absolute index `first` on."""
+        messages = session.messages
+        total = self.base + len(messages)
+        return {f'm{index % self.ring_size}': _encode(index, messages[index - self.base])
+                for index in range(max(first, total - self.ring_size), total)}
+
+    def delta(self, session) -> Optional[Dict]:
+        """Path -> value updates since the last call, or None if unchanged."""
+        fields = self._fields(session)
+        updates = {path: value for path, value in fields.items()
+                   if self._written.get(path) != value}
+
+        updates.update({f'window/{slot}': message
+                        for slot, message in self._window(session, self._stored).items()})
+
+        self._written = fields
+        self._stored = fields['counters/messages']
+        return updates or None
+
+    def full(self, session) -> Dict:
+        """The whole snapshot as one nested document (for a key-value store)."""
+        snapshot: Dict = {'window': self._window(session, 0)}
+        for path, value in self._fields(session).items():
+            node = snapshot
+            *parents, key = path.split('/')
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[key] = value
+        return snapshot
+
+
+def restore_window(snapshot: Dict) -> Transcript:
+    """A transcript holding the snapshot's message window."""
+    total = snapshot.get('counters', {}).get('messages', 0)
+    # Slots can still hold messages from an earlier lap of the ring; keep the live ones
+    live = {slot[0]: slot for slot in (snapshot.get('window') or {}).values()
+            if total - CONTEXT_MAX_MESSAGES <= slot[0] < total}
+    transcript = Transcript()
+    for index in sorted(live):
+        _, role, content, step, timestamp = live[index]
+        transcript.append(role, content, step or None, timestamp)
+    return transcript
+
+
+def usable(snapshot: Optional[Dict], condition: int) -> bool:
+    """True if `snapshot` can resume a session in `condition`."""
+    return (bool(snapshot)
+            and snapshot.get('version') == SNAPSHOT_VERSION
+            and snapshot.get('condition') == condition
+            and snapshot.get('start_time') is not None)
@@ -1,9 +1,25 @@
 # tutor_flow/step_guide.py
 
-from typing import Iterable
-from .steps import ScaffoldStep, ConversationMessage
+from typing import Optional
+from .steps import ScaffoldStep
 from content.research_topics import get_research_topic
 
+RESPONSE_CLOSING = (
+    "Now respond as the tutor to the student's latest message. Keep your reply "
+    "under 150 words, be clear and encouraging, and stay tightly focused on this stage."
+)
+
+STRUCTURED_CLOSING = (
+    "First decide whether the student's latest message shows they have completed "
+    "the current stage and are ready to move on. If they are, set advance "
+    "to true and reply following the NEXT STAGE instructions; otherwise set "
+    "advance to false and reply following the CURRENT STAGE instructions. "
+    "Set confidence (0 to 1) to how sure you are about that decision.\n\n"
+    "Keep your reply under 150 words, be clear and encouraging, and stay "
+    "tightly focused on the stage you are teaching. Respond only with JSON "
+    "matching the schema: reply, advance, confidence."
+)
+
 
 class StepGuide:
 
@@ -17,27 +33,12 @@ class StepGuide:
         )
 
     @staticmethod
-    def format_context(messages: Iterable[ConversationMessage]) -> str:
-        lines = []
-        for m in messages:
-            prefix = "Student" if m.role == "user" else "Tutor"
-            lines.append(f"{prefix} ({m.step.value}): {m.content}")
-        return "\n".join(lines) if lines else "No recent context."
-
-    @staticmethod
-    def get_response_prompt(
-        character_name: str,
-        topic_key: str,
-        current_step: ScaffoldStep,
-        user_message: str,
-        recent_context: Iterable[ConversationMessage],
-    ) -> str:
-
+    def get_step_instructions(topic_key: str, step: ScaffoldStep) -> str:
+        """The topic's instruction block for one step, placeholders filled in."""
         topic = get_research_topic(topic_key)
-        recent_text = StepGuide.format_context(recent_context)
 
         # Pull instructions from the topic
-        instructions = topic.instructions_for(current_step.value)
+        instructions = topic.instructions_for(step.value)
 
         # Fill in placeholders
         instructions = instructions.format(
@@ -48,7 +49,7 @@ class StepGuide:
         )
 
         # Inject contrast if the topic defines one
-        if current_step == ScaffoldStep.CODE_STRUCTURE:
+        if step == ScaffoldStep.CODE_STRUCTURE:
             contrast = topic.instructions_for("contrast")
             if contrast:
                 instructions += "\n\n" + contrast.format(
@@ -56,13 +57,38 @@ class StepGuide:
                     code_focus=topic.code_focus,
                 )
 
+        return instructions
+
+    @staticmethod
+    def get_response_prompt(character_name: str, topic_key: str, step: ScaffoldStep) -> str:
+        """
+        Stage instructions for a scaffolded reply. The conversation itself is
+        sent as chat messages (see PromptTemplates.build_turn), not repeated here.
+        """
+        topic = get_research_topic(topic_key)
+        instructions = StepGuide.get_step_instructions(topic_key, step)
         return (
             f"You are {character_name} teaching {topic.name}.\n"
-            f"Current scaffold stage: {current_step.value}.\n\n"
+            f"Current scaffold stage: {step.value}.\n\n"
             f"INSTRUCTIONS:\n{instructions}\n\n"
-            "Recent conversation context:\n"
-            f"{recent_text}\n\n"
-            f"Student just said:\n\"{user_message}\"\n\n"
-            "Now respond as the tutor. Keep your reply under 150 words, "
-            "be clear and encouraging, and stay tightly focused on this stage."
-        )
\ No newline at end of file
+            f"{RESPONSE_CLOSING}"
+        )
+
+    @staticmethod
+    def get_structured_response_prompt(character_name: str, topic_key: str, step: ScaffoldStep,
+                                       next_step: Optional[ScaffoldStep]) -> str:
+        """
+        Instructions for a single completion that both decides whether the
+        student is ready for the next stage and replies accordingly.
+        """
+        topic = get_research_topic(topic_key)
+        current = StepGuide.get_step_instructions(topic_key, step)
+        upcoming = StepGuide.get_step_instructions(topic_key, next_step) if next_step else ""
+        return (
+            f"You are {character_name} teaching {topic.name}.\n"
+            f"Current scaffold stage: {step.value}.\n"
+            f"Next scaffold stage: {next_step.value if next_step else 'none'}.\n\n"
+            f"CURRENT STAGE INSTRUCTIONS:\n{current}\n\n"
+            f"NEXT STAGE INSTRUCTIONS:\n{upcoming or 'There is no next stage.'}\n\n"
+            f"{STRUCTURED_CLOSING}"
+        )
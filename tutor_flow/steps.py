@@ -1,9 +1,9 @@
 # tutor_flow/steps.py
 
 from __future__ import annotations
-from dataclasses import dataclass, field
 from enum import Enum
-from typing import Literal
+from typing import Literal, Optional
+import sys
 import time
 
 
@@ -20,10 +20,31 @@ class ScaffoldStep(Enum):
 RoleType = Literal["user", "assistant", "system"]
 
 
-@dataclass
 class ConversationMessage:
-    """Message exchanged during a scaffolded tutoring session."""
-    role: RoleType
-    content: str
-    step: ScaffoldStep
-    timestamp: float = field(default_factory=time.time)
\ No newline at end of file
+    """
+    Message exchanged during a tutoring session.
+
+    Slotted, with interned roles and the step as a shared enum member, so
+    hundreds of live transcripts in one process stay small. `step` is None
+    for direct chat (condition 3). `tokens` is the content's estimated token
+    count, filled in by Transcript.append.
+    """
+    __slots__ = ("role", "content", "step", "timestamp", "tokens")
+
+    def __init__(self, role: RoleType, content: str, step: Optional[ScaffoldStep] = None,
+                 timestamp: Optional[float] = None) -> None:
+        self.role: RoleType = sys.intern(role)
+        self.content: str = content
+        self.step: Optional[ScaffoldStep] = ScaffoldStep(step) if isinstance(step, str) else step
+        self.timestamp: float = time.time() if timestamp is None else timestamp
+        self.tokens: int = 0
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ConversationMessage):
+            return NotImplemented
+        return (self.role, self.content, self.step, self.timestamp) == \
+               (other.role, other.content, other.step, other.timestamp)
+
+    def __repr__(self) -> str:
+        step = self.step.value if self.step else None
+        return f"ConversationMessage(role={self.role!r}, step={step!r}, content={self.content[:40]!r})"
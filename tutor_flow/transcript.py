@@ -0,0 +1,104 @@
+# tutor_flow/transcript.py
+"""
+Append-only transcript store shared by all three conditions.
+
+Holds the full history as slotted ConversationMessage records plus a
+bounded ring buffer with the newest messages already in OpenAI chat
+format, each dict built once as its message is appended. Prompt windows
+come from the ring, so a turn walks and copies only the newest messages
+instead of rebuilding role/content dicts for the whole conversation, and
+a long conversation's older messages cost nothing beyond their records.
+
+The ring is allocated on the first prompt window and kept up to date
+from then on, so transcripts that are only held or replayed (restored
+sessions before their first turn, exports) don't carry it.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+from utils.config import CONTEXT_MAX_MESSAGES
+
+from .context import clip_to_tokens, message_tokens
+from .steps import ConversationMessage, RoleType, ScaffoldStep
+
+
+class Transcript(Sequence):
+    """A conversation's messages, oldest first; index is the message ID."""
+
+    __slots__ = ("_messages", "_recent", "ring_size")
+
+    def __init__(self, ring_size: int = CONTEXT_MAX_MESSAGES):
+        self._messages: List[ConversationMessage] = []
+        self.ring_size = ring_size
+        # Newest messages in chat format, once a window has been asked for;
+        # the dicts go into prompts as-is, so nothing downstream may mutate them
+        self._recent: Optional[Deque[Dict[str, str]]] = None
+
+    def append(self, role: RoleType, content: str, step: Optional[ScaffoldStep] = None,
+               timestamp: Optional[float] = None) -> ConversationMessage:
+        message = ConversationMessage(role, content, step, timestamp)
+        message.tokens = message_tokens(content)
+        self._messages.append(message)
+        if self._recent is not None:
+            self._recent.append({'role': message.role, 'content': content})
+        return message
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def _ring(self) -> Deque[Dict[str, str]]:
+        if self._recent is None:
+            self._recent = deque(({'role': m.role, 'content': m.content}
+                                  for m in self._messages[-self.ring_size:]),
+                                 maxlen=self.ring_size)
+        return self._recent
+
+    # -------- Views --------
+
+    def chat(self, start: int = 0) -> List[Dict[str, str]]:
+        """Messages from `start` on, in OpenAI chat format."""
+        recent = self._ring()
+        ring_start = len(self._messages) - len(recent)
+        older = [{'role': m.role, 'content': m.content}
+                 for m in self._messages[start:ring_start]]
+        return older + list(islice(recent, max(0, start - ring_start), None))
+
+    def pairs(self, start: int = 0, stop: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Messages [start, stop) as (role, content) pairs."""
+        return [(m.role, m.content) for m in self._messages[start:stop]]
+
+    def window(self, budget_tokens: int) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        The newest messages that fit `budget_tokens` (estimated), at most
+        ring_size of them, in chat format and oldest first, with the index
+        of the first one. The newest is always included; a message larger
+        than the whole budget is clipped.
+        """
+        recent = self._ring()
+        messages = self._messages
+        end = len(messages)
+        used, start = 0, end
+        for index in range(end - 1, end - len(recent) - 1, -1):
+            tokens = messages[index].tokens
+            if start < end and used + tokens > budget_tokens:
+                break
+            used += tokens
+            start = index
+
+        window = list(islice(recent, len(recent) - (end - start), None))
+        for i, entry in enumerate(window):
+            if messages[start + i].tokens > budget_tokens:
+                window[i] = {'role': entry['role'],
+                             'content': clip_to_tokens(entry['content'], budget_tokens)}
+        return start, window
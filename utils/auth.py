@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import firebase_admin
 from firebase_admin import credentials, auth as admin_auth
+from utils.timing import timed_phase
 
 # ---------------------------------------------------------
 # Firebase Initialization (Admin SDK)
@@ -96,6 +97,7 @@ def require_auth():
 # User Data via Admin SDK
 # ---------------------------------------------------------
 
+@timed_phase('firebase_reads')
 def get_user_data(uid: str):
     """
     Fetch user info from Firebase Authentication using Admin SDK.
@@ -75,6 +75,64 @@ EXPORT_INCLUDE = [
 SHOW_DEBUG_INFO = False  # Set to True for testing, False for production
 REQUIRE_EMAIL_VERIFICATION = False  # Set to True if using email verification
 ALLOW_MULTIPLE_ATTEMPTS = False  # Students can only do each session once
+TRANSCRIPT_LIVE_WINDOW = 12  # Newest messages shown as chat bubbles; older ones collapse
+
+# Conversation Context
+CONTEXT_TOKEN_BUDGET = 1200  # Estimated tokens of recent messages sent with each turn
+CONTEXT_SUMMARIES = False  # Summarize scaffolded messages that fall out of the window (background LLM call); never condition 3
+CONTEXT_SUMMARY_CONCURRENT = 2  # Summary calls in flight per process (outside the LLM scheduler's slots)
+CONTEXT_SUMMARY_TOKENS = 200  # Upper bound on the rolling summary
+CONTEXT_MAX_MESSAGES = 12  # Ring buffer size: most messages a context window can hold
+
+# Session State (shared across app replicas)
+STATE_STORE_URL = None  # e.g. 'redis://localhost:6379/0'; None keeps state in this process
+STATE_STORE_TTL = 6 * 60 * 60  # Seconds a student's state outlives their last action
+
+# LLM Gateway (optional process shared by all app replicas; see client/llm_gateway.py)
+LLM_GATEWAY_URL = None  # e.g. 'unix:///tmp/tutor-llm.sock' or 'http://127.0.0.1:8787'; None calls OpenAI directly
+LLM_GATEWAY_RPM = 500  # Requests per minute across all replicas
+LLM_GATEWAY_TPM = 200_000  # Tokens per minute across all replicas (prompt estimate + max_tokens)
+LLM_GATEWAY_MAX_WAIT = 30  # Seconds a request may wait for rate-limit capacity before it's refused
+LLM_GATEWAY_CACHE_TTL = 300  # Seconds an identical temperature-0 request is answered from cache; 0 disables
+LLM_GATEWAY_CACHE_SIZE = 2000  # Cached completions kept (least recently used evicted)
+LLM_GATEWAY_RETRIES = 3  # Retries on rate-limit, timeout and 5xx errors from OpenAI
+
+# LLM Scheduling (per process; see client/scheduler.py)
+LLM_MAX_CONCURRENT = 8  # LLM calls in flight at once; more wait in the scheduler. 0 = no cap
+LLM_QUEUE_TARGET_WAIT = 1  # Seconds a just-started student's call may yield to more urgent ones; shrinks as their session ends
+
+# Admission Control (waiting room before learning; thresholds adjustable from the admin dashboard)
+ADMISSION_CONTROL = True  # False admits everyone immediately
+ADMISSION_MAX_IN_FLIGHT = 24  # LLM calls running or queued in this process
+ADMISSION_MAX_QUEUE_DEPTH = 8  # LLM calls waiting for a concurrency slot
+ADMISSION_MAX_LLM_P95 = 8.0  # Seconds, LLM calls over the last LIVE_LATENCY_WINDOW
+ADMISSION_MAX_DB_P95 = 2.0  # Seconds, database operations over the last LIVE_LATENCY_WINDOW
+ADMISSION_POLL_SECONDS = 5  # How often the waiting room checks again
+ADMISSION_TICKET_TTL = 30  # Seconds without a check before a waiting student is dropped (tab closed)
+
+# Degraded Replies (pre-authored per-step fallbacks when the LLM is too slow; see content/fallback_responses.py)
+FALLBACK_LIBRARY_FILE = 'content/fallback_responses.json'  # Written by content/generate_fallbacks.py; missing = built-in replies only
+TURN_LATENCY_BUDGET = 20  # Seconds a scaffolded turn may wait for the LLM before a fallback reply is served; None = no limit
+# Serve fallback replies without calling the LLM while the live p95 (s) of completed calls is above this; None = never.
+# Calls cut off at the budget aren't counted, so it has to sit below TURN_LATENCY_BUDGET to ever trip
+DEGRADE_LLM_P95 = 0.75 * TURN_LATENCY_BUDGET
+
+# Step Advancement
+LLM_STEP_DECISIONS = False  # Let the model decide step advances in the same call as the reply
+STEP_DECISION_MIN_CONFIDENCE = 0.6  # Below this, fall back to the keyword matchers
+
+# Performance Monitoring
+PERF_RUN_HISTORY = 500  # Recent script runs kept in memory (per process) for the admin panel
+METRICS_PORT = None  # e.g. 9464 to serve Prometheus metrics at /metrics (no auth); None to disable
+METRICS_ADDR = '127.0.0.1'  # Interface for METRICS_PORT; widen only behind a firewall or proxy
+METRICS_FILE = None  # Or write them to this file (e.g. a node_exporter textfile directory)
+METRICS_FILE_INTERVAL = 15  # Seconds between metrics file writes
+DB_PAYLOAD_SAMPLE_EVERY = 20  # Measure the JSON size of every Nth payload per database operation
+LIVE_LATENCY_WINDOW = 60  # Seconds of LLM/DB latencies behind the live p95s (admission control, degraded replies)
+LIVE_LATENCY_MIN_SAMPLES = 20  # Fewer samples than this in the window and the live p95s read 0 (no verdict)
+TRACE_FILE = None  # e.g. 'logs/traces.jsonl': spans for each student turn (user IDs, topics, errors), one JSON per line
+TRACE_MAX_BYTES = 10_000_000  # Rotate the trace file at this size
+TRACE_BACKUPS = 3  # Rotated trace files kept (traces.jsonl.1 ... .3)
 
 # Study Information (shown to students)
 STUDY_INFO = {
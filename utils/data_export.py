@@ -52,7 +52,8 @@ def generate_detailed_csv_with_messages() -> str:
     fieldnames = [
         'user_id', 'email', 'condition', 'condition_name', 
         'topic', 'message_number', 'role', 'content', 
-        'timestamp', 'step'
+        'timestamp', 'step', 'degraded', 'finish_reason', 'completion_tokens',
+        'max_tokens'
     ]
     
     writer = csv.DictWriter(output, fieldnames=fieldnames)
@@ -79,7 +80,11 @@ def generate_detailed_csv_with_messages() -> str:
                     'role': msg.get('role', ''),
                     'content': msg.get('content', ''),
                     'timestamp': msg.get('timestamp', ''),
-                    'step': msg.get('step', '')
+                    'step': msg.get('step', ''),
+                    'degraded': msg.get('degraded', ''),
+                    'finish_reason': msg.get('generation', {}).get('finish_reason', ''),
+                    'completion_tokens': msg.get('generation', {}).get('completion_tokens', ''),
+                    'max_tokens': msg.get('generation', {}).get('max_tokens', '')
                 })
     
     return output.getvalue()
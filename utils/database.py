@@ -3,30 +3,60 @@ Database Operations
 Handle all data storage and retrieval for the research study
 """
 
+import logging
 import time
 from firebase_admin import db
 import streamlit as st
 from typing import Optional, Dict, List
+from utils.timing import timed_phase
+from utils.metrics import observe_db_operation, observe_db_payload
+from utils.persistence import in_background_write
+from utils.tracing import traced
+from content.survey import get_survey_summary
 
+logger = logging.getLogger("tutor.database")
 
+
+def _report_error(message: str):
+    """Show a failed write on the page, or log it if it ran in the background (WriteQueue)."""
+    if in_background_write():
+        logger.error(message)
+    else:
+        st.error(message)
+
+
+@timed_phase('db_writes')
+@traced('db.save_session_start')
+@observe_db_operation
 def save_session_start(user_id: str, session_id: str, condition: int):
     """Record that a session has started."""
     try:
         ref = db.reference(f'users/{user_id}/sessions/{session_id}')
-        ref.update({
+        payload = {
             'status': 'in_progress',
             'start_time': time.time(),
             'condition': condition,
             'messages': [],
-            'scaffold_progress': []
-        })
+            'scaffold_progress': [],
+            'snapshot': None  # A fresh start never resumes an older run
+        }
+        ref.update(payload)
+        observe_db_payload('save_session_start', payload)
     except Exception as e:
         st.error(f"Error saving session start: {e}")
 
 
+@timed_phase('db_writes')
+@traced('db.save_message')
+@observe_db_operation
 def save_message(user_id: str, session_id: str, role: str, content: str, 
-                 step: Optional[str] = None):
-    """Save a conversation message."""
+                 step: Optional[str] = None, degraded: Optional[str] = None,
+                 generation: Optional[Dict] = None):
+    """
+    Save a conversation message. `degraded`: why a fallback reply was
+    served; `generation`: max_tokens, finish_reason and lengths of a
+    generated reply.
+    """
     try:
         ref = db.reference(f'users/{user_id}/sessions/{session_id}/messages')
         
@@ -38,6 +68,10 @@ def save_message(user_id: str, session_id: str, role: str, content: str,
         
         if step:
             message_data['step'] = step
+        if degraded:
+            message_data['degraded'] = degraded
+        if generation:
+            message_data['generation'] = generation
         
         # Get current messages
         messages = ref.get() or []
@@ -45,11 +79,15 @@ def save_message(user_id: str, session_id: str, role: str, content: str,
         
         # Save back
         ref.set(messages)
+        observe_db_payload('save_message', messages)
         
     except Exception as e:
-        st.error(f"Error saving message: {e}")
+        _report_error(f"Error saving message: {e}")
 
 
+@timed_phase('db_writes')
+@traced('db.save_scaffold_progress')
+@observe_db_operation
 def save_scaffold_progress(user_id: str, session_id: str, step: str):
     """Record scaffold step progression."""
     try:
@@ -66,37 +104,78 @@ def save_scaffold_progress(user_id: str, session_id: str, step: str):
         
         # Save back
         ref.set(progress)
+        observe_db_payload('save_scaffold_progress', progress)
         
     except Exception as e:
-        st.error(f"Error saving scaffold progress: {e}")
+        _report_error(f"Error saving scaffold progress: {e}")
+
 
+@timed_phase('db_writes')
+@traced('db.save_snapshot')
+@observe_db_operation
+def save_snapshot(user_id: str, session_id: str, updates: Dict):
+    """Apply an incremental session snapshot (see tutor_flow.snapshot)."""
+    try:
+        ref = db.reference(f'users/{user_id}/sessions/{session_id}/snapshot')
+        # Multi-path update: only the changed fields and new message slots
+        ref.update(updates)
+        observe_db_payload('save_snapshot', updates)
+    except Exception as e:
+        _report_error(f"Error saving session snapshot: {e}")
 
+
+@timed_phase('firebase_reads')
+@observe_db_operation
+def load_snapshot(user_id: str, session_id: str) -> Optional[Dict]:
+    """Get a session's resume snapshot, or None if it has none."""
+    try:
+        ref = db.reference(f'users/{user_id}/sessions/{session_id}/snapshot')
+        snapshot = ref.get()
+        observe_db_payload('load_snapshot', snapshot)
+        return snapshot
+    except Exception as e:
+        st.error(f"Error loading session snapshot: {e}")
+        return None
+
+
+@timed_phase('db_writes')
+@traced('db.save_quiz_responses')
+@observe_db_operation
 def save_quiz_responses(user_id: str, session_id: str, responses: Dict, score: int, total: int):
     """Save quiz responses and score."""
     try:
         ref = db.reference(f'users/{user_id}/sessions/{session_id}')
-        ref.update({
+        payload = {
             'quiz_responses': responses,
             'quiz_score': score,
             'quiz_total': total,
             'quiz_completed_time': time.time()
-        })
+        }
+        ref.update(payload)
+        observe_db_payload('save_quiz_responses', payload)
     except Exception as e:
         st.error(f"Error saving quiz responses: {e}")
 
 
+@timed_phase('db_writes')
+@traced('db.save_survey_responses')
+@observe_db_operation
 def save_survey_responses(user_id: str, session_id: str, responses: Dict):
     """Save survey responses."""
     try:
         ref = db.reference(f'users/{user_id}/sessions/{session_id}')
-        ref.update({
+        payload = {
             'survey_responses': responses,
             'survey_completed_time': time.time()
-        })
+        }
+        ref.update(payload)
+        observe_db_payload('save_survey_responses', payload)
     except Exception as e:
         st.error(f"Error saving survey responses: {e}")
 
 
+@timed_phase('db_writes')
+@observe_db_operation
 def complete_session(user_id: str, session_id: str):
     """Mark a session as complete."""
     try:
@@ -104,6 +183,7 @@ def complete_session(user_id: str, session_id: str):
         
         # Get session data
         session_data = ref.get()
+        observe_db_payload('complete_session', session_data)
         
         if session_data:
             start_time = session_data.get('start_time', time.time())
@@ -126,6 +206,8 @@ def complete_session(user_id: str, session_id: str):
         st.error(f"Error completing session: {e}")
 
 
+@timed_phase('firebase_reads')
+@observe_db_operation
 def get_session_status(user_id: str, session_id: str) -> str:
     """
     Get the status of a session.
@@ -135,6 +217,7 @@ def get_session_status(user_id: str, session_id: str) -> str:
     try:
         ref = db.reference(f'users/{user_id}/sessions/{session_id}')
         session_data = ref.get()
+        observe_db_payload('get_session_status', session_data)
         
         if not session_data:
             return 'not_started'
@@ -146,6 +229,8 @@ def get_session_status(user_id: str, session_id: str) -> str:
         return 'not_started'
 
 
+@timed_phase('firebase_reads')
+@observe_db_operation
 def get_next_session(user_id: str) -> Optional[str]:
     """
     Determine which session the user should do next.
@@ -171,21 +256,27 @@ def get_next_session(user_id: str) -> Optional[str]:
         return 'arraylist'  # Default to first session
 
 
+@timed_phase('firebase_reads')
+@observe_db_operation
 def get_all_users() -> Dict:
     """Get all user data (admin only)."""
     try:
         ref = db.reference('users')
-        return ref.get() or {}
+        users = ref.get() or {}
+        return users
     except Exception as e:
         st.error(f"Error getting all users: {e}")
         return {}
 
 
+@timed_phase('firebase_reads')
+@observe_db_operation
 def get_user_condition(user_id: str) -> int:
     """Get the condition assigned to a user."""
     try:
         ref = db.reference(f'users/{user_id}')
         user_data = ref.get()
+        observe_db_payload('get_user_condition', user_data)
         
         if user_data and 'condition' in user_data:
             return user_data['condition']
@@ -198,6 +289,7 @@ def get_user_condition(user_id: str) -> int:
         return 1
 
 
+@observe_db_operation
 def export_data_to_dict() -> List[Dict]:
     """
     Export all data for analysis.
@@ -236,7 +328,7 @@ def export_data_to_dict() -> List[Dict]:
                         'quiz_score': session_data.get('quiz_score', 0),
                         'quiz_total': session_data.get('quiz_total', 0),
                         'quiz_percentage': round((session_data.get('quiz_score', 0) / session_data.get('quiz_total', 1)) * 100, 1),
-                        'survey_responses': str(session_data.get('survey_responses', {})),
+                        'survey_responses': get_survey_summary(session_data.get('survey_responses') or {}),
                         'completed': True
                     }
                     
@@ -0,0 +1,362 @@
+"""
+Metrics
+Minimal Prometheus-style registry (counters, gauges, histograms) with a
+text-format exporter on a side HTTP server and/or a periodically written file
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from utils.config import (
+    DB_PAYLOAD_SAMPLE_EVERY, LIVE_LATENCY_WINDOW, METRICS_ADDR, METRICS_PORT, METRICS_FILE,
+    METRICS_FILE_INTERVAL
+)
+from utils.timing import percentile
+from utils.tracing import annotate
+
+logger = logging.getLogger("tutor.metrics")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+BYTES_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000)
+TOKEN_BUCKETS = (25, 50, 100, 150, 200, 250, 300, 400, 500, 750)
+RECENT_MAX_SAMPLES = 5000  # Cap on raw observations a windowed histogram keeps
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Shared bookkeeping: name, help text, labelled values, a lock."""
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self._header() + [
+            f"{self.name}{_format_labels(key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def total(self) -> float:
+        """Sum over all label sets."""
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is computed when scraped."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._function: Optional[Callable[[], Dict[LabelKey, float]]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], Dict[Tuple, float]]):
+        """
+        Compute the gauge at scrape time. fn returns {labels dict as
+        tuple of (name, value) pairs: value}.
+        """
+        self._function = fn
+
+    def render(self) -> List[str]:
+        if self._function is None:
+            return super().render()
+        values = {tuple(sorted((k, str(v)) for k, v in key)): value
+                  for key, value in self._function().items()}
+        return self._header() + [
+            f"{self.name}{_format_labels(key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 window: Optional[float] = None):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[LabelKey, Dict] = {}
+        # Raw observations from the last `window` seconds, for live percentiles
+        self.window = window
+        self._recent: Deque[Tuple[float, float]] = deque(maxlen=RECENT_MAX_SAMPLES)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            if self.window is not None:
+                self._recent.append((time.monotonic(), value))
+            series = self._series.get(key)
+            if series is None:
+                series = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def recent_percentile(self, pct: float, min_samples: int = 1) -> float:
+        """
+        Percentile (0-100) of observations in the last `window` seconds, all
+        labels; 0.0 if there are fewer than `min_samples` of them.
+        """
+        cutoff = time.monotonic() - (self.window or 0)
+        with self._lock:
+            values = [value for at, value in self._recent if at >= cutoff]
+        if len(values) < min_samples:
+            return 0.0
+        return percentile(values, pct)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {k: {'counts': list(v['counts']), 'sum': v['sum'], 'count': v['count']}
+                      for k, v in self._series.items()}
+        lines = self._header()
+        for key, s in sorted(series.items()):
+            for bound, count in zip(self.buckets, s['counts']):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(s['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {s['count']}")
+        return lines
+
+
+class Registry:
+    """All metrics in this process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  window: Optional[float] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets, window)
+
+    def render(self) -> str:
+        """Text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# -------------------------------------------------------------------------
+# Metrics recorded by the app
+# -------------------------------------------------------------------------
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "tutor_llm_request_seconds", "Latency of OpenAI completion calls",
+    window=LIVE_LATENCY_WINDOW)
+LLM_BACKGROUND_SECONDS = REGISTRY.histogram(
+    "tutor_llm_background_seconds", "Latency of background OpenAI calls (context summaries)")
+LLM_TOKENS = REGISTRY.counter(
+    "tutor_llm_tokens_total", "Tokens used by OpenAI completion calls")
+LLM_ERRORS = REGISTRY.counter(
+    "tutor_llm_errors_total", "Failed OpenAI completion calls")
+LLM_CANCELLED = REGISTRY.counter(
+    "tutor_llm_cancelled_total", "Generations cancelled before finishing, by reason and stage")
+LLM_WASTED_TOKENS = REGISTRY.counter(
+    "tutor_llm_wasted_tokens_total", "Estimated tokens spent on generations that were cancelled")
+
+DB_OPERATION_SECONDS = REGISTRY.histogram(
+    "tutor_db_operation_seconds", "Latency of Firebase operations in utils/database.py",
+    window=LIVE_LATENCY_WINDOW)
+DB_PAYLOAD_BYTES = REGISTRY.histogram(
+    "tutor_db_payload_bytes", "Bytes written or read by Firebase operations (sampled)",
+    BYTES_BUCKETS)
+
+SCAFFOLD_TRANSITIONS = REGISTRY.counter(
+    "tutor_scaffold_transitions_total", "Scaffold step transitions")
+REPLY_TOKENS = REGISTRY.histogram(
+    "tutor_reply_tokens", "Completion tokens per generated tutor reply, by step", TOKEN_BUCKETS)
+REPLY_FINISH = REGISTRY.counter(
+    "tutor_reply_finish_total", "Generated tutor replies by step and finish_reason (length = cut off)")
+DEGRADED_TURNS = REGISTRY.counter(
+    "tutor_degraded_turns_total", "Tutor replies served from the fallback library, by reason and step")
+ACTIVE_SESSIONS = REGISTRY.gauge(
+    "tutor_active_sessions", "Learning sessions currently in progress, per condition")
+
+
+def observe_db_operation(fn: Callable) -> Callable:
+    """Decorator: record the latency of a utils/database.py function."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with DB_OPERATION_SECONDS.time(operation=fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+_payload_calls: Dict[str, int] = {}
+_payload_lock = threading.Lock()
+
+
+def observe_db_payload(operation: str, data):
+    """
+    Record the JSON size of data written to / read from Firebase, for
+    one in DB_PAYLOAD_SAMPLE_EVERY calls per operation. Serializing a
+    whole message list on every write just to measure it would cost more
+    than the sizes are worth.
+    """
+    if data is None:
+        return
+    with _payload_lock:
+        calls = _payload_calls[operation] = _payload_calls.get(operation, 0) + 1
+    if calls % max(1, DB_PAYLOAD_SAMPLE_EVERY):
+        return
+    size = len(json.dumps(data, default=str))
+    DB_PAYLOAD_BYTES.observe(size, operation=operation)
+    annotate(payload_bytes=size)
+
+
+# -------------------------------------------------------------------------
+# Exporters
+# -------------------------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are frequent; keep them out of the app log
+
+
+def start_http_server(port: int, addr: str = '127.0.0.1') -> bool:
+    """Serve /metrics on a daemon thread. Returns False if the port is taken."""
+    try:
+        server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics server not started on port %s: %s", port, e)
+        return False
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Metrics served on http://%s:%s/metrics", addr, port)
+    return True
+
+
+def start_file_writer(path: str, interval: float):
+    """Rewrite `path` with the current metrics every `interval` seconds."""
+    def loop():
+        while True:
+            try:
+                tmp = f"{path}.tmp"
+                with open(tmp, 'w') as f:
+                    f.write(REGISTRY.render())
+                os.replace(tmp, path)  # Atomic, so scrapers never see a partial file
+            except OSError as e:
+                logger.warning("Could not write metrics file %s: %s", path, e)
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the configured exporters once per process (safe to call every rerun)."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, METRICS_ADDR)
+    if METRICS_FILE:
+        start_file_writer(METRICS_FILE, METRICS_FILE_INTERVAL)
@@ -0,0 +1,90 @@
+"""
+Background Persistence
+Run database writes off the request path while keeping per-session order
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from utils.timing import attached_run, current_run
+
+logger = logging.getLogger("tutor.persistence")
+
+# Shared by all sessions in this process. Writes are I/O bound, so a small
+# pool is enough to keep them off the LLM's critical path.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="db-write")
+
+
+# Set on worker threads while a queued write runs
+_background = threading.local()
+
+
+def in_background_write() -> bool:
+    """
+    True inside a queued write. There is no Streamlit page to report to
+    there (the script run may have finished), so callers log instead.
+    """
+    return getattr(_background, "active", False)
+
+
+class WriteQueue:
+    """
+    Ordered background writes for a single session.
+
+    Each write starts only after the previous one for the same session has
+    finished. save_message is a read-modify-write of the whole message list,
+    so two writes for one session must never overlap.
+    """
+
+    def __init__(self):
+        self._last: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) behind this session's earlier writes."""
+        # Count the write's time against the script run that queued it, and
+        # keep its trace span under the turn that queued it
+        script_run = current_run()
+        context = contextvars.copy_context()
+        future: Future = Future()
+
+        def write():
+            if not future.set_running_or_notify_cancel():
+                return
+            start = time.perf_counter()
+            _background.active = True
+            try:
+                with attached_run(script_run):
+                    future.set_result(context.run(fn, *args, **kwargs))
+            except Exception as e:
+                # A failed write shouldn't block later ones
+                logger.exception("Background write %s failed", fn.__name__)
+                future.set_exception(e)
+            finally:
+                _background.active = False
+                logger.info("db %s=%.0fms", fn.__name__,
+                            (time.perf_counter() - start) * 1000)
+
+        with self._lock:
+            previous, self._last = self._last, future
+        # The next write is handed to the pool only once this session's
+        # previous one has finished, so no worker sits waiting on another
+        if previous is None:
+            _executor.submit(write)
+        else:
+            previous.add_done_callback(lambda _: _executor.submit(write))
+        return future
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every write queued so far has finished."""
+        with self._lock:
+            last = self._last
+        if last is not None:
+            try:
+                last.result(timeout=timeout)
+            except Exception:
+                pass
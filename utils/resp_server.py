@@ -0,0 +1,164 @@
+"""
+RESP Stand-in Server
+A tiny in-memory server speaking the Redis protocol, for running and
+testing RedisStateStore (and several app replicas) without a real Redis
+
+Supports the commands the app uses plus a few for poking at it by hand:
+PING, ECHO, AUTH, SELECT, GET, SET [EX|PX], DEL, EXISTS, EXPIRE, TTL,
+KEYS, DBSIZE, FLUSHDB. Data is not persisted.
+
+Usage:
+    python -m utils.resp_server --port 6380
+    # then set STATE_STORE_URL = 'redis://localhost:6380/0'
+"""
+
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.state_store import RespError, read_reply
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _int(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+
+
+class Keyspace:
+    """Values with optional expiry times, one dict per database."""
+
+    def __init__(self):
+        self.dbs: Dict[int, Dict[bytes, Tuple[bytes, Optional[float]]]] = {}
+        self.lock = threading.Lock()
+
+    def db(self, index: int) -> Dict[bytes, Tuple[bytes, Optional[float]]]:
+        return self.dbs.setdefault(index, {})
+
+    @staticmethod
+    def live(data: Dict, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del data[key]
+            return None
+        return entry
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """One client connection: read commands, write replies, until it closes."""
+
+    def handle(self):
+        self.db = 0
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            except RespError as e:
+                self.wfile.write(b"-ERR %s\r\n" % str(e).encode())
+                continue
+            if not isinstance(command, list) or not command:
+                self.wfile.write(b"-ERR expected a command array\r\n")
+                continue
+            try:
+                reply = self.dispatch(command[0].upper(), command[1:])
+            except (IndexError, ValueError):
+                reply = b"-ERR wrong number or type of arguments\r\n"
+            self.wfile.write(reply)
+
+    def dispatch(self, name: bytes, args: List[bytes]) -> bytes:
+        keyspace: Keyspace = self.server.keyspace
+        with keyspace.lock:
+            data = keyspace.db(self.db)
+
+            if name == b"PING":
+                return _bulk(args[0]) if args else b"+PONG\r\n"
+            if name == b"ECHO":
+                return _bulk(args[0])
+            if name == b"AUTH":
+                return OK
+            if name == b"SELECT":
+                self.db = int(args[0])
+                return OK
+            if name == b"GET":
+                entry = keyspace.live(data, args[0])
+                return _bulk(entry[0] if entry else None)
+            if name == b"SET":
+                expires = None
+                options = [a.upper() for a in args[2:]]
+                if b"EX" in options:
+                    expires = time.time() + int(args[2 + options.index(b"EX") + 1])
+                elif b"PX" in options:
+                    expires = time.time() + int(args[2 + options.index(b"PX") + 1]) / 1000
+                data[args[0]] = (args[1], expires)
+                return OK
+            if name == b"DEL":
+                return _int(sum(data.pop(key, None) is not None for key in args))
+            if name == b"EXISTS":
+                return _int(sum(keyspace.live(data, key) is not None for key in args))
+            if name == b"EXPIRE":
+                entry = keyspace.live(data, args[0])
+                if entry is None:
+                    return _int(0)
+                data[args[0]] = (entry[0], time.time() + int(args[1]))
+                return _int(1)
+            if name == b"TTL":
+                entry = keyspace.live(data, args[0])
+                if entry is None:
+                    return _int(-2)
+                return _int(-1 if entry[1] is None else int(entry[1] - time.time()))
+            if name == b"KEYS":
+                pattern = args[0].decode()
+                keys = [k for k in list(data) if keyspace.live(data, k)
+                        and fnmatch.fnmatchcase(k.decode(), pattern)]
+                return b"*%d\r\n" % len(keys) + b"".join(_bulk(k) for k in keys)
+            if name == b"DBSIZE":
+                return _int(sum(keyspace.live(data, k) is not None for k in list(data)))
+            if name == b"FLUSHDB":
+                data.clear()
+                return OK
+        return b"-ERR unknown command '%s'\r\n" % name
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int]):
+        super().__init__(address, RespHandler)
+        self.keyspace = Keyspace()
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0) -> RespServer:
+    """Serve in a background thread; port 0 picks a free one (server.server_address)."""
+    server = RespServer((host, port))
+    threading.Thread(target=server.serve_forever, name="resp-server", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-memory Redis-protocol stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args(argv)
+
+    server = RespServer((args.host, args.port))
+    print(f"RESP stand-in listening on {args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
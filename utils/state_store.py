@@ -0,0 +1,253 @@
+"""
+Session State Store
+Per-student learning state kept outside the Streamlit process
+
+st.session_state lives and dies with one process, so a replica that
+restarts or a reconnect routed to another replica loses the student.
+The learning flow's state (phase, quiz answers, tutor snapshot with the
+timer) is mirrored into a StateStore keyed by user ID, and read back when
+a new Streamlit session for the same student has none.
+
+Two implementations:
+    InProcessStateStore   single replica (the default, no dependencies)
+    RedisStateStore       any server speaking the Redis protocol (RESP),
+                          via the small client below; utils.resp_server
+                          is a local stand-in for testing without Redis
+"""
+
+import json
+import logging
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.config import STATE_STORE_URL, STATE_STORE_TTL
+from utils.metrics import DB_OPERATION_SECONDS, DB_PAYLOAD_BYTES
+
+logger = logging.getLogger("tutor.state_store")
+
+KEY_PREFIX = "tutor:learner:"
+
+
+class StateStore(ABC):
+    """JSON documents by key, each expiring `ttl` seconds after its last write."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """The document under `key`, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict, ttl: int = STATE_STORE_TTL):
+        """Store `value` under `key`, expiring `ttl` seconds from now."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove `key` if present."""
+
+
+class InProcessStateStore(StateStore):
+    """Dict-backed store shared by every session in this process."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            raw, expires = entry
+            if expires <= time.time():
+                del self._data[key]
+                return None
+        # Stored serialized, so callers get the same copy semantics as Redis
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict, ttl: int = STATE_STORE_TTL):
+        raw = json.dumps(value)
+        with self._lock:
+            self._data[key] = (raw, time.time() + ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# ---------------------------------------------------------
+# Redis protocol
+# ---------------------------------------------------------
+
+class RespError(Exception):
+    """Error reply from the server (a "-ERR ..." line)."""
+
+
+def encode_command(*args) -> bytes:
+    """A command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    """Read one RESP reply from a binary file-like object."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RespError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [read_reply(stream) for _ in range(count)]
+    raise RespError(f"Unexpected reply type {kind!r}")
+
+
+class RespClient:
+    """
+    Minimal blocking Redis-protocol client: one connection, one command at
+    a time, reconnecting once if the connection dropped.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 2.0) -> "RespClient":
+        """redis://[:password@]host[:port][/db]"""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, db,
+                   parsed.password, timeout)
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._sock.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", self.db)
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._stream.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._stream = None
+
+    def _call(self, *args):
+        self._sock.sendall(encode_command(*args))
+        return read_reply(self._stream)
+
+    def execute(self, *args):
+        """Send one command and return its reply."""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._call(*args)
+                except (ConnectionError, OSError):
+                    self._close()
+                    if attempt == 2:
+                        raise
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class RedisStateStore(StateStore):
+    """State in a Redis-protocol server, shared by every replica."""
+
+    def __init__(self, client: RespClient):
+        self.client = client
+
+    def get(self, key: str) -> Optional[Dict]:
+        with DB_OPERATION_SECONDS.time(operation='state_store_get'):
+            raw = self.client.execute("GET", key)
+        if raw is None:
+            return None
+        DB_PAYLOAD_BYTES.observe(len(raw), operation='state_store_get')
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict, ttl: int = STATE_STORE_TTL):
+        raw = json.dumps(value).encode()
+        DB_PAYLOAD_BYTES.observe(len(raw), operation='state_store_set')
+        with DB_OPERATION_SECONDS.time(operation='state_store_set'):
+            self.client.execute("SET", key, raw, "EX", int(ttl))
+
+    def delete(self, key: str):
+        with DB_OPERATION_SECONDS.time(operation='state_store_delete'):
+            self.client.execute("DEL", key)
+
+
+_store: Optional[StateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """The process-wide store: Redis if STATE_STORE_URL is set, else in-process."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STATE_STORE_URL:
+                _store = RedisStateStore(RespClient.from_url(STATE_STORE_URL))
+                logger.info("Session state in %s", STATE_STORE_URL)
+            else:
+                _store = InProcessStateStore()
+        return _store
+
+
+def learner_key(user_id: str) -> str:
+    return KEY_PREFIX + user_id
+
+
+# The store only caches progress: if it is unreachable the app carries on
+# with what st.session_state and Firebase have, so errors are logged here
+
+def load_learner(user_id: str) -> Optional[Dict]:
+    """A student's record, or None if there is none or the store is unreachable."""
+    try:
+        return get_state_store().get(learner_key(user_id))
+    except Exception as e:
+        logger.error(f"Error loading learner state: {e}")
+        return None
+
+
+def save_learner(user_id: str, record: Dict) -> bool:
+    """Write a student's record; False (and nothing written) if the store is unreachable."""
+    try:
+        get_state_store().set(learner_key(user_id), record)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving learner state: {e}")
+        return False
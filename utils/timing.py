@@ -0,0 +1,218 @@
+"""
+Timing Helpers
+Lightweight per-stage timers for the request path, plus a bounded
+in-memory history of recent script runs for the admin Performance panel
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+from utils.config import PERF_RUN_HISTORY
+
+logger = logging.getLogger("tutor.timing")
+
+# Phases shown in the Performance panel, in display order
+RUN_PHASES = ['auth', 'firebase_reads', 'prompt_build', 'llm', 'db_writes', 'render']
+
+
+class TurnTimer:
+    """Collects named stage durations for one unit of work (e.g. a chat turn)."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stages: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage `name` (also a phase of the current run)."""
+        start = time.perf_counter()
+        try:
+            with phase(name):
+                yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Add `seconds` to stage `name` (repeated stages accumulate)."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self._start
+
+    def log(self):
+        """Log all stage timings on one line."""
+        stages = " ".join(f"{name}={secs * 1000:.0f}ms" for name, secs in self.stages.items())
+        logger.info("%s total=%.0fms %s", self.label, self.total * 1000, stages)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in 0-100); 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Count, mean and tail percentiles for a list of durations."""
+    if not values:
+        return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values),
+    }
+
+
+# -------------------------------------------------------------------------
+# Per-run phase timing
+# -------------------------------------------------------------------------
+
+class RunTimer:
+    """
+    Phase timings for one Streamlit script run (callbacks included).
+
+    Phases nest: time spent in an inner phase is not counted again in the
+    outer one, so the phases of a run add up to its total. Phases timed on
+    other threads (background DB writes) are added as-is; they overlap
+    the run instead of being part of it.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started_at = time.time()
+        self.phases: Dict[str, float] = {}
+        self.total = 0.0
+        self._start = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        self._stack: List[List] = []  # [name, start, time spent in children]
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        if threading.get_ident() != self._thread_id:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.add(name, time.perf_counter() - start)
+            return
+
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.add(name, elapsed - frame[2])
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def finish(self):
+        self.total = time.perf_counter() - self._start
+
+
+_local = threading.local()
+_history: Deque[RunTimer] = deque(maxlen=PERF_RUN_HISTORY)
+_history_lock = threading.Lock()
+
+
+def current_run() -> Optional[RunTimer]:
+    """The run being timed on this thread, if any."""
+    return getattr(_local, 'run', None)
+
+
+def start_run(label: str = "run") -> RunTimer:
+    """
+    Begin timing this thread's script run. Idempotent: widget callbacks
+    run before the script body, so whichever calls this first opens the
+    run and the rest join it.
+    """
+    run = current_run()
+    if run is None:
+        run = RunTimer(label)
+        _local.run = run
+    return run
+
+
+def finish_run():
+    """Close this thread's run and add it to the recent-runs history."""
+    run = current_run()
+    if run is None:
+        return
+    _local.run = None
+    run.finish()
+    with _history_lock:
+        _history.append(run)
+
+
+@contextmanager
+def attached_run(run: Optional[RunTimer]):
+    """Attribute phases timed on this (worker) thread to `run`."""
+    previous = current_run()
+    _local.run = run
+    try:
+        yield
+    finally:
+        _local.run = previous
+
+
+@contextmanager
+def phase(name: str):
+    """Time the enclosed block as phase `name` of the current run (no-op outside a run)."""
+    run = current_run()
+    if run is None:
+        yield
+        return
+    with run.phase(name):
+        yield
+
+
+def timed_phase(name: str) -> Callable:
+    """Decorator form of phase()."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recent_runs() -> List[RunTimer]:
+    """Snapshot of the recent-runs history, oldest first."""
+    with _history_lock:
+        return list(_history)
+
+
+def phase_summary(runs: Sequence[RunTimer]) -> Dict[str, Dict[str, float]]:
+    """Percentiles per phase (over runs that hit the phase) and for whole runs."""
+    summary = {}
+    for name in RUN_PHASES:
+        values = [r.phases[name] for r in runs if name in r.phases]
+        if values:
+            summary[name] = summarize(values)
+    summary['total'] = summarize([r.total for r in runs])
+    return summary
+
+
+def slowest_runs(runs: Sequence[RunTimer], n: int = 10) -> List[RunTimer]:
+    """The n slowest runs, slowest first."""
+    return sorted(runs, key=lambda r: r.total, reverse=True)[:n]
@@ -0,0 +1,124 @@
+"""
+Trace Viewer
+Render the slowest traces from the span file as text waterfalls
+
+Usage:
+    python -m utils.trace_view                     # TRACE_FILE and its rotations
+    python -m utils.trace_view traces.jsonl --top 5
+    python -m utils.trace_view --root handle_user_message_scaffolded --width 80
+"""
+
+import argparse
+import glob
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from utils.config import TRACE_FILE
+
+
+def load_spans(path: str) -> List[Dict]:
+    """Spans from `path` and its rotated backups (path.1, path.2, ...)."""
+    spans = []
+    for file in [path] + sorted(glob.glob(f"{path}.[0-9]*")):
+        if not os.path.exists(file):
+            continue
+        with open(file) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass  # Partially written last line
+    return spans
+
+
+def group_traces(spans: List[Dict]) -> Dict[str, List[Dict]]:
+    traces: Dict[str, List[Dict]] = defaultdict(list)
+    for s in spans:
+        traces[s['trace_id']].append(s)
+    return traces
+
+
+def _root(trace: List[Dict]) -> Optional[Dict]:
+    ids = {s['span_id'] for s in trace}
+    roots = [s for s in trace if s['parent_id'] not in ids]
+    return min(roots, key=lambda s: s['start']) if roots else None
+
+
+def _extent(trace: List[Dict]) -> float:
+    """Seconds from the first span start to the last span end (writes can outlive the turn)."""
+    start = min(s['start'] for s in trace)
+    return max(s['start'] + s['duration'] for s in trace) - start
+
+
+def slowest_traces(traces: Dict[str, List[Dict]], top: int,
+                   root_name: Optional[str] = None) -> List[List[Dict]]:
+    candidates = []
+    for trace in traces.values():
+        root = _root(trace)
+        if root is None or (root_name and root['name'] != root_name):
+            continue
+        candidates.append(trace)
+    return sorted(candidates, key=lambda t: _root(t)['duration'], reverse=True)[:top]
+
+
+def render_waterfall(trace: List[Dict], width: int = 60) -> str:
+    """One line per span: indented name, duration, and a bar on a shared time axis."""
+    start = min(s['start'] for s in trace)
+    extent = _extent(trace) or 1e-9
+    children: Dict[Optional[str], List[Dict]] = defaultdict(list)
+    ids = {s['span_id'] for s in trace}
+    for s in trace:
+        parent = s['parent_id'] if s['parent_id'] in ids else None
+        children[parent].append(s)
+
+    root = _root(trace)
+    header = f"trace {root['trace_id'][:12]}  {root['duration'] * 1000:.0f}ms"
+    attrs = " ".join(f"{k}={v}" for k, v in root.get('attributes', {}).items())
+    lines = [header + (f"  {attrs}" if attrs else "")]
+
+    def walk(parent_id: Optional[str], depth: int):
+        for s in sorted(children[parent_id], key=lambda s: s['start']):
+            offset = int((s['start'] - start) / extent * width)
+            length = max(1, int(s['duration'] / extent * width))
+            bar = " " * offset + "█" * min(length, width - offset)
+            name = ("  " * depth + s['name'])[:40]
+            flag = "" if s.get('status', 'ok') == 'ok' else f"  {s['status']}"
+            lines.append(f"  {name:<40}{s['duration'] * 1000:>8.0f}ms |{bar:<{width}}|{flag}")
+            walk(s['span_id'], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Show the slowest traces as waterfalls.")
+    parser.add_argument('path', nargs='?', default=TRACE_FILE, help="Span file (JSONL)")
+    parser.add_argument('--top', type=int, default=10, help="Number of traces to show")
+    parser.add_argument('--root', help="Only traces whose root span has this name")
+    parser.add_argument('--width', type=int, default=60, help="Bar width in characters")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.path:
+        raise SystemExit("No trace file given and TRACE_FILE is not set")
+
+    traces = group_traces(load_spans(args.path))
+    slowest = slowest_traces(traces, args.top, args.root)
+    if not slowest:
+        raise SystemExit(f"No traces found in {args.path}")
+
+    print(f"{len(traces)} traces in {args.path}; slowest {len(slowest)}:\n")
+    for trace in slowest:
+        print(render_waterfall(trace, args.width))
+        print()
+
+
+if __name__ == "__main__":
+    main()
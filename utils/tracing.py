@@ -0,0 +1,134 @@
+"""
+Tracing
+Minimal spans for following one student turn end to end
+
+A span is a named, timed block with attributes. Spans opened inside another
+span (on the same thread, or in work handed off via contextvars) become its
+children and share its trace_id. Finished spans are appended as JSON lines
+to a size-rotated file; `python -m utils.trace_view` renders them.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Optional
+
+from utils.config import TRACE_FILE, TRACE_MAX_BYTES, TRACE_BACKUPS
+
+logger = logging.getLogger("tutor.tracing")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "tutor_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0                  # Wall-clock epoch seconds
+    duration: float = 0.0               # Seconds
+    status: str = "ok"
+    attributes: Dict[str, object] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        """Attach attributes (model, step, token counts, ...)."""
+        self.attributes.update(attributes)
+
+
+# -------------------------------------------------------------------------
+# Exporter
+# -------------------------------------------------------------------------
+
+_exporter: Optional[logging.Logger] = None
+
+
+def _get_exporter() -> Optional[logging.Logger]:
+    """
+    Logger writing one JSON span per line to TRACE_FILE, rotated by size.
+    A logging handler is used for its thread-safe rotation.
+    """
+    global _exporter
+    if _exporter is None and TRACE_FILE:
+        directory = os.path.dirname(TRACE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        exporter = logging.getLogger("tutor.tracing.spans")
+        exporter.setLevel(logging.INFO)
+        exporter.propagate = False  # Spans don't belong in the app log
+        if not exporter.handlers:
+            exporter.addHandler(handler)
+        _exporter = exporter
+    return _exporter
+
+
+def _export(span: Span):
+    exporter = _get_exporter()
+    if exporter is not None:
+        exporter.info(json.dumps(asdict(span), default=str))
+
+
+# -------------------------------------------------------------------------
+# API
+# -------------------------------------------------------------------------
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the enclosed block as a span. It is a child of the current span,
+    or the root of a new trace if there is none.
+    """
+    parent = _current_span.get()
+    s = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attributes=dict(attributes),
+    )
+    token = _current_span.set(s)
+    started = time.perf_counter()
+    try:
+        yield s
+    except Exception as e:
+        s.status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        s.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        _export(s)
+
+
+def annotate(**attributes):
+    """Attach attributes to the current span, if any."""
+    s = _current_span.get()
+    if s is not None:
+        s.set(**attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorator: run the function inside span `name`."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
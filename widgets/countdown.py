@@ -0,0 +1,61 @@
+"""
+Session Countdown
+Client-side "Time Left" timer that only talks to the server once, at expiry
+"""
+
+import os
+import time
+import streamlit as st
+import streamlit.components.v1 as components
+
+
+_FRONTEND_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "frontend", "countdown"
+)
+
+_countdown_component = components.declare_component(
+    "session_countdown", path=_FRONTEND_DIR
+)
+
+
+def _expiry_token(start_time: float, duration: int) -> str:
+    """
+    Token the browser sends back at expiry. It ties the event to one
+    session's deadline, so a stale value can never end a new session.
+    """
+    return f"{start_time + duration:.3f}"
+
+
+def session_countdown(start_time: float, duration: int, key: str, label: str = "Time Left"):
+    """
+    Render the session countdown in the browser.
+
+    The timer ticks locally, so no reruns are needed to keep it accurate.
+    When it reaches zero the browser sends a single value back, which
+    triggers exactly one rerun; check it with countdown_expired().
+
+    Args:
+        start_time: When the learning phase started (time.time())
+        duration: Length of the learning phase in seconds
+        key: Widget key; should be unique per session
+        label: Caption shown above the timer
+    """
+    _countdown_component(
+        remaining=max(0.0, start_time + duration - time.time()),
+        token=_expiry_token(start_time, duration),
+        label=label,
+        key=key,
+        default=None,
+    )
+
+
+def countdown_expired(start_time: float, duration: int, key: str) -> bool:
+    """
+    Check whether the countdown has run out, without rendering it.
+
+    True if the browser reported expiry for this deadline, or if the
+    deadline has passed server-side (covers a closed or sleeping tab).
+    """
+    if st.session_state.get(key) == _expiry_token(start_time, duration):
+        return True
+    return time.time() >= start_time + duration
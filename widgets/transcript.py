@@ -0,0 +1,80 @@
+"""
+Transcript Rendering
+Windowed chat rendering that keeps rerun cost flat as a conversation grows
+"""
+
+import streamlit as st
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+ROLE_LABELS = {
+    'user': 'You',
+    'assistant': 'Tutor',
+    'system': 'System'
+}
+
+
+def _get_cache(cache_key: str) -> Dict:
+    """Get (or create) the per-transcript render cache in session state."""
+    state_key = f"_transcript_cache_{cache_key}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {
+            'formatted': {},   # message ID -> formatted markdown
+            'archive_md': '',  # markdown for all collapsed messages
+            'archived': 0      # number of messages folded into archive_md
+        }
+    return st.session_state[state_key]
+
+
+def _format_message(cache: Dict, msg_id: int, role: str, content: str) -> str:
+    """Format a message for the archive block, memoized by message ID."""
+    formatted = cache['formatted'].get(msg_id)
+    if formatted is None:
+        label = ROLE_LABELS.get(role, role.title())
+        formatted = f"**{label}:**\n\n{content}"
+        cache['formatted'][msg_id] = formatted
+    return formatted
+
+
+def render_transcript(messages: Sequence, cache_key: str, live_window: int,
+                      to_pair: Callable[[object], Tuple[str, str]]):
+    """
+    Render a chat transcript, only keeping the newest messages live.
+
+    Transcripts are append-only, so a message's index is its ID. Messages
+    older than the live window are folded into a single markdown block that
+    is built incrementally: each message is formatted once, the first time
+    it leaves the window.
+
+    Args:
+        messages: All messages in the conversation, oldest first
+        cache_key: Unique key for this transcript (e.g. the session ID)
+        live_window: How many of the newest messages to render as chat bubbles
+        to_pair: Maps a message to its (role, content)
+    """
+    cache = _get_cache(cache_key)
+    split = max(0, len(messages) - live_window)
+
+    # A shorter transcript means a fresh conversation under the same key
+    if split < cache['archived']:
+        cache['formatted'].clear()
+        cache['archive_md'] = ''
+        cache['archived'] = 0
+
+    # Fold newly aged-out messages into the archive
+    if split > cache['archived']:
+        parts: List[str] = [cache['archive_md']] if cache['archive_md'] else []
+        for msg_id in range(cache['archived'], split):
+            role, content = to_pair(messages[msg_id])
+            parts.append(_format_message(cache, msg_id, role, content))
+        cache['archive_md'] = "\n\n---\n\n".join(parts)
+        cache['archived'] = split
+
+    if cache['archive_md']:
+        with st.expander(f"Earlier messages ({cache['archived']})"):
+            st.markdown(cache['archive_md'])
+
+    for msg_id in range(split, len(messages)):
+        role, content = to_pair(messages[msg_id])
+        with st.chat_message(role):
+            st.markdown(content)